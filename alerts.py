@@ -0,0 +1,132 @@
+"""Low-stock alerts raised when a medicine crosses its reorder level.
+
+    python alerts.py watch            # print alerts as they happen
+    python alerts.py set-level 12 20  # reorder Med_ID 12 below 20 units
+
+Triggers on Stock (migration 8) write a StockAlert row only when a
+medicine drops below its ReorderLevel ('low') or climbs back to it
+('restocked'). Any sale, delivery or import in any process raises them.
+AlertFeed reads the new rows whenever PRAGMA data_version says something
+was committed.
+"""
+import argparse
+import sys
+import threading
+import time
+
+import db
+import migrations
+import queries
+
+
+# How often the app looks for new alerts, in milliseconds.
+POLL_MS = 1000
+
+LAST_ALERT = "SELECT COALESCE(MAX(Alert_ID), 0) FROM StockAlert"
+
+NEW_ALERTS = """
+    SELECT a.Alert_ID, a.Med_ID, m.Brand, a.Kind, a.StockQuantity, a.ReorderLevel, a.CreatedAt
+    FROM StockAlert a LEFT JOIN Medicine m ON m.Med_ID = a.Med_ID
+    WHERE a.Alert_ID > ?
+    ORDER BY a.Alert_ID"""
+
+SET_REORDER_LEVEL = "UPDATE Stock SET ReorderLevel = ? WHERE Med_ID = ?"
+
+ALERT_COLUMNS = ["Med_ID", "Brand", "StockQuantity", "ReorderLevel"]
+
+
+def set_reorder_level(conn, med_id, level):
+    """Change one medicine's reorder level; False if it has no Stock row."""
+    with conn:
+        return conn.execute(SET_REORDER_LEVEL, (level, med_id)).rowcount > 0
+
+
+# --- ALERT FEED ---
+class AlertFeed:
+    """Reads low-stock alerts committed by any connection.
+
+    snapshot() lists what is low right now from the partial index;
+    poll() then returns only the alerts raised after it. Like the catalog
+    cache, the feed has its own connection so PRAGMA data_version sees
+    commits from every other connection.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._last_alert = None
+        self._data_version = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = db.open_connection(self._path)
+        return self._conn
+
+    def snapshot(self):
+        """Rows (Med_ID, Brand, StockQuantity, ReorderLevel) below their level."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                self._last_alert = conn.execute(LAST_ALERT).fetchone()[0]
+                rows = conn.execute(queries.LOW_STOCK).fetchall()
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            return rows
+
+    def poll(self):
+        """Alerts raised since the last snapshot or poll, oldest first."""
+        with self._lock:
+            if self._last_alert is None:
+                raise RuntimeError("call snapshot() before poll()")
+            conn = self._connection()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return []
+            self._data_version = data_version
+            alerts = conn.execute(NEW_ALERTS, (self._last_alert,)).fetchall()
+            if alerts:
+                self._last_alert = alerts[-1][0]
+            return alerts
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    watch = sub.add_parser("watch")
+    watch.add_argument("--interval", type=float, default=POLL_MS / 1000)
+    level = sub.add_parser("set-level")
+    level.add_argument("med_id", type=int)
+    level.add_argument("level", type=int)
+    args = parser.parse_args()
+
+    conn = db.open_connection()
+    migrations.migrate(conn)
+    if args.command == "set-level":
+        if not set_reorder_level(conn, args.med_id, args.level):
+            sys.exit(f"no stock record for Med_ID {args.med_id}")
+        return
+
+    feed = AlertFeed()
+    for med_id, brand, qty, level in feed.snapshot():
+        print(f"low        {med_id}: {brand} has {qty} (reorder below {level})")
+    try:
+        while True:
+            for _, med_id, brand, kind, qty, level, created in feed.poll():
+                print(f"{kind:10} {med_id}: {brand} has {qty} (reorder below {level}) at {created}", flush=True)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        feed.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
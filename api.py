@@ -0,0 +1,364 @@
+"""HTTP/JSON API for counter terminals sharing one pharmacy database.
+
+    python api.py                          # 127.0.0.1:8080, pharmacy.db
+    python api.py --host 0.0.0.0 --port 8080 --db /srv/pharmacy.db
+
+Terminals talk to this server instead of opening pharmacy.db over a
+network share. Requests are handled by asyncio. Reads run on a pool of
+threads, each with its own connection. Writes go through one queue to a
+single writer thread: sales and receipts that arrive while it is
+committing are written together in the next transaction, one commit for
+the group (services.commit_group), so a busy store pays for far fewer
+fsyncs and never waits on SQLITE_BUSY between its own writers.
+
+    GET  /customers?q=asha                 type-ahead search
+    GET  /medicines?q=para
+    GET  /medicines/12                     catalog record with stock on hand
+    GET  /stock/12                         total, reorder level and lots
+    GET  /stock/expiring?days=30
+    GET  /tables/Sales?after=500&limit=100 keyset pages, as in the table views (Sales includes archived months)
+    POST /sales      {"cust_id": 1, "med_id": 12, "qty": 2}
+    POST /carts      {"cust_id": 1, "lines": [[12, 2], [40, 1]]}
+    POST /receipts   {"med_id": 12, "qty": 100, "expiry": "2027-01-31", "lot_number": "A7"}
+
+Rejected requests return 400 (409 when stock is short) with
+{"error": title, "message": text}.
+"""
+import argparse
+import asyncio
+import json
+import operator
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import archive
+import codec
+import db
+import migrations
+import search
+import services
+import stock
+from catalog import Catalog
+from table_view import PAGE_SIZE, page_query
+
+
+READERS = 4
+
+# Most writes committed together; more waiting requests go in the next group.
+GROUP_MAX = 256
+
+MAX_BODY = 1 << 20
+MAX_PAGE = 1000
+
+# Tables served by /tables, with the columns the table views show.
+TABLES = {
+    "Customer": ["Cust_ID", "Name", "Address", "PhoneNumber"],
+    "Employee": ["Emp_ID", "Name", "Role", "Email", "PhoneNumber"],
+    "Supplier": ["Supplier_ID", "Name", "Contact"],
+    "Medicine": ["Med_ID", "SupplierID", "Brand", "Price", "ExpiryDate", "ManufactureDate"],
+    "Stock": ["Med_ID", "StockQuantity", "LastUpdated"],
+    "StockLot": ["Lot_ID", "Med_ID", "LotNumber", "ExpiryDate", "Quantity", "LastUpdated"],
+    "Sales": ["Sale_ID", "Cust_ID", "Med_ID", "SaleDate", "Quantity", "TotalAmount"],
+}
+
+STOCK_ROW = "SELECT StockQuantity, ReorderLevel FROM Stock WHERE Med_ID = ?"
+LOTS = "SELECT Lot_ID, LotNumber, ExpiryDate, Quantity FROM StockLot WHERE Med_ID = ? ORDER BY ExpiryDate, Lot_ID"
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, error, message):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+        self.message = message
+
+
+def _json(value):
+    if hasattr(value, "_asdict"):
+        return {k: _json(v) for k, v in value._asdict().items()}
+    if isinstance(value, (list, tuple)):
+        return [_json(v) for v in value]
+    return value
+
+
+def _int_param(query, name, default):
+    try:
+        return int(query.get(name, [default])[0])
+    except (TypeError, ValueError):
+        raise HTTPError(400, "Input Error", f"{name} must be an integer") from None
+
+
+# --- WRITER ---
+class GroupWriter:
+    """Single writer thread fed by a queue; drains it into group commits."""
+
+    def __init__(self, path, catalog, max_group=GROUP_MAX):
+        self.max_group = max_group
+        self._conn = db.open_connection(path)
+        self.pharmacy = services.Pharmacy(self._conn, catalog)
+        self._thread = ThreadPoolExecutor(1, thread_name_prefix="writer")
+        # made here, not in run(), so a request that arrives first still queues
+        self._queue = asyncio.Queue()
+        self.groups = 0
+        self.writes = 0
+
+    async def submit(self, record, request):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, request, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_group and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            calls = [(record, request) for record, request, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._thread, services.commit_group, self._conn, calls)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.groups += 1
+            self.writes += len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue  # client went away
+                if isinstance(result, services.ServiceError):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def close(self):
+        self._thread.shutdown()
+        self._conn.close()
+
+
+# --- SERVER ---
+class ApiServer:
+
+    def __init__(self, path=None, readers=READERS):
+        self.path = path
+        self.catalog = Catalog(path)
+        self.writer = GroupWriter(path, self.catalog)
+        self.history = archive.HistoryPages()
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix="reader")
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.routes = [
+            ("GET", re.compile(r"/customers"), self.search_customers),
+            ("GET", re.compile(r"/medicines"), self.search_medicines),
+            ("GET", re.compile(r"/medicines/(\d+)"), self.medicine),
+            ("GET", re.compile(r"/stock/expiring"), self.expiring),
+            ("GET", re.compile(r"/stock/(\d+)"), self.stock_level),
+            ("GET", re.compile(r"/tables/(\w+)"), self.table_page),
+            ("POST", re.compile(r"/sales"), self.post_sale),
+            ("POST", re.compile(r"/carts"), self.post_cart),
+            ("POST", re.compile(r"/receipts"), self.post_receipt),
+        ]
+
+    # --- reads ---
+    def _reader_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = db.open_connection(self.path)
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _read_call(self, fn, args):
+        return fn(self._reader_connection(), *args)
+
+    async def read(self, fn, *args):
+        """fn(conn, *args) on a reader thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self._read_call, fn, args)
+
+    async def search_customers(self, query):
+        return [{"cust_id": cust_id, "label": label}
+                for cust_id, label in await self.read(search.search_customers, query.get("q", [""])[0])]
+
+    async def search_medicines(self, query):
+        return [{"med_id": med_id, "brand": brand}
+                for med_id, brand in await self.read(search.search_medicines, query.get("q", [""])[0])]
+
+    async def medicine(self, query, med_id):
+        # a catalog miss reads the database, so this too runs on a reader
+        def work(conn):
+            record = self.catalog.medicine(med_id)
+            return record, record and conn.execute(STOCK_ROW, (record.med_id,)).fetchone()
+
+        record, row = await self.read(work)
+        if record is None:
+            raise HTTPError(404, "Not Found", f"no medicine {med_id}")
+        return {"med_id": record.med_id, "supplier_id": record.supplier_id, "brand": record.brand,
+                "price": record.price, "expiry": record.expiry, "in_stock": row[0] if row else 0}
+
+    async def stock_level(self, query, med_id):
+        def work(conn):
+            return conn.execute(STOCK_ROW, (med_id,)).fetchone(), conn.execute(LOTS, (med_id,)).fetchall()
+
+        row, lots = await self.read(work)
+        if row is None:
+            raise HTTPError(404, "Not Found", f"no stock record for {med_id}")
+        return {"med_id": int(med_id), "quantity": row[0], "reorder_level": row[1],
+                "lots": [dict(zip(("lot_id", "lot_number", "expiry", "quantity"), lot)) for lot in lots]}
+
+    async def expiring(self, query):
+        rows = await self.read(stock.expiring_lots, _int_param(query, "days", 30))
+        return [dict(zip(stock.EXPIRING_COLUMNS, row)) for row in rows]
+
+    async def table_page(self, query, table):
+        columns = TABLES.get(table)
+        if columns is None:
+            raise HTTPError(404, "Not Found", f"no table {table}")
+        limit = min(max(_int_param(query, "limit", PAGE_SIZE), 1), MAX_PAGE)
+        after = query.get("after", [None])[0]
+        params = (limit,) if after is None else (_int_param(query, "after", 0), limit)
+        sql = page_query(table, columns, bounded=after is not None)
+        if table == "Sales":
+            # read across the archived months too, as the All Sales view does
+            rows = await self.read(self.history.page, sql, params, operator.itemgetter(0))
+        else:
+            rows = await self.read(lambda conn: conn.execute(sql, params).fetchall())
+        row_codecs = codec.codecs(table, columns)
+        return {"columns": columns, "rows": [codec.decode_row(row_codecs, row) for row in rows]}
+
+    # --- writes ---
+    async def post_sale(self, body):
+        return await self.writer.submit(self.writer.pharmacy.sales.record_sale, services.SaleRequest(
+            body.get("cust_id"), body.get("med_id"), body.get("qty"), body.get("sale_date")))
+
+    async def post_cart(self, body):
+        return await self.writer.submit(self.writer.pharmacy.sales.record_checkout, services.CartRequest(
+            body.get("cust_id"), body.get("lines") or [], body.get("sale_date")))
+
+    async def post_receipt(self, body):
+        lot_id = await self.writer.submit(self.writer.pharmacy.stock.record_receipt, services.StockReceipt(
+            body.get("med_id"), body.get("qty"), body.get("expiry"), body.get("lot_number")))
+        return {"lot_id": lot_id}
+
+    # --- HTTP ---
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(url.path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            if method == "POST":
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    raise HTTPError(400, "Input Error", "body must be JSON") from None
+                if not isinstance(payload, dict):
+                    raise HTTPError(400, "Input Error", "body must be a JSON object")
+                return 201, await handler(payload, *match.groups())
+            return 200, await handler(parse_qs(url.query), *match.groups())
+        if allowed:
+            raise HTTPError(405, "Method Not Allowed", f"{method} not allowed on {url.path}")
+        raise HTTPError(404, "Not Found", f"no route for {url.path}")
+
+    async def respond(self, method, target, body):
+        try:
+            status, payload = await self.dispatch(method, target, body)
+        except HTTPError as e:
+            status, payload = e.status, {"error": e.error, "message": e.message}
+        except services.ServiceError as e:
+            status = 409 if e.title == "Insufficient Stock" else 400
+            payload = {"error": e.title, "message": e.message}
+        except Exception as e:
+            print(f"{method} {target}: {e!r}", file=sys.stderr)
+            status, payload = 500, {"error": "Error", "message": str(e)}
+        return status, _json(payload)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.respond(method, target, body)
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                data = json.dumps(payload).encode()
+                head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                        f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        await asyncio.get_running_loop().run_in_executor(self._readers, self.catalog.load)
+        server = await asyncio.start_server(self.handle, host, port)
+        writer_task = asyncio.create_task(self.writer.run())
+        print(f"listening on http://{host}:{port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+    def close(self):
+        self._readers.shutdown()
+        self.writer.close()
+        self.catalog.close()
+        self.history.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", help="database file (default: PHARMACY_DB or pharmacy.db)")
+    parser.add_argument("--readers", type=int, default=READERS)
+    args = parser.parse_args()
+
+    conn = db.open_connection(args.db)
+    migrations.migrate(conn)
+    conn.close()
+    server = ApiServer(args.db, args.readers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{server.writer.writes} write(s) in {server.writer.groups} commit(s)", file=sys.stderr)
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Move closed months of Sales into monthly archive databases.
+
+    python archive.py run                  # archive months before the last 3
+    python archive.py run --keep 6 --batch 2000 --pause 0.05
+    python archive.py run --vacuum         # then shrink pharmacy.db
+    python archive.py list
+
+Each month goes to its own file, archive/sales-YYYY-MM.db next to the
+database, and is listed in the SalesArchive table (migration 11). Rows are
+moved a batch at a time: a batch is copied into the archive and committed
+there, then deleted from the live table in a short write transaction, so
+the app keeps selling throughout and an interrupted run simply resumes.
+
+history() attaches the archives a date range needs, read-only, under a
+SalesHistory view of live and archived Sales together. An archived row
+still present in the live table (between the two commits) is read from
+the live table only, so nothing is counted twice. HistoryPages serves
+the All Sales view and the API's /tables/Sales: it pages the live table
+and every archive separately, each off its own index, and merges the
+pages. The daily aggregate tables are untouched by archiving and keep
+covering every month.
+"""
+import argparse
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import codec
+import db
+import migrations
+
+
+# Closed months kept in the live table besides the current one.
+KEEP_MONTHS = 3
+
+# Rows moved per transaction, and the pause between batches (seconds).
+BATCH_SIZE = 5000
+PAUSE = 0.01
+
+# Archives attached at once by history(); SQLite allows 10 by default.
+MAX_ATTACHED = 8
+
+ARCHIVE_DIR = os.environ.get('PHARMACY_ARCHIVE_DIR')
+
+MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+
+SALES_COLUMNS = "Sale_ID, Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount"
+
+# The live Sales table without its foreign keys and triggers; same indexes.
+ARCHIVE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS arc.Sales (
+        Sale_ID INTEGER PRIMARY KEY,
+        Cust_ID INTEGER NOT NULL,
+        Med_ID INTEGER NOT NULL,
+        SaleDate INTEGER NOT NULL,
+        Quantity INTEGER NOT NULL,
+        TotalAmount INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS arc.idx_sales_date ON Sales(SaleDate)",
+    "CREATE INDEX IF NOT EXISTS arc.idx_sales_cust_date ON Sales(Cust_ID, SaleDate)",
+    "CREATE INDEX IF NOT EXISTS arc.idx_sales_med_date ON Sales(Med_ID, SaleDate)",
+    "CREATE INDEX IF NOT EXISTS arc.idx_sales_amount ON Sales(TotalAmount)",
+)
+
+FIRST_SALE_FROM = "SELECT MIN(SaleDate) FROM main.Sales WHERE SaleDate >= ?"
+
+REGISTER = """
+    INSERT INTO SalesArchive (Month, FileName, ArchivedOn) VALUES (?, ?, ?)
+    ON CONFLICT (Month) DO NOTHING"""
+
+# A batch is the first rows left in the month, read off idx_sales_date.
+BATCH_IDS = "SELECT Sale_ID FROM main.Sales WHERE SaleDate >= ? AND SaleDate < ? LIMIT ?"
+
+COPY_BATCH = f"""
+    INSERT OR IGNORE INTO arc.Sales ({SALES_COLUMNS})
+    SELECT {SALES_COLUMNS} FROM main.Sales WHERE Sale_ID IN (SELECT value FROM json_each(?))"""
+
+# Only rows that made it into the archive leave the live table.
+COPIED = "SELECT Sale_ID FROM arc.Sales WHERE Sale_ID IN (SELECT value FROM json_each(?))"
+MOVED_TOTALS = f"SELECT COUNT(*), COALESCE(SUM(TotalAmount), 0) FROM main.Sales WHERE Sale_ID IN ({COPIED})"
+DELETE_BATCH = f"DELETE FROM main.Sales WHERE Sale_ID IN ({COPIED})"
+COUNT_MOVED = "UPDATE SalesArchive SET Rows = Rows + ?, Revenue = Revenue + ? WHERE Month = ?"
+
+LIST_ARCHIVES = """
+    SELECT Month, FileName, Rows, Revenue, ArchivedOn FROM SalesArchive
+    WHERE Month >= substr(?1, 1, 7) AND Month || '-01' <= ?2 ORDER BY Month"""
+
+LIST_COLUMNS = ["Month", "FileName", "Rows", "Revenue", "ArchivedOn"]
+
+HISTORY_VIEW = "SalesHistory"
+
+
+# --- MONTHS ---
+def _months_back(today, months):
+    index = today.year * 12 + today.month - 1 - months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def closed_months(conn, keep=KEEP_MONTHS, today=None):
+    """Months with live sales older than the current month and the `keep` before it."""
+    cutoff = codec.day_range(_months_back(today or date.today(), keep))[0]
+    months = []
+    first = conn.execute(FIRST_SALE_FROM, (0,)).fetchone()[0]
+    while first is not None and first < cutoff:
+        month = codec.to_iso(first)[:7]
+        months.append(month)
+        first = conn.execute(FIRST_SALE_FROM, (codec.day_range(month)[1],)).fetchone()[0]
+    return months
+
+
+def archives(conn, date_from=None, date_to=None):
+    """Catalog rows of archived months overlapping [date_from, date_to]."""
+    return conn.execute(LIST_ARCHIVES, (date_from or "", date_to or "9999-12-31")).fetchall()
+
+
+def archive_dir(conn):
+    """PHARMACY_ARCHIVE_DIR, else archive/ next to the connection's main database."""
+    if ARCHIVE_DIR:
+        return ARCHIVE_DIR
+    path = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    return os.path.join(os.path.dirname(path) or ".", "archive")
+
+
+# --- MOVING ---
+def archive_month(conn, month, batch_size=BATCH_SIZE, pause=PAUSE):
+    """Move one month of live Sales into its archive file; returns rows moved.
+
+    Needs a connection of its own: it switches to autocommit and attaches
+    the archive for the duration.
+    """
+    if not MONTH_RE.match(month):
+        raise ValueError(f"Not a month: {month!r}")
+    folder = archive_dir(conn)
+    os.makedirs(folder, exist_ok=True)
+    file_name = f"sales-{month}.db"
+    first, end = codec.day_range(month)
+
+    if conn.in_transaction:
+        conn.commit()
+    isolation = conn.isolation_level
+    conn.isolation_level = None
+    conn.execute("ATTACH DATABASE ? AS arc", (os.path.join(folder, file_name),))
+    try:
+        # a plain rollback journal, so the finished file opens read-only anywhere
+        conn.execute("PRAGMA arc.journal_mode = DELETE")
+        for sql in ARCHIVE_SCHEMA:
+            conn.execute(sql)
+        conn.execute(REGISTER, (month, file_name, date.today().isoformat()))
+        moved = 0
+        while True:
+            ids = json.dumps([row[0] for row in conn.execute(BATCH_IDS, (first, end, batch_size))])
+            if ids == "[]":
+                return moved
+            # the copy only reads the live database, so it does not block the app's writers
+            conn.execute("BEGIN")
+            try:
+                conn.execute(COPY_BATCH, (ids,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                count, revenue = conn.execute(MOVED_TOTALS, (ids,)).fetchone()
+                conn.execute(DELETE_BATCH, (ids,))
+                conn.execute(COUNT_MOVED, (count, revenue, month))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            moved += count
+            if pause:
+                time.sleep(pause)
+    finally:
+        conn.execute("DETACH DATABASE arc")
+        conn.isolation_level = isolation
+
+
+def index_archives(conn):
+    """Give archive files written before an index was added to ARCHIVE_SCHEMA that index."""
+    folder = archive_dir(conn)
+    for month, file_name, *_ in archives(conn):
+        path = os.path.join(folder, file_name)
+        if not os.path.exists(path):
+            continue
+        conn.execute("ATTACH DATABASE ? AS arc", (path,))
+        try:
+            for sql in ARCHIVE_SCHEMA:
+                conn.execute(sql)
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE arc")
+
+
+def archive_closed_months(conn, keep=KEEP_MONTHS, batch_size=BATCH_SIZE, pause=PAUSE, report=None):
+    """Archive every closed month; returns {month: rows moved}."""
+    index_archives(conn)
+    moved = {}
+    for month in closed_months(conn, keep):
+        moved[month] = archive_month(conn, month, batch_size, pause)
+        if report:
+            report(month, moved[month])
+    return moved
+
+
+# --- READING ---
+def _schema(month):
+    return "sales_" + month.replace("-", "_")
+
+
+def spans(conn, date_from=None, date_to=None):
+    """Split [date_from, date_to] into ranges that history() can attach in one go.
+
+    Returns (first, last) pairs, None meaning open-ended; one pair when the
+    range needs at most MAX_ATTACHED archives.
+    """
+    months = [row[0] for row in archives(conn, date_from, date_to)]
+    result = []
+    first = date_from
+    for i in range(MAX_ATTACHED, len(months), MAX_ATTACHED):
+        start = codec.day_range(months[i])[0]
+        result.append((first, codec.to_iso(start - 1)))
+        first = codec.to_iso(start)
+    result.append((first, date_to))
+    return result
+
+
+@contextmanager
+def history(conn, date_from=None, date_to=None):
+    """Attach the archives overlapping the range and yield the name of a view over all Sales.
+
+    The view (SalesHistory, a TEMP view) has the Sales columns; callers
+    still filter it on SaleDate (day numbers, see codec.py). Must be
+    entered outside a transaction; a range spanning more than MAX_ATTACHED
+    archives raises ValueError (see spans()).
+    """
+    rows = archives(conn, date_from, date_to)
+    if len(rows) > MAX_ATTACHED:
+        raise ValueError(f"{len(rows)} archived months in range; at most {MAX_ATTACHED} can be attached")
+    folder = archive_dir(conn)
+    attached = []
+    try:
+        selects = [f"SELECT {SALES_COLUMNS} FROM main.Sales"]
+        # imported here: urllib.request pulls in http and ssl, which the app's start-up can do without
+        from urllib.request import pathname2url
+        for month, file_name, *_ in rows:
+            if not MONTH_RE.match(month):
+                raise ValueError(f"Bad month in SalesArchive: {month!r}")
+            path = os.path.abspath(os.path.join(folder, file_name))
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Archive for {month} is missing: {path}")
+            schema = _schema(month)
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", ("file:" + pathname2url(path) + "?mode=ro",))
+            attached.append(schema)
+            selects.append(f"SELECT {SALES_COLUMNS} FROM {schema}.Sales a "
+                           f"WHERE NOT EXISTS (SELECT 1 FROM main.Sales l WHERE l.Sale_ID = a.Sale_ID)")
+        conn.execute(f"DROP VIEW IF EXISTS temp.{HISTORY_VIEW}")
+        conn.execute(f"CREATE TEMP VIEW {HISTORY_VIEW} AS " + "\nUNION ALL\n".join(selects))
+        yield HISTORY_VIEW
+    finally:
+        conn.execute(f"DROP VIEW IF EXISTS temp.{HISTORY_VIEW}")
+        for schema in attached:
+            conn.execute(f"DETACH DATABASE {schema}")
+
+
+class HistoryPages:
+    """Keyset pages of live and archived Sales together.
+
+    The same page query (table_view.page_query on "Sales") runs on the
+    live table and on each archive file separately, so every source reads
+    off its own sort index and stops at its LIMIT; the pages are then
+    merged. Archive files are opened read-only the first time a page
+    needs them and stay open until close().
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def _open_archives(self, conn):
+        folder = archive_dir(conn)
+        sources = []
+        for month, file_name, *_ in archives(conn):
+            source = self._sources.get(month)
+            if source is None:
+                path = os.path.abspath(os.path.join(folder, file_name))
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Archive for {month} is missing: {path}")
+                from urllib.request import pathname2url
+                source = self._sources[month] = sqlite3.connect(
+                    "file:" + pathname2url(path) + "?mode=ro", uri=True, check_same_thread=False)
+            sources.append(source)
+        return sources
+
+    def page(self, conn, query, params, order_key, descending=False):
+        """Run query (params end with its LIMIT) on every source; the first LIMIT rows by order_key.
+
+        descending says whether query orders that way.
+        """
+        pages = [conn.execute(query, params).fetchall()]
+        with self._lock:
+            for source in self._open_archives(conn):
+                pages.append(source.execute(query, params).fetchall())
+        if len(pages) == 1:
+            return pages[0]
+        limit = params[-1]
+        rows, seen = [], set()
+        # the live page comes first, so a batch copied but not yet deleted is read from the live table
+        for row in heapq.merge(*pages, key=order_key, reverse=descending):
+            if row[0] in seen:
+                continue
+            seen.add(row[0])
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+    def close(self):
+        with self._lock:
+            for source in self._sources.values():
+                source.close()
+            self._sources.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file (default: PHARMACY_DB or pharmacy.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("--keep", type=int, default=KEEP_MONTHS, help="closed months to keep live")
+    run.add_argument("--batch", type=int, default=BATCH_SIZE, help="rows per transaction")
+    run.add_argument("--pause", type=float, default=PAUSE, help="seconds between batches")
+    run.add_argument("--vacuum", action="store_true", help="VACUUM the live database afterwards")
+    sub.add_parser("list")
+    args = parser.parse_args()
+
+    conn = db.open_connection(args.db)
+    migrations.migrate(conn)
+    if args.command == "list":
+        print("  ".join(LIST_COLUMNS))
+        for month, file_name, rows, revenue, archived_on in archives(conn):
+            print(f"{month}  {file_name}  {rows}  {codec.format_money(revenue)}  {archived_on}")
+        conn.close()
+        return
+
+    start = time.perf_counter()
+    moved = archive_closed_months(conn, args.keep, args.batch, args.pause,
+                                  report=lambda month, count: print(f"{month}: moved {count} sale(s)",
+                                                                    file=sys.stderr))
+    print(f"archived {sum(moved.values())} sale(s) from {len(moved)} month(s) "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if args.vacuum and moved:
+        conn.execute("VACUUM")
+        print("live database vacuumed", file=sys.stderr)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import tkinter as tk
+
+import db
+import instrument
+
+
+# Quiet time after the last keystroke before a search is sent.
+DEBOUNCE_MS = 150
+
+
+# --- AUTOCOMPLETE ENTRY ---
+class AutocompleteEntry:
+    """Entry that suggests matching rows as the user types.
+
+    search(conn, text) runs on the executor and returns (id, label) pairs.
+    Keystrokes are debounced, and a newer search cancels the one in flight,
+    so only results for the current text are shown. Choosing a suggestion
+    fills the entry with "ID: label". get_id() accepts that or a bare ID.
+    """
+
+    def __init__(self, parent, executor, search, width=30):
+        self.executor = executor
+        self.search = search
+        self._after_id = None
+        self._task = None
+
+        self.entry = tk.Entry(parent, width=width)
+        self.popup = tk.Toplevel(self.entry)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+        self.listbox = tk.Listbox(self.popup, height=8, width=width + 10, exportselection=False)
+        self.listbox.pack(fill=tk.BOTH, expand=True)
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Down>", self._focus_list)
+        self.entry.bind("<Escape>", lambda e: self.hide())
+        self.entry.bind("<FocusOut>", lambda e: self.entry.after(200, self._hide_unless_focused))
+        self.entry.bind("<Destroy>", self._on_destroy)
+        self.listbox.bind("<Return>", self._choose)
+        self.listbox.bind("<Double-Button-1>", self._choose)
+        self.listbox.bind("<Escape>", lambda e: (self.hide(), self.entry.focus_set()))
+
+    def grid(self, **kwargs):
+        self.entry.grid(**kwargs)
+
+    def get(self):
+        return self.entry.get()
+
+    def get_id(self):
+        """The chosen ID as text ("12: Jane Doe" -> "12"), or whatever was typed."""
+        return self.entry.get().split(':')[0].strip()
+
+    def delete(self, first, last=None):
+        self.entry.delete(first, last)
+        self.hide()
+
+    def focus_set(self):
+        self.entry.focus_set()
+
+    # --- searching ---
+    def _on_key(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+        self._after_id = self.entry.after(DEBOUNCE_MS, self._start_search)
+
+    def _start_search(self):
+        self._after_id = None
+        if self._task is not None:
+            self._task.cancel()
+        text = self.entry.get().strip()
+        if not text or ':' in text:
+            self._task = None
+            self.hide()
+            return
+        task = self._task = self.executor.submit(
+            self._run_search, text,
+            on_done=lambda results: self._show(task, text, results),
+            on_error=lambda e: self._failed(task, e))
+
+    def _run_search(self, text):
+        with instrument.operation(self.search.__name__):
+            return self.search(db.get_connection(), text)
+
+    # Cancelled tasks never call back; the identity check drops any stragglers.
+    def _failed(self, task, error):
+        if task is not self._task:
+            return
+        self._task = None
+        self.executor.default_on_error(error)
+
+    def _show(self, task, text, results):
+        if task is not self._task:
+            return
+        self._task = None
+        if text != self.entry.get().strip() or not results:
+            self.hide()
+            return
+        self.listbox.delete(0, tk.END)
+        for key, label in results:
+            self.listbox.insert(tk.END, f"{key}: {label}")
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.popup.geometry(f"+{x}+{y}")
+        self.popup.deiconify()
+        self.popup.lift()
+
+    # --- choosing ---
+    def _focus_list(self, event):
+        if self.popup.winfo_viewable() and self.listbox.size():
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        return "break"
+
+    def _choose(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.entry.delete(0, tk.END)
+            self.entry.insert(0, self.listbox.get(selection[0]))
+        self.hide()
+        self.entry.focus_set()
+        self.entry.icursor(tk.END)
+        return "break"
+
+    def hide(self):
+        self.popup.withdraw()
+
+    def _hide_unless_focused(self):
+        if self.entry.winfo_exists() and self.entry.focus_get() is not self.listbox:
+            self.hide()
+
+    def _on_destroy(self, event):
+        if event.widget is not self.entry:
+            return
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+        if self._task is not None:
+            self._task.cancel()
@@ -0,0 +1,265 @@
+"""Online backups of the live database, taken while the terminals keep selling.
+
+    python backup.py run                   # one backup into backups/, keep the newest 7
+    python backup.py run --keep 14 --pages 256 --pause 0.02
+    python backup.py list
+    python backup.py verify backups/pharmacy-20261017-101500.db
+    python backup.py restore backups/pharmacy-20261017-101500.db
+
+Pages are copied with the sqlite3 backup API a few at a time, with a pause
+between steps, so a writer never waits long. A commit from another
+connection restarts the copy; after MAX_RESTARTS the rest is copied in one
+step, which in WAL mode holds only a read snapshot and blocks no writer.
+Each backup is written to a .part file and renamed once complete, then
+checked with PRAGMA integrity_check in a separate process: a good one gets
+a .ok file beside it, a damaged one is renamed to .bad. Once a new backup
+has passed, the newest --keep verified generations are kept and anything
+older goes, .bad files included; a backup that fails never pushes out a
+good one. The main window takes them on a timer, on a thread of its own, when
+PHARMACY_BACKUP_HOURS is set (on one terminal is enough), or from the
+Diagnostics tab. Archived months (archive.py) are separate files that never
+change once written; back up the archive folder as plain files.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import db
+import validation
+
+
+BACKUP_DIR = os.environ.get("PHARMACY_BACKUP_DIR")
+KEEP = 7
+PAGES = 128
+PAUSE = 0.005
+# How long one step waits when the source is locked, in seconds.
+BUSY_SLEEP = 0.25
+MAX_RESTARTS = 5
+
+# Hours between backups taken by the main window; 0 turns them off.
+INTERVAL_HOURS = float(os.environ.get("PHARMACY_BACKUP_HOURS", "0"))
+
+STAMP_FORMAT = "%Y%m%d-%H%M%S"
+GENERATION_RE = re.compile(r"-\d{8}-\d{6}\.db(\.bad)?$")
+
+Backup = namedtuple('Backup', 'path pages restarts seconds')
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+# --- FILES ---
+def backup_dir(db_path=None):
+    """PHARMACY_BACKUP_DIR, else backups/ next to the database."""
+    if BACKUP_DIR:
+        return BACKUP_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or db.DB_PATH)), "backups")
+
+
+def _stem(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def _files(folder, stem):
+    if not os.path.isdir(folder):
+        return []
+    names = [name for name in os.listdir(folder)
+             if name.startswith(stem + "-") and GENERATION_RE.search(name)]
+    return [os.path.join(folder, name) for name in sorted(names, reverse=True)]
+
+
+def generations(folder, stem):
+    """Completed backups of one database, newest first; damaged ones (.bad) are left out."""
+    return [path for path in _files(folder, stem) if path.endswith(".db")]
+
+
+def status(path):
+    if path.endswith(".bad"):
+        return "damaged"
+    return "verified" if os.path.exists(path + ".ok") else "unverified"
+
+
+def rotate(path, keep=KEEP):
+    """Call once the backup at path has been verified; returns the paths deleted.
+
+    Keeps the newest keep verified generations of its database and the
+    unverified or damaged files newer than the oldest of them; older files
+    go. Damaged (.bad) files beyond the newest keep go in any case.
+    """
+    folder = os.path.dirname(path)
+    stem = GENERATION_RE.sub("", os.path.basename(path))
+    removed = []
+    verified = damaged = 0
+    for generation in _files(folder, stem):
+        state = status(generation)
+        if verified >= keep or (state == "damaged" and damaged >= keep):
+            removed.append(generation)
+        verified += state == "verified"
+        damaged += state == "damaged"
+    for generation in removed:
+        os.remove(generation)
+        if os.path.exists(generation + ".ok"):
+            os.remove(generation + ".ok")
+    return removed
+
+
+# --- COPYING ---
+def copy_online(source, target, pages=PAGES, pause=PAUSE, max_restarts=MAX_RESTARTS):
+    """Copy source (a connection) into target (a connection); returns (pages, restarts)."""
+    state = {"remaining": None, "restarts": 0, "pages": 0}
+
+    def progress(_, remaining, total):
+        # remaining going up again means another connection committed and the copy restarted
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        state["remaining"] = remaining
+        state["pages"] = total
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        source.backup(target, pages=pages, progress=progress, sleep=BUSY_SLEEP)
+    except _TooManyRestarts:
+        source.backup(target, pages=-1, sleep=BUSY_SLEEP)
+    return state["pages"], state["restarts"]
+
+
+def take_backup(db_path=None, folder=None, pages=PAGES, pause=PAUSE):
+    """Back up the database into a new generation; returns a Backup.
+
+    The backup is not verified yet; see start_verify(), then rotate().
+    """
+    db_path = db_path or db.DB_PATH
+    folder = folder or backup_dir(db_path)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{_stem(db_path)}-{datetime.now().strftime(STAMP_FORMAT)}.db")
+    part = path + ".part"
+
+    start = time.perf_counter()
+    source = db.open_connection(db_path)
+    target = sqlite3.connect(part)
+    try:
+        copied, restarts = copy_online(source, target, pages, pause)
+        # a self-contained file: no -wal beside it when opened later
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+    os.replace(part, path)
+    return Backup(path, copied, restarts, time.perf_counter() - start)
+
+
+# --- VERIFYING ---
+def _open_backup(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such backup: {path}")
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    # the CHECK constraints integrity_check evaluates use it
+    conn.create_function("REGEXP", 2, validation.regexp, deterministic=True)
+    return conn
+
+
+def integrity_problems(path):
+    """What PRAGMA integrity_check finds wrong with a backup; [] when it is sound."""
+    conn = _open_backup(path)
+    try:
+        return [row[0] for row in conn.execute("PRAGMA integrity_check") if row[0] != "ok"]
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        conn.close()
+
+
+def verify(path):
+    """Check a backup and record the outcome: a .ok file beside it, or the backup renamed to .bad."""
+    problems = integrity_problems(path)
+    if problems:
+        os.replace(path, path + ".bad")
+    else:
+        with open(path + ".ok", "w", encoding="utf-8") as f:
+            f.write(f"integrity_check ok {datetime.now().isoformat(timespec='seconds')}\n")
+    return problems
+
+
+def start_verify(path):
+    """Verify a backup in a separate process, so the check does not compete with the app; returns the Popen."""
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "verify", path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+# --- RESTORING ---
+def restore(path, db_path=None):
+    """Copy a verified backup over the database. Stop every terminal first."""
+    if integrity_problems(path):
+        raise ValueError(f"{path} fails integrity_check; not restoring it")
+    source = _open_backup(path)
+    target = db.open_connection(db_path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file (default: PHARMACY_DB or pharmacy.db)")
+    parser.add_argument("--dir", help="backup folder (default: PHARMACY_BACKUP_DIR or backups/ next to the database)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("--keep", type=int, default=KEEP, help="verified generations to keep")
+    run.add_argument("--pages", type=int, default=PAGES, help="pages copied per step")
+    run.add_argument("--pause", type=float, default=PAUSE, help="seconds between steps")
+    run.add_argument("--no-verify", action="store_true", help="skip the integrity check (and rotation)")
+    sub.add_parser("list")
+    check = sub.add_parser("verify")
+    check.add_argument("backup")
+    back = sub.add_parser("restore")
+    back.add_argument("backup")
+    args = parser.parse_args()
+
+    db_path = args.db or db.DB_PATH
+    folder = args.dir or backup_dir(db_path)
+    if args.command == "list":
+        for path in _files(folder, _stem(db_path)):
+            print(f"{os.path.basename(path)}  {os.path.getsize(path)}  {status(path)}")
+        return
+    if args.command == "verify":
+        try:
+            problems = verify(args.backup)
+        except OSError as e:
+            parser.error(str(e))
+        for problem in problems:
+            print(problem)
+        sys.exit(1 if problems else 0)
+    if args.command == "restore":
+        try:
+            restore(args.backup, db_path)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(f"restored {db_path} from {args.backup}", file=sys.stderr)
+        return
+
+    result = take_backup(db_path, folder, args.pages, args.pause)
+    print(f"backed up {result.pages} page(s) to {result.path} in {result.seconds:.1f}s "
+          f"({result.restarts} restart(s))", file=sys.stderr)
+    if not args.no_verify:
+        if start_verify(result.path).wait():
+            print(f"{result.path} FAILED integrity_check, kept as {result.path}.bad", file=sys.stderr)
+            sys.exit(1)
+        print("integrity_check ok", file=sys.stderr)
+        for path in rotate(result.path, args.keep):
+            print(f"removed {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
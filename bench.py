@@ -0,0 +1,194 @@
+"""Benchmarks for the queries behind the app's screens.
+
+    python bench.py                                  # 100k sales, results to bench-results.json
+    python bench.py --sales 1000000 -o after.json --baseline before.json
+
+The database is generated once by workload.py and cached (--db). Each run
+works on a fresh copy of it, so write cases start from the same state
+every time. Results are stored as JSON. With --baseline, cases whose median
+got slower by more than --threshold are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import db
+import ledger
+import queries
+import reports
+import sales
+import search
+import stock
+import workload
+from table_view import page_query
+
+
+WARMUP = 10
+ITERATIONS = 200
+
+# Slowdowns smaller than this are noise, whatever the ratio.
+MIN_DELTA_MS = 0.05
+
+
+def _columns(conn, table):
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def cases(conn, rng):
+    """Yield (name, fn) pairs; fn runs one operation against conn."""
+    max_cust = conn.execute("SELECT MAX(Cust_ID) FROM Customer").fetchone()[0]
+    max_sale = conn.execute("SELECT MAX(Sale_ID) FROM Sales").fetchone()[0]
+    stocked = [r[0] for r in conn.execute("SELECT Med_ID FROM Stock WHERE StockQuantity >= 1000")]
+    if not stocked:
+        stocked = [r[0] for r in conn.execute("SELECT Med_ID FROM Stock ORDER BY StockQuantity DESC LIMIT 100")]
+
+    # view_table: the PagedTable keyset queries
+    for table, top in (("Sales", max_sale), ("Customer", max_cust)):
+        columns = _columns(conn, table)
+        first = page_query(table, columns, bounded=False)
+        after = page_query(table, columns)
+        before = page_query(table, columns, forward=False)
+        yield f"view_table:{table}:first", lambda sql=first: conn.execute(sql, (100,)).fetchall()
+        yield f"view_table:{table}:next", lambda sql=after, top=top: conn.execute(
+            sql, (rng.randint(1, top), 100)).fetchall()
+        yield f"view_table:{table}:previous", lambda sql=before, top=top: conn.execute(
+            sql, (rng.randint(1, top), 100)).fetchall()
+
+    # the low-stock list (formerly view_low_stock, now the alerts panel snapshot)
+    yield "low_stock", lambda: conn.execute(queries.LOW_STOCK).fetchall()
+    yield "expiring_30_days", lambda: stock.expiring_lots(conn, 30, today="2025-12-31")
+
+    # writes: each one commits
+    def add_sale():
+        try:
+            sales.post_sale(conn, rng.randint(1, max_cust), rng.choice(stocked), 1, "2026-01-01")
+        except sales.SaleError:
+            pass
+
+    def checkout():
+        lines = [(med_id, 1) for med_id in rng.sample(stocked, min(3, len(stocked)))]
+        try:
+            sales.post_cart(conn, rng.randint(1, max_cust), lines, "2026-01-01")
+        except sales.SaleError:
+            pass
+
+    def add_stock():
+        with conn:
+            stock.receive_lot(conn, rng.choice(stocked), 50, "2027-06-30", None, "2026-01-01")
+
+    yield "add_sale", add_sale
+    yield "checkout_cart_3", checkout
+    yield "add_stock", add_stock
+
+    yield "search:customers", lambda: search.search_customers(conn, rng.choice(workload.FIRST_NAMES)[:3])
+    yield "search:phones", lambda: search.search_customers(conn, f"9{rng.randrange(1000):03d}")
+    yield "reports:daily_month", lambda: reports.daily_revenue(conn, "2025-06-01", "2025-06-30")
+    yield "reports:top_medicines_year", lambda: reports.top_medicines(conn, "2025-01-01", "2025-12-31")
+    yield "ledger:as_of_one", lambda: ledger.stock_as_of(conn, "2026-01-01", rng.choice(stocked))
+
+
+def time_case(fn, iterations=ITERATIONS, warmup=WARMUP):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+    }
+
+
+def run(path, iterations=ITERATIONS, only=None, seed=1):
+    conn = db.open_connection(path)
+    rng = random.Random(seed)
+    results = {}
+    for name, fn in cases(conn, rng):
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = time_case(fn, iterations)
+        print(f"{name:32} median {results[name]['median_ms']:9.3f} ms   p95 {results[name]['p95_ms']:9.3f} ms",
+              file=sys.stderr)
+    conn.close()
+    return results
+
+
+def compare(baseline, current, threshold):
+    """[(name, old median, new median)] for cases slower than baseline by more than threshold."""
+    regressions = []
+    for name, result in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        before, after = old["median_ms"], result["median_ms"]
+        if after > before * (1 + threshold) and after - before > MIN_DELTA_MS:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="cached workload database (default: bench-<sales>.db)")
+    parser.add_argument("--sales", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-n", "--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("-k", dest="only", action="append", help="only cases whose name contains this")
+    parser.add_argument("-o", "--output", default="bench-results.json")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    template = args.db or f"bench-{args.sales}.db"
+    if not os.path.exists(template):
+        print(f"generating {template} ({args.sales} sales)", file=sys.stderr)
+        workload.generate(template, args.sales, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        shutil.copyfile(template, path)
+        results = run(path, args.iterations, args.only, args.seed)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "database": template,
+            "sales": args.sales,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "cases": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["cases"]
+        regressions = compare(baseline, results, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms ({after / before - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Row size and aggregate speed of Sales in the old and new storage encoding.
+
+    python bench_encoding.py                  # 200k sales
+    python bench_encoding.py --sales 1000000 -n 20
+
+Builds the same sales twice in a temporary database: as before migration
+12 (ISO text dates, REAL amounts) and as now (day numbers, integer cents,
+see codec.py), each with its SaleDate index. Prints bytes per row from
+dbstat, the timings of a total, a GROUP BY day, a GROUP BY medicine and a
+one-month range sum, and how far the REAL total drifts from the exact one.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+
+import codec
+from bench import time_case
+
+
+LAYOUTS = {
+    "text/real": ("TEXT", "REAL"),
+    "day/cents": ("INTEGER", "INTEGER"),
+}
+
+CREATE = """
+    CREATE TABLE "{table}" (
+        Sale_ID INTEGER PRIMARY KEY,
+        Cust_ID INTEGER,
+        Med_ID INTEGER,
+        SaleDate {date_type},
+        Quantity INTEGER,
+        TotalAmount {money_type})"""
+
+INDEX = 'CREATE INDEX "idx_{table}_date" ON "{table}" (SaleDate)'
+
+SIZE = """
+    SELECT SUM(pgsize) FROM dbstat
+    WHERE name IN (?, ?) AND aggregate = TRUE"""
+
+QUERIES = {
+    "sum_all": 'SELECT SUM(TotalAmount) FROM "{table}"',
+    "group_by_day": 'SELECT SaleDate, SUM(TotalAmount) FROM "{table}" GROUP BY SaleDate',
+    "group_by_medicine": 'SELECT Med_ID, SUM(TotalAmount) FROM "{table}" GROUP BY Med_ID',
+    "month_range": 'SELECT SUM(TotalAmount) FROM "{table}" WHERE SaleDate >= ? AND SaleDate < ?',
+}
+
+
+def _table(layout):
+    return "Sales_" + layout.replace("/", "_")
+
+
+def generate(count, seed):
+    """Sales rows as (cust, med, ISO date, qty, price) with prices in whole cents."""
+    rng = random.Random(seed)
+    prices = [round(rng.uniform(0.5, 250.0), 2) for _ in range(500)]
+    first = date(2025, 1, 1)
+    for _ in range(count):
+        med_id = rng.randrange(len(prices))
+        yield (rng.randint(1, 5000), med_id + 1, (first + timedelta(days=rng.randrange(365))).isoformat(),
+               rng.randint(1, 5), prices[med_id])
+
+
+def build(conn, rows):
+    for layout, (date_type, money_type) in LAYOUTS.items():
+        table = _table(layout)
+        conn.execute(CREATE.format(table=table, date_type=date_type, money_type=money_type))
+        conn.execute(INDEX.format(table=table))
+    text, integer = _table("text/real"), _table("day/cents")
+    with conn:
+        for cust, med, day, qty, price in rows:
+            # qty * price is what add_sale stored; the cents column is exact
+            conn.execute(f'INSERT INTO "{text}" (Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount) '
+                         'VALUES (?, ?, ?, ?, ?)', (cust, med, day, qty, qty * price))
+            conn.execute(f'INSERT INTO "{integer}" (Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount) '
+                         'VALUES (?, ?, ?, ?, ?)', (cust, med, codec.to_day(day), qty, qty * codec.to_cents(price)))
+    conn.execute("ANALYZE")
+
+
+def month_params(layout):
+    if layout == "text/real":
+        return ("2025-06-01", "2025-07-01")
+    return codec.day_range("2025-06")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "encoding.db"))
+        build(conn, generate(args.sales, args.seed))
+
+        print(f"{args.sales} sales")
+        print(f"{'':20}" + "".join(f"{layout:>14}" for layout in LAYOUTS))
+        sizes = [conn.execute(SIZE, (_table(layout), f"idx_{_table(layout)}_date")).fetchone()[0]
+                 for layout in LAYOUTS]
+        print(f"{'bytes/row':20}" + "".join(f"{size / args.sales:14.1f}" for size in sizes))
+        for name, sql in QUERIES.items():
+            medians = []
+            for layout in LAYOUTS:
+                query = sql.format(table=_table(layout))
+                params = month_params(layout) if "?" in query else ()
+                result = time_case(lambda: conn.execute(query, params).fetchall(), args.iterations, 2)
+                medians.append(result["median_ms"])
+            print(f"{name + ' ms':20}" + "".join(f"{m:14.3f}" for m in medians))
+
+        real = conn.execute(QUERIES["sum_all"].format(table=_table("text/real"))).fetchone()[0]
+        cents = conn.execute(QUERIES["sum_all"].format(table=_table("day/cents"))).fetchone()[0]
+        print(f"REAL total  {real!r}")
+        print(f"cents total {codec.format_money(cents)}  (REAL is off by {real - cents / 100:+.2e})")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Throughput of sale posting with several writer processes on one Med_ID.
+
+    python bench_sales.py --writers 4 --sales 500
+    python bench_sales.py --writers 4 --sales 500 --legacy
+
+--legacy runs the old read/check/insert/update sequence from add_sale for
+comparison. Each run uses a fresh database in a temporary directory.
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import codec
+import db
+import migrations
+import sales
+
+
+MED_ID = 1
+
+
+def setup(path, stock):
+    conn = db.open_connection(path)
+    migrations.migrate(conn)
+    with conn:
+        conn.execute("""
+            INSERT INTO Medicine (Med_ID, SupplierID, Brand, Price, ExpiryDate, ManufactureDate)
+            VALUES (?, 1, 'Paracetamol', 2.5, '2030-01-01', '2024-01-01')""", (MED_ID,))
+        # one lot; its trigger creates the Stock row both sale paths read
+        conn.execute("""
+            INSERT INTO StockLot (Med_ID, ExpiryDate, Quantity, LastUpdated)
+            VALUES (?, '2030-01-01', ?, '2024-01-01')""", (MED_ID, stock))
+    conn.close()
+
+
+def legacy_sale(conn, cust_id, med_id, qty):
+    # The pre-engine add_sale: four round trips and a check in Python.
+    cursor = conn.cursor()
+    cursor.execute("SELECT Price FROM Medicine WHERE Med_ID=?", (med_id,))
+    price = cursor.fetchone()[0]
+    cursor.execute("SELECT StockQuantity FROM Stock WHERE Med_ID=?", (med_id,))
+    available = cursor.fetchone()[0]
+    if available < qty:
+        raise sales.SaleError("Insufficient Stock", "not enough stock")
+    today = datetime.now().strftime("%Y-%m-%d")
+    cursor.execute("INSERT INTO Sales (Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount) VALUES (?, ?, ?, ?, ?)",
+                   (cust_id, med_id, codec.to_day(today), qty, qty * codec.to_cents(price)))
+    cursor.execute("UPDATE Stock SET StockQuantity = StockQuantity - ?, LastUpdated = ? WHERE Med_ID = ?",
+                   (qty, today, med_id))
+    conn.commit()
+
+
+def writer(path, count, legacy, start, results):
+    conn = db.open_connection(path)
+    ok = rejected = errors = 0
+    start.wait()
+    for i in range(count):
+        try:
+            if legacy:
+                legacy_sale(conn, 1, MED_ID, 1)
+            else:
+                sales.post_sale(conn, 1, MED_ID, 1)
+            ok += 1
+        except sales.SaleError:
+            rejected += 1
+        except sqlite3.Error:
+            conn.rollback()
+            errors += 1
+    conn.close()
+    results.put((ok, rejected, errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--sales", type=int, default=500, help="sales attempted per writer")
+    parser.add_argument("--stock", type=int, default=None,
+                        help="starting stock (default: 90%% of all attempts, to exercise rejection)")
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    attempts = args.writers * args.sales
+    stock = args.stock if args.stock is not None else attempts * 9 // 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup(path, stock)
+
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=writer, args=(path, args.sales, args.legacy, start, results))
+                 for _ in range(args.writers)]
+        for p in procs:
+            p.start()
+        t0 = time.perf_counter()
+        start.set()
+        totals = [results.get() for _ in procs]
+        elapsed = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+
+        ok, rejected, errors = (sum(col) for col in zip(*totals))
+        conn = db.open_connection(path)
+        remaining = conn.execute("SELECT StockQuantity FROM Stock WHERE Med_ID=?", (MED_ID,)).fetchone()[0]
+        sold = conn.execute("SELECT COALESCE(SUM(Quantity), 0) FROM Sales WHERE Med_ID=?", (MED_ID,)).fetchone()[0]
+        conn.close()
+
+    print(f"mode:        {'legacy' if args.legacy else 'post_sale'}")
+    print(f"writers:     {args.writers}")
+    print(f"attempts:    {attempts}  (starting stock {stock})")
+    print(f"posted:      {ok}")
+    print(f"rejected:    {rejected}  (insufficient stock)")
+    print(f"errors:      {errors}  (busy, locked or constraint failures)")
+    print(f"elapsed:     {elapsed:.3f}s")
+    print(f"throughput:  {ok / elapsed:.0f} sales/s")
+    consistent = sold + remaining == stock and remaining >= 0
+    print(f"consistent:  {consistent}  (sold {sold}, remaining {remaining})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import threading
+import time
+
+import db
+from sales import SaleError, _line, _merge_lines
+
+
+# Minimum seconds between PRAGMA data_version checks made by lookups.
+CHECK_INTERVAL = 0.5
+
+
+class MedicineRecord:
+    __slots__ = ('med_id', 'supplier_id', 'brand', 'price', 'expiry')
+
+    def __init__(self, med_id, supplier_id, brand, price, expiry):
+        self.med_id = med_id
+        self.supplier_id = supplier_id
+        self.brand = brand
+        self.price = price
+        self.expiry = expiry
+
+
+class SupplierRecord:
+    __slots__ = ('supplier_id', 'name', 'contact')
+
+    def __init__(self, supplier_id, name, contact):
+        self.supplier_id = supplier_id
+        self.name = name
+        self.contact = contact
+
+
+MEDICINE_COLUMNS = "Med_ID, SupplierID, Brand, Price, ExpiryDate"
+SUPPLIER_COLUMNS = "Supplier_ID, Name, Contact"
+
+LAST_CHANGE = "SELECT COALESCE(MAX(Change_ID), 0) FROM CatalogChanges"
+OLDEST_CHANGE = "SELECT MIN(Change_ID) FROM CatalogChanges"
+CHANGES_SINCE = "SELECT Change_ID, TableName, RowKey FROM CatalogChanges WHERE Change_ID > ?"
+
+
+# --- CATALOG CACHE ---
+class Catalog:
+    """In-memory copy of Medicine and Supplier for lookups on the sale path.
+
+    The cache has its own connection, so commits from the app's worker
+    threads and from other processes both show up as a PRAGMA data_version
+    change. When that happens, it reads the CatalogChanges log written by
+    triggers and reloads only the rows listed there.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._conn = None
+        self._lock = threading.RLock()
+        self.medicines = {}
+        self.suppliers = {}
+        self._supplier_choices = None
+        self._last_change = None
+        self._data_version = None
+        self._checked_at = 0.0
+
+    # --- lookups ---
+    def medicine(self, med_id):
+        return self._get('medicines', med_id)
+
+    def supplier(self, supplier_id):
+        return self._get('suppliers', supplier_id)
+
+    def _get(self, attr, key):
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            return None
+        self._maybe_refresh()
+        record = getattr(self, attr).get(key)
+        if record is None:
+            # a miss may be a row added a moment ago; check before saying no
+            self.refresh()
+            record = getattr(self, attr).get(key)
+        return record
+
+    def supplier_choices(self):
+        """Combobox strings ("ID: Name") ordered by name; rebuilt only after supplier changes."""
+        self._maybe_refresh()
+        choices = self._supplier_choices
+        if choices is None:
+            ordered = sorted(self.suppliers.values(), key=lambda s: (s.name, s.supplier_id))
+            choices = self._supplier_choices = [f"{s.supplier_id}: {s.name}" for s in ordered]
+        return choices
+
+    def quote_lines(self, lines):
+        """Price (Med_ID, qty) lines from memory; same result as sales.quote_lines."""
+        merged = _merge_lines(lines)
+        quoted = []
+        for med_id, qty in merged.items():
+            record = self.medicine(med_id)
+            if record is None:
+                raise SaleError("Error", f"Medicine not found: {med_id}")
+            quoted.append(_line(med_id, record.brand, qty, record.price))
+        return quoted
+
+    # --- loading ---
+    def _connection(self):
+        if self._conn is None:
+            self._conn = db.open_connection(self._path)
+        return self._conn
+
+    def load(self):
+        """(Re)load everything; safe to call from a worker thread."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                self._last_change = conn.execute(LAST_CHANGE).fetchone()[0]
+                self.medicines = {row[0]: MedicineRecord(*row) for row in conn.execute(
+                    f"SELECT {MEDICINE_COLUMNS} FROM Medicine")}
+                self.suppliers = {row[0]: SupplierRecord(*row) for row in conn.execute(
+                    f"SELECT {SUPPLIER_COLUMNS} FROM Supplier")}
+            self._supplier_choices = None
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            self._checked_at = time.monotonic()
+
+    def refresh(self):
+        """Apply changes committed since the last check; cheap when there are none."""
+        with self._lock:
+            if self._last_change is None:
+                self.load()
+                return
+            conn = self._connection()
+            self._checked_at = time.monotonic()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+
+            oldest = conn.execute(OLDEST_CHANGE).fetchone()[0]
+            if oldest is not None and oldest > self._last_change + 1:
+                # fell behind the pruned log (e.g. a bulk import): start over
+                self.load()
+                return
+            changes = conn.execute(CHANGES_SINCE, (self._last_change,)).fetchall()
+            if not changes:
+                return
+            for table in ("Medicine", "Supplier"):
+                keys = {key for _, name, key in changes if name == table}
+                if keys:
+                    self._reload_rows(conn, table, keys)
+            self._last_change = changes[-1][0]
+
+    def _reload_rows(self, conn, table, keys):
+        if table == "Medicine":
+            target, columns, key_col, record = self.medicines, MEDICINE_COLUMNS, "Med_ID", MedicineRecord
+        else:
+            target, columns, key_col, record = self.suppliers, SUPPLIER_COLUMNS, "Supplier_ID", SupplierRecord
+            self._supplier_choices = None
+        keys = list(keys)
+        found = set()
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            marks = ", ".join("?" * len(part))
+            for row in conn.execute(f"SELECT {columns} FROM {table} WHERE {key_col} IN ({marks})", part):
+                target[row[0]] = record(*row)
+                found.add(row[0])
+        for key in keys:
+            if key not in found:
+                target.pop(key, None)
+
+    def _maybe_refresh(self):
+        if self._last_change is None:
+            self.load()
+        elif time.monotonic() - self._checked_at >= CHECK_INTERVAL:
+            self.refresh()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared by the whole process.
+catalog = Catalog()
@@ -1,11 +1,12 @@
-import sqlite3
-
-conn = sqlite3.connect('pharmacy.db')
-cursor = conn.cursor()
-
-cursor.execute("SELECT * FROM Customer")
-rows = cursor.fetchall()
-conn.close()
-
-print("Customer table contents:")
-print(rows)
+import db
+from export import stream_batches
+
+conn = db.open_connection()
+batches = stream_batches(conn, "SELECT * FROM Customer")
+
+print("Customer table contents:")
+print(next(batches))
+for rows in batches:
+    for row in rows:
+        print(row)
+conn.close()
@@ -0,0 +1,100 @@
+"""Storage encodings of the Sales tables: day numbers and integer cents.
+
+Sales, the daily aggregate tables and the monthly archives store SaleDate
+as days since 1970-01-01 and TotalAmount / Revenue as integer cents
+(migration 12). Integers take fewer bytes than ISO text and REAL, compare
+as plain numbers and sum exactly. Everything outside the storage layer
+keeps ISO dates and decimal amounts: encode on the way in, decode on the
+way out, or decode in SQL (Codec.sql) when streaming rows.
+"""
+from collections import namedtuple
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# encode(value) -> stored integer, decode(integer) -> value, sql: decoding SQL for "{}"
+Codec = namedtuple('Codec', 'encode decode sql')
+
+
+# --- DATES ---
+def to_day(value):
+    """Day number of a date or an ISO date string."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal() - _EPOCH
+
+
+MIN_DAY = to_day(date.min)
+MAX_DAY = to_day(date.max)
+
+
+def to_iso(day):
+    return date.fromordinal(day + _EPOCH).isoformat()
+
+
+def day_range(text):
+    """(first, end) day numbers of "YYYY", "YYYY-MM" or "YYYY-MM-DD"; end is exclusive.
+
+    Raises ValueError for anything else.
+    """
+    parts = [int(p) for p in text.split("-")]
+    if len(parts) == 1:
+        first, end = date(parts[0], 1, 1), date(parts[0] + 1, 1, 1)
+    elif len(parts) == 2:
+        year, month = parts
+        first = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+    elif len(parts) == 3:
+        first = date(*parts)
+        return to_day(first), to_day(first) + 1
+    else:
+        raise ValueError(f"Not a date: {text!r}")
+    return to_day(first), to_day(end)
+
+
+# --- MONEY ---
+def to_cents(amount):
+    """Integer cents of an amount (number or decimal string), rounded half up."""
+    return int((Decimal(str(amount)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def to_money(cents):
+    return cents / 100
+
+
+def format_money(cents):
+    return f"{cents / 100:.2f}"
+
+
+DAY = Codec(to_day, to_iso, "date({} * 86400, 'unixepoch')")
+CENTS = Codec(to_cents, to_money, "{} / 100.0")
+
+# Encoded columns of each table (SalesHistory is archive.py's view over Sales).
+ENCODED = {
+    "Sales": {"SaleDate": DAY, "TotalAmount": CENTS},
+    "SalesHistory": {"SaleDate": DAY, "TotalAmount": CENTS},
+    "SalesDailyMedicine": {"SaleDate": DAY, "Revenue": CENTS},
+    "SalesDailyCustomer": {"SaleDate": DAY, "Revenue": CENTS},
+    "SalesArchive": {"Revenue": CENTS},
+}
+
+
+def codecs(table, columns):
+    """The Codec of each column, or None where it is stored as it is shown."""
+    encoded = ENCODED.get(table, {})
+    return [encoded.get(column) for column in columns]
+
+
+def decode_row(row_codecs, row):
+    return tuple(value if c is None or value is None else c.decode(value) for c, value in zip(row_codecs, row))
+
+
+def decoded_columns(table, columns, prefix=""):
+    """SELECT list that decodes the table's encoded columns in SQL, keeping their names."""
+    select = []
+    for column, c in zip(columns, codecs(table, columns)):
+        name = f'{prefix}"{column}"'
+        select.append(f'{c.sql.format(name)} AS "{column}"' if c else name)
+    return ", ".join(select)
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import threading
+
+import instrument
+import validation
+
+
+DB_PATH = os.environ.get('PHARMACY_DB', 'pharmacy.db')
+
+# Applied once to every connection when it is opened.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-32000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Prepared statements kept per connection by the sqlite3 module.
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections = []
+
+
+# --- CONNECTIONS ---
+def open_connection(path=None):
+    """Open a new connection with the app's PRAGMAs and functions applied.
+
+    Its statements are timed by instrument.py once instrument.enable() has run.
+    URI filenames are allowed, so archives can be attached read-only.
+    """
+    conn = sqlite3.connect(path or DB_PATH,
+                           cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False,
+                           uri=True,
+                           factory=instrument.Connection if instrument.ENABLED else sqlite3.Connection)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    conn.create_function("REGEXP", 2, validation.regexp, deterministic=True)
+    return conn
+
+
+def get_connection():
+    """Return the calling thread's long-lived connection, opening it on first use.
+
+    Callers must not close it; use ``with conn:`` to commit or roll back.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = open_connection()
+        _local.conn = conn
+        with _lock:
+            _connections.append(conn)
+    return conn
+
+
+def close_all():
+    with _lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+    _local.__dict__.pop('conn', None)
@@ -0,0 +1,179 @@
+"""Stream a table or the sales report to CSV, JSON Lines or Parquet.
+
+    python export.py Customer -o customers.csv
+    python export.py sales-report --from 2024-04-01 --to 2024-04-30 --format jsonl
+    python export.py Sales --format parquet -o sales.parquet
+
+Rows are read with fetchmany and written batch by batch, so memory use does
+not depend on table size. --from/--to filter on Sales.SaleDate (inclusive)
+and apply to Sales and sales-report, which include archived months (see
+archive.py) and come out ordered by Sale_ID within each group of archives
+attached. Dates and amounts stored as day numbers and cents (codec.py) are
+written as ISO dates and decimals. Parquet output needs pyarrow.
+"""
+import argparse
+import csv
+import json
+import sys
+
+import archive
+import codec
+import db
+import migrations
+
+
+BATCH_SIZE = 5000
+
+# Sales joined to what a bookkeeper needs to read it.
+SALES_REPORT = f"""
+    SELECT s.Sale_ID, {codec.DAY.sql.format("s.SaleDate")} AS SaleDate, s.Cust_ID, c.Name AS CustomerName,
+           s.Med_ID, m.Brand, s.Quantity, m.Price AS UnitPrice, {codec.CENTS.sql.format("s.TotalAmount")} AS TotalAmount
+    FROM {{sales}} s
+    LEFT JOIN Medicine m ON m.Med_ID = s.Med_ID
+    LEFT JOIN Customer c ON c.Cust_ID = s.Cust_ID
+"""
+
+
+# --- QUERIES ---
+def table_names(conn):
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+
+
+def build_query(conn, source, date_from=None, date_to=None, sales="Sales"):
+    """Return (sql, params) for a table name or 'sales-report'.
+
+    sales names the table or view that Sales rows are read from.
+    """
+    if source == "sales-report":
+        sql, date_col, order = SALES_REPORT.format(sales=sales), "s.SaleDate", "s.Sale_ID"
+    elif source in table_names(conn):
+        columns = [r[1] for r in conn.execute(f'PRAGMA table_info("{source}")')]
+        select = codec.decoded_columns(source, columns)
+        if source == "Sales":
+            sql, date_col, order = f'SELECT {select} FROM "{sales}"', '"SaleDate"', "Sale_ID"
+        else:
+            sql, date_col, order = f'SELECT {select} FROM "{source}"', '"SaleDate"', "rowid"
+            if date_from or date_to:
+                raise ValueError("--from/--to only apply to Sales and sales-report")
+    else:
+        raise ValueError(f"Unknown table: {source}")
+
+    where, params = [], []
+    if date_from:
+        where.append(f"{date_col} >= ?")
+        params.append(codec.to_day(date_from))
+    if date_to:
+        where.append(f"{date_col} <= ?")
+        params.append(codec.to_day(date_to))
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + f" ORDER BY {order}", params
+
+
+def stream_batches(conn, sql, params=(), batch_size=BATCH_SIZE):
+    """Yield (columns, rows) once for the header, then lists of rows."""
+    cursor = conn.execute(sql, params)
+    yield [d[0] for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def sales_batches(conn, source, date_from=None, date_to=None, batch_size=BATCH_SIZE):
+    """stream_batches for Sales or 'sales-report', live and archived months together."""
+    columns = None
+    for first, last in archive.spans(conn, date_from, date_to):
+        with archive.history(conn, first, last) as sales:
+            sql, params = build_query(conn, source, first, last, sales)
+            batches = stream_batches(conn, sql, params, batch_size)
+            if columns is None:
+                columns = next(batches)
+                yield columns
+            else:
+                next(batches)
+            yield from batches
+
+
+# --- WRITERS ---
+def write_csv(batches, out):
+    writer = csv.writer(out)
+    writer.writerow(next(batches))
+    count = 0
+    for rows in batches:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def write_jsonl(batches, out):
+    columns = next(batches)
+    count = 0
+    for rows in batches:
+        out.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+        count += len(rows)
+    return count
+
+
+def write_parquet(batches, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet export needs pyarrow (pip install pyarrow)")
+    columns = next(batches)
+    writer = None
+    count = 0
+    try:
+        for rows in batches:
+            table = pa.Table.from_pylist([dict(zip(columns, row)) for row in rows])
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            count += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="table name or 'sales-report'")
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    parser.add_argument("-o", "--output", help="output file (default: stdout; required for parquet)")
+    parser.add_argument("--from", dest="date_from", help="first SaleDate to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="last SaleDate to include (YYYY-MM-DD)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    conn = db.open_connection()
+    migrations.migrate(conn)
+    if args.source in ("Sales", "sales-report"):
+        batches = sales_batches(conn, args.source, args.date_from, args.date_to, args.batch_size)
+    else:
+        try:
+            sql, params = build_query(conn, args.source, args.date_from, args.date_to)
+        except ValueError as e:
+            parser.error(str(e))
+        batches = stream_batches(conn, sql, params, args.batch_size)
+
+    if args.format == "parquet":
+        if not args.output:
+            parser.error("--output is required for parquet")
+        count = write_parquet(batches, args.output)
+    else:
+        write = write_csv if args.format == "csv" else write_jsonl
+        if args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                count = write(batches, out)
+        else:
+            count = write(batches, sys.stdout)
+    conn.close()
+    print(f"exported {count} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
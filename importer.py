@@ -0,0 +1,270 @@
+"""Bulk import of Medicine, Stock, Supplier and Customer rows.
+
+    python importer.py supplier suppliers.csv
+    python importer.py medicine medicines.jsonl --rejects bad_meds.csv
+
+Input is CSV with a header row, JSON Lines (.jsonl/.ndjson) or a JSON array
+(.json). Columns use the table's column names; the ID column is optional.
+Stock rows are received as new lots, like Receive Stock in the app;
+ExpiryDate and LotNumber are optional.
+Rows that fail validation or a constraint are written to the rejects file
+with the line number and reason; everything else is loaded, committed
+every COMMIT_EVERY rows. A failed import keeps the transactions already
+committed. Customer and Medicine imports suspend their per-row search
+index trigger inside each transaction and index that transaction's rows
+with one statement before it commits, so the trigger is never missing
+outside the import's own transaction.
+"""
+import argparse
+import csv
+import itertools
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import db
+import migrations
+import stock
+import validation
+
+
+CHUNK_SIZE = 10000
+
+# Rows per transaction; chunks inside one are wrapped in savepoints.
+COMMIT_EVERY = 200000
+
+# Tables whose FTS5 index (migration 7) is filled per transaction instead of
+# per row: (index, table, key, indexed column).
+SEARCH_INDEXES = {
+    "customer": ("CustomerSearch", "Customer", "Cust_ID", "Name"),
+    "medicine": ("MedicineSearch", "Medicine", "Med_ID", "Brand"),
+}
+
+# Rows with an ID above the table's previous highest are all this transaction's.
+INDEX_ABOVE = "INSERT INTO {index} (rowid, {column}) SELECT {key}, {column} FROM {table} WHERE {key} > ?"
+INDEX_KEYS = """
+    INSERT INTO {index} (rowid, {column}) SELECT {key}, {column} FROM {table}
+    WHERE {key} IN (SELECT value FROM json_each(?))"""
+
+
+# --- TABLE SPECS ---
+# validator, INSERT statement, and the referenced key (table, column, index in
+# the validated tuple) that must already exist.
+TABLES = {
+    "customer": (
+        validation.validate_customer_row,
+        "INSERT INTO Customer (Cust_ID, Name, Address, PhoneNumber) VALUES (?, ?, ?, ?)",
+        None,
+    ),
+    "supplier": (
+        validation.validate_supplier_row,
+        "INSERT INTO Supplier (Supplier_ID, Name, Contact) VALUES (?, ?, ?)",
+        None,
+    ),
+    "medicine": (
+        validation.validate_medicine_row,
+        """INSERT INTO Medicine (Med_ID, SupplierID, Brand, Price, ExpiryDate, ManufactureDate)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        ("Supplier", "Supplier_ID", 1),
+    ),
+    "stock": (
+        validation.validate_stock_row,
+        stock.RECEIVE_LOT,
+        ("Medicine", "Med_ID", 0),
+    ),
+}
+
+
+# --- READERS ---
+def iter_rows(path):
+    """Yield (line_no, dict) pairs from a CSV, JSON Lines or JSON file."""
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+    elif path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            for line_no, row in enumerate(json.load(f), 1):
+                yield line_no, row
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class RejectWriter:
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line_no, row, reason):
+        if self._file is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["line", "reason", "row"])
+        self._writer.writerow([line_no, reason, json.dumps(row)])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+# --- LOADING ---
+def _check_references(conn, good, ref, rows_by_line, rejects):
+    # Referenced keys are checked for the whole chunk with one query.
+    if ref is None or not good:
+        return good
+    table, column, index = ref
+    keys = {values[index] for _, values in good}
+    found = set()
+    for part in chunked(keys, 500):
+        marks = ", ".join("?" * len(part))
+        found.update(r[0] for r in conn.execute(
+            f"SELECT {column} FROM {table} WHERE {column} IN ({marks})", part))
+    kept = []
+    for line_no, values in good:
+        if values[index] in found:
+            kept.append((line_no, values))
+        else:
+            rejects.write(line_no, rows_by_line[line_no], f"{table} {values[index]} does not exist")
+    return kept
+
+
+def _insert_chunk(conn, sql, good, rows_by_line, rejects):
+    """Insert the validated rows; returns the values that went in."""
+    conn.execute("SAVEPOINT chunk")
+    try:
+        conn.executemany(sql, [values for _, values in good])
+        conn.execute("RELEASE chunk")
+        return [values for _, values in good]
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO chunk")
+    # Something in the chunk broke a constraint: retry row by row to find it.
+    loaded = []
+    for line_no, values in good:
+        try:
+            conn.execute(sql, values)
+            loaded.append(values)
+        except sqlite3.IntegrityError as e:
+            rejects.write(line_no, rows_by_line[line_no], str(e))
+    conn.execute("RELEASE chunk")
+    return loaded
+
+
+class _Transaction:
+    """One COMMIT_EVERY batch; for a searched table, with its insert trigger suspended."""
+
+    def __init__(self, conn, table):
+        self.conn = conn
+        self.search = SEARCH_INDEXES.get(table)
+        self.trigger_sql = None
+        conn.execute("BEGIN")
+        if self.search is None:
+            return
+        index, base, key, _ = self.search
+        self.highest = conn.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {base}").fetchone()[0]
+        self.explicit = []
+        name = f"trg_{index.lower()}_insert"
+        self.trigger_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                        (name,)).fetchone()[0]
+        conn.execute(f"DROP TRIGGER {name}")
+
+    def loaded(self, rows):
+        # rows given an ID at or below the old highest are indexed by key
+        if self.search is not None:
+            self.explicit.extend(values[0] for values in rows
+                                 if values[0] is not None and values[0] <= self.highest)
+
+    def commit(self):
+        if self.search is not None:
+            index, base, key, column = self.search
+            names = {"index": index, "table": base, "key": key, "column": column}
+            self.conn.execute(INDEX_ABOVE.format(**names), (self.highest,))
+            if self.explicit:
+                self.conn.execute(INDEX_KEYS.format(**names), (json.dumps(self.explicit),))
+            self.conn.execute(self.trigger_sql)
+        self.conn.execute("COMMIT")
+
+    def rollback(self):
+        # also brings the dropped trigger back
+        self.conn.execute("ROLLBACK")
+
+
+def import_rows(conn, table, rows, rejects, chunk_size=CHUNK_SIZE, commit_every=COMMIT_EVERY):
+    """Load (line_no, dict) rows into table; returns (read, loaded)."""
+    validator, sql, ref = TABLES[table]
+    today = datetime.now().strftime("%Y-%m-%d")
+    read = loaded = pending = 0
+    conn.isolation_level = None
+    batch = _Transaction(conn, table)
+    try:
+        for chunk in chunked(rows, chunk_size):
+            read += len(chunk)
+            rows_by_line = dict(chunk)
+            good, bad = validation.validate_batch(chunk, validator)
+            for line_no, row, reason in bad:
+                rejects.write(line_no, row, reason)
+            good = _check_references(conn, good, ref, rows_by_line, rejects)
+            if table == "stock":
+                good = [(line_no, values + (today,)) for line_no, values in good]
+            inserted = _insert_chunk(conn, sql, good, rows_by_line, rejects)
+            batch.loaded(inserted)
+            loaded += len(inserted)
+            pending += len(chunk)
+            if commit_every and pending >= commit_every:
+                batch.commit()
+                batch = _Transaction(conn, table)
+                pending = 0
+        batch.commit()
+    except BaseException:
+        batch.rollback()
+        raise
+    finally:
+        conn.isolation_level = ""
+    return read, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path")
+    parser.add_argument("--rejects", help="file for rejected rows (default: <path>.rejects.csv)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    conn = db.open_connection()
+    migrations.migrate(conn)
+    rejects = RejectWriter(args.rejects or args.path + ".rejects.csv")
+    start = time.perf_counter()
+    try:
+        read, loaded = import_rows(conn, args.table, iter_rows(args.path), rejects, args.chunk_size)
+    finally:
+        rejects.close()
+        conn.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"read {read} rows, loaded {loaded}, rejected {rejects.count} "
+          f"in {elapsed:.2f}s ({read / elapsed if elapsed else 0:.0f} rows/s)")
+    if rejects.count:
+        print(f"rejected rows written to {rejects.path}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""Timing for every database call, grouped by the operation that made it.
+
+    PHARMACY_SLOW_MS=50 PHARMACY_SLOW_LOG=slow.log python main.py
+    python instrument.py slow.log               # summarise a slow log
+
+Once enable() has been called, connections from db.open_connection() are
+built from the Connection and Cursor classes below. main.py calls it for
+the app; other scripts (the importer, api.py, bench.py, the CLIs) open
+plain connections unless PHARMACY_INSTRUMENT=1. Each statement is timed from execute to its last
+fetch, and is recorded with:
+- its SQL
+- the shape of its parameters (never the values)
+- the rows it returned or changed
+- how many statements SQLite ran for it, counting triggers (from the trace callback)
+- its VM work (from the progress handler)
+
+For BEGIN IMMEDIATE and BEGIN EXCLUSIVE, the time is counted as lock
+wait. That is where busy_timeout waits for the write lock.
+
+Work done inside ``with operation("add_sale"):`` is grouped under that
+name. Operations and statements keep latency histograms. Any operation or
+statement slower than SLOW_MS is appended to SLOW_LOG.
+PHARMACY_INSTRUMENT=0 keeps it off in the app as well.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+
+SETTING = os.environ.get("PHARMACY_INSTRUMENT", "")
+ENABLED = SETTING == "1"
+SLOW_MS = float(os.environ.get("PHARMACY_SLOW_MS", "100"))
+SLOW_LOG = os.environ.get("PHARMACY_SLOW_LOG", "slow_queries.log")
+
+# The progress handler runs once per this many SQLite VM instructions.
+PROGRESS_STEPS = 10000
+
+# Distinct statements tracked; any beyond this are counted under OTHER_SQL.
+MAX_STATEMENTS = 500
+OTHER_SQL = "(other statements)"
+
+NO_OPERATION = "-"
+
+# Histogram bucket upper bounds in ms: 25% apart, from 10 us to about 10 minutes.
+BOUNDS = [0.01 * 1.25 ** i for i in range(82)]
+
+LOCK_WAIT_RE = re.compile(r"\s*BEGIN\s+(IMMEDIATE|EXCLUSIVE)", re.IGNORECASE)
+
+_local = threading.local()
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+# statements of cursors dropped before their last fetch, recorded later by
+# _finish_dropped(); a finalizer must not take _lock
+_dropped = deque()
+operations = {}
+statements = {}
+
+
+class Histogram:
+    """Latency counts in fixed buckets; percentiles are within 25%."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect_left(BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(BOUNDS[i], self.max) if i < len(BOUNDS) else self.max
+        return self.max
+
+
+class OperationStats:
+    __slots__ = ("latency", "statements", "rows", "lock_wait_ms", "vm_steps")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statements = 0
+        self.rows = 0
+        self.lock_wait_ms = 0.0
+        self.vm_steps = 0
+
+
+class StatementStats:
+    __slots__ = ("latency", "rows", "executed", "shape")
+
+    def __init__(self, shape):
+        self.latency = Histogram()
+        self.rows = 0
+        self.executed = 0
+        self.shape = shape
+
+
+class _Running:
+    # totals of the operation in progress on this thread
+    __slots__ = ("name", "statements", "rows", "lock_wait_ms", "vm_steps")
+
+    def __init__(self, name):
+        self.name = name
+        self.statements = 0
+        self.rows = 0
+        self.lock_wait_ms = 0.0
+        self.vm_steps = 0
+
+
+class _Statement:
+    __slots__ = ("sql", "parameters", "operation", "elapsed", "rows", "executed", "vm_steps", "done")
+
+    def __init__(self, sql, parameters):
+        # parameters are kept only to describe their shape; None for executemany
+        self.sql = sql
+        self.parameters = parameters
+        self.operation = getattr(_local, "running", None)
+        self.elapsed = 0.0
+        self.rows = 0
+        self.executed = 0
+        self.vm_steps = 0
+        self.done = False
+
+
+def enable():
+    """Time connections opened from now on, unless PHARMACY_INSTRUMENT=0."""
+    global ENABLED
+    ENABLED = SETTING != "0"
+
+
+# --- OPERATIONS ---
+@contextmanager
+def operation(name):
+    """Group the database calls made inside the block under name."""
+    outer = getattr(_local, "running", None)
+    running = _local.running = _Running(name)
+    start = time.perf_counter()
+    try:
+        yield running
+    finally:
+        _local.running = outer
+        _record_operation(running, (time.perf_counter() - start) * 1000)
+
+
+def timed(name, fn, *args):
+    """fn(*args) as operation name; for executor tasks."""
+    with operation(name):
+        return fn(*args)
+
+
+def _record_operation(running, ms):
+    _finish_dropped()
+    with _lock:
+        stats = operations.get(running.name)
+        if stats is None:
+            stats = operations[running.name] = OperationStats()
+        stats.latency.add(ms)
+        stats.statements += running.statements
+        stats.rows += running.rows
+        stats.lock_wait_ms += running.lock_wait_ms
+        stats.vm_steps += running.vm_steps
+    if ms >= SLOW_MS:
+        _log_slow("operation", running.name, ms,
+                  f"{running.statements} statement(s), {running.rows} row(s), "
+                  f"lock wait {running.lock_wait_ms:.1f}ms")
+
+
+# --- STATEMENTS ---
+@lru_cache(maxsize=1024)
+def _sql_info(sql):
+    # (one-line SQL, whether its time is lock wait)
+    return " ".join(sql.split()), LOCK_WAIT_RE.match(sql) is not None
+
+
+def _shape(parameters):
+    if parameters is None:
+        return "many"
+    if isinstance(parameters, dict):
+        return "named:" + ",".join(sorted(parameters))
+    try:
+        return f"{len(parameters)} param(s)"
+    except TypeError:
+        return "params"
+
+
+def _finish(stmt):
+    if stmt.done:
+        return
+    stmt.done = True
+    ms = stmt.elapsed * 1000
+    sql, is_lock_wait = _sql_info(stmt.sql)
+    lock_wait = ms if is_lock_wait else 0.0
+    running = stmt.operation
+    op_name = running.name if running is not None else NO_OPERATION
+    with _lock:
+        key = (op_name, sql)
+        stats = statements.get(key)
+        if stats is None:
+            if len(statements) >= MAX_STATEMENTS:
+                key = (op_name, OTHER_SQL)
+                stats = statements.get(key)
+            if stats is None:
+                stats = statements[key] = StatementStats(_shape(stmt.parameters))
+        stats.latency.add(ms)
+        stats.rows += stmt.rows
+        stats.executed += stmt.executed
+        if running is not None:
+            running.statements += 1
+            running.rows += stmt.rows
+            running.lock_wait_ms += lock_wait
+            running.vm_steps += stmt.vm_steps
+    if ms >= SLOW_MS:
+        _log_slow("statement", op_name, ms,
+                  f"{stmt.rows} row(s), {_shape(stmt.parameters)}, {stmt.executed} run, "
+                  f"{stmt.vm_steps} vm steps, lock wait {lock_wait:.1f}ms\t{sql}")
+
+
+def _finish_dropped():
+    while _dropped:
+        try:
+            stmt = _dropped.popleft()
+        except IndexError:
+            return
+        _finish(stmt)
+
+
+def _log_slow(kind, name, ms, detail):
+    line = f"{datetime.now().isoformat(timespec='milliseconds')}\t{kind}\t{name}\t{ms:.1f}ms\t{detail}\n"
+    with _log_lock:
+        try:
+            with open(SLOW_LOG, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass
+
+
+def _trace(sql):
+    # called by SQLite for every statement it starts, trigger bodies included
+    stmt = getattr(_local, "statement", None)
+    if stmt is not None:
+        stmt.executed += 1
+
+
+def _progress():
+    stmt = getattr(_local, "statement", None)
+    if stmt is not None:
+        stmt.vm_steps += PROGRESS_STEPS
+    return 0
+
+
+def _run(stmt, fn, *args):
+    _local.statement = stmt
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        stmt.elapsed += time.perf_counter() - start
+        _local.statement = None
+
+
+class Cursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute to its last row."""
+
+    _stmt = None
+
+    def _execute(self, fn, sql, parameters, shape_parameters):
+        _finish_dropped()
+        if self._stmt is not None:
+            _finish(self._stmt)
+        stmt = self._stmt = _Statement(sql, shape_parameters)
+        try:
+            _run(stmt, fn, sql, parameters)
+        except BaseException:
+            _finish(stmt)
+            raise
+        if self.description is None:
+            stmt.rows = max(self.rowcount, 0)
+            _finish(stmt)
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._execute(super().execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._execute(super().executemany, sql, seq_of_parameters, None)
+
+    def fetchone(self):
+        stmt = self._stmt
+        if stmt is None or stmt.done:
+            return super().fetchone()
+        row = _run(stmt, super().fetchone)
+        if row is None:
+            _finish(stmt)
+        else:
+            stmt.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        stmt = self._stmt
+        size = self.arraysize if size is None else size
+        if stmt is None or stmt.done:
+            return super().fetchmany(size)
+        rows = _run(stmt, super().fetchmany, size)
+        stmt.rows += len(rows)
+        if len(rows) < size:
+            _finish(stmt)
+        return rows
+
+    def fetchall(self):
+        stmt = self._stmt
+        if stmt is None or stmt.done:
+            return super().fetchall()
+        rows = _run(stmt, super().fetchall)
+        stmt.rows += len(rows)
+        _finish(stmt)
+        return rows
+
+    def __next__(self):
+        stmt = self._stmt
+        if stmt is None or stmt.done:
+            return super().__next__()
+        try:
+            row = _run(stmt, super().__next__)
+        except StopIteration:
+            _finish(stmt)
+            raise
+        stmt.rows += 1
+        return row
+
+    def close(self):
+        if self._stmt is not None:
+            _finish(self._stmt)
+        super().close()
+
+    def __del__(self):
+        # statements read with a single fetchone() end when their cursor is
+        # dropped; queued, since GC may run this while the thread holds _lock
+        stmt = getattr(self, "_stmt", None)
+        if stmt is not None and not stmt.done:
+            _dropped.append(stmt)
+
+
+class Connection(sqlite3.Connection):
+    """Connection whose statements, commits and rollbacks are all timed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_trace)
+        self.set_progress_handler(_progress, PROGRESS_STEPS)
+
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        stmt = _Statement("COMMIT", ())
+        _run(stmt, super().commit)
+        _finish(stmt)
+
+    def rollback(self):
+        if not self.in_transaction:
+            return super().rollback()
+        stmt = _Statement("ROLLBACK", ())
+        _run(stmt, super().rollback)
+        _finish(stmt)
+
+    def __exit__(self, exc_type, exc, tb):
+        # the built-in __exit__ commits without going through commit()
+        # and, like it, rolls back when the commit itself fails (e.g. SQLITE_BUSY)
+        if exc_type is None:
+            try:
+                self.commit()
+            except BaseException:
+                self.rollback()
+                raise
+        else:
+            self.rollback()
+        return False
+
+
+# --- REPORTING ---
+def operation_rows():
+    """[(name, count, p50, p95, p99, max, statements/op, lock wait ms/op)], slowest in total first."""
+    _finish_dropped()
+    with _lock:
+        items = [(name, s.latency.count, s.latency.percentile(0.5), s.latency.percentile(0.95),
+                  s.latency.percentile(0.99), s.latency.max, s.statements / s.latency.count,
+                  s.lock_wait_ms / s.latency.count, s.latency.total)
+                 for name, s in operations.items() if s.latency.count]
+    items.sort(key=lambda item: -item[-1])
+    return [item[:-1] for item in items]
+
+
+def statement_rows(limit=50):
+    """[(operation, sql, count, p50, p95, max, rows/exec)] by total time."""
+    _finish_dropped()
+    with _lock:
+        items = [(op, sql, s.latency.count, s.latency.percentile(0.5), s.latency.percentile(0.95),
+                  s.latency.max, s.rows / s.latency.count, s.latency.total)
+                 for (op, sql), s in statements.items() if s.latency.count]
+    items.sort(key=lambda item: -item[-1])
+    return [item[:-1] for item in items[:limit]]
+
+
+def reset():
+    with _lock:
+        operations.clear()
+        statements.clear()
+
+
+def summarise_log(path):
+    """{(kind, name): [count, total ms, max ms]} from a slow log."""
+    summary = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 4:
+                continue
+            ms = float(parts[3].rstrip("ms"))
+            entry = summary.setdefault((parts[1], parts[2]), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += ms
+            entry[2] = max(entry[2], ms)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", nargs="?", default=SLOW_LOG)
+    args = parser.parse_args()
+    try:
+        summary = summarise_log(args.log)
+    except FileNotFoundError:
+        sys.exit(f"no slow log at {args.log}")
+    print(f"{'kind':10} {'operation':28} {'count':>7} {'total ms':>10} {'max ms':>9}")
+    for (kind, name), (count, total, worst) in sorted(summary.items(), key=lambda item: -item[1][1]):
+        print(f"{kind:10} {name:28} {count:7} {total:10.1f} {worst:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
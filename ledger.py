@@ -0,0 +1,188 @@
+"""Stock movement ledger: history, point-in-time stock and snapshots.
+
+    python ledger.py as-of 2026-03-01            # every medicine
+    python ledger.py as-of 2026-03-01 --med 12
+    python ledger.py history 12
+    python ledger.py snapshot                    # compact through yesterday
+    python ledger.py prune 2025-12-31            # drop history covered by that snapshot
+    python ledger.py audit
+
+Every change to a lot is appended to StockMovement by triggers (migration
+9). StockSnapshot stores the balance of each medicine at the end of a day.
+Stock on a date is the latest snapshot up to that date plus the movements
+after it, so queries never replay the whole ledger. Take snapshots only of
+closed days, because movements dated on or before a snapshot are not
+counted again. Sales take their movements' date from the day they are
+recorded, not from a backdated sale_date, so they always land after the
+newest snapshot.
+"""
+import argparse
+import csv
+import sys
+from datetime import date, timedelta
+
+import db
+import migrations
+
+
+# The app takes a snapshot at startup once the newest one is this old.
+SNAPSHOT_EVERY_DAYS = 7
+
+LATEST_SNAPSHOT = "SELECT COALESCE(MAX(SnapshotDate), '') FROM StockSnapshot WHERE SnapshotDate <= ?"
+
+# Balances of every medicine: snapshot rows plus movements in (snapshot, date].
+BALANCES = """
+    SELECT Med_ID, SUM(Quantity) AS Balance FROM (
+        SELECT Med_ID, Quantity FROM StockSnapshot WHERE SnapshotDate = ?1
+        UNION ALL
+        SELECT Med_ID, Quantity FROM StockMovement WHERE MovedOn > ?1 AND MovedOn <= ?2
+    )
+    GROUP BY Med_ID
+    HAVING Balance != 0
+    ORDER BY Med_ID"""
+
+BALANCE = """
+    SELECT COALESCE((SELECT Quantity FROM StockSnapshot WHERE SnapshotDate = ?1 AND Med_ID = ?3), 0)
+         + COALESCE((SELECT SUM(Quantity) FROM StockMovement
+                     WHERE Med_ID = ?3 AND MovedOn > ?1 AND MovedOn <= ?2), 0)"""
+
+HISTORY = """
+    SELECT Movement_ID, Lot_ID, Kind, Quantity, MovedOn FROM StockMovement
+    WHERE Med_ID = ? AND MovedOn BETWEEN ? AND ?
+    ORDER BY MovedOn, Movement_ID"""
+
+HISTORY_COLUMNS = ["Movement_ID", "Lot_ID", "Kind", "Quantity", "MovedOn"]
+
+SNAPSHOT = f"""
+    INSERT INTO StockSnapshot (SnapshotDate, Med_ID, Quantity)
+    SELECT ?2, Med_ID, Balance FROM ({BALANCES})"""
+
+# Stock totals against snapshot plus ledger, as (Med_ID, stock, ledger) pairs that differ.
+AUDIT = f"""
+    SELECT Med_ID, SUM(Stocked), SUM(Ledger) FROM (
+        SELECT Med_ID, StockQuantity AS Stocked, 0 AS Ledger FROM Stock
+        UNION ALL
+        SELECT Med_ID, 0, Balance FROM ({BALANCES})
+    )
+    GROUP BY Med_ID
+    HAVING SUM(Stocked) != SUM(Ledger)"""
+
+
+def _yesterday():
+    return (date.today() - timedelta(days=1)).isoformat()
+
+
+# --- QUERIES ---
+def latest_snapshot(conn, on_date="9999-12-31"):
+    """Date of the newest snapshot on or before on_date, or '' if there is none."""
+    return conn.execute(LATEST_SNAPSHOT, (on_date,)).fetchone()[0]
+
+
+def stock_as_of(conn, on_date, med_id=None):
+    """Quantity of med_id at the end of on_date, or [(Med_ID, qty)] for all medicines."""
+    base = latest_snapshot(conn, on_date)
+    if med_id is not None:
+        return conn.execute(BALANCE, (base, on_date, med_id)).fetchone()[0]
+    return conn.execute(BALANCES, (base, on_date)).fetchall()
+
+
+def history(conn, med_id, date_from="0000-01-01", date_to="9999-12-31"):
+    return conn.execute(HISTORY, (med_id, date_from, date_to)).fetchall()
+
+
+# --- COMPACTION ---
+def snapshot(conn, through=None):
+    """Store every medicine's balance at the end of `through` (default yesterday).
+
+    Built from the previous snapshot and the movements since, in one
+    transaction. Returns the number of medicines in the snapshot, or None
+    if there is already a snapshot for that date or a later one.
+    """
+    through = through or _yesterday()
+    with conn:
+        if latest_snapshot(conn, "9999-12-31") >= through:
+            return None
+        base = latest_snapshot(conn, through)
+        return conn.execute(SNAPSHOT, (base, through)).rowcount
+
+
+def snapshot_if_due(conn, every_days=SNAPSHOT_EVERY_DAYS):
+    """Take a snapshot through yesterday if the newest one is older than every_days."""
+    last = latest_snapshot(conn)
+    due = (date.today() - timedelta(days=every_days + 1)).isoformat()
+    if not last or last <= due:
+        return snapshot(conn)
+    return None
+
+
+def prune(conn, through):
+    """Drop movements and older snapshots covered by the snapshot taken on `through`.
+
+    Optional: point-in-time queries before that date stop working, but
+    nothing after it changes. Returns the number of movements removed.
+    """
+    with conn:
+        if not conn.execute("SELECT 1 FROM StockSnapshot WHERE SnapshotDate = ? LIMIT 1", (through,)).fetchone():
+            raise ValueError(f"no snapshot taken on {through}")
+        conn.execute("DELETE FROM StockSnapshot WHERE SnapshotDate < ?", (through,))
+        return conn.execute("DELETE FROM StockMovement WHERE MovedOn <= ?", (through,)).rowcount
+
+
+def audit(conn):
+    """Medicines whose Stock total disagrees with snapshot plus ledger: [(Med_ID, stock, ledger)]."""
+    return conn.execute(AUDIT, (latest_snapshot(conn), "9999-12-31")).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    as_of = sub.add_parser("as-of")
+    as_of.add_argument("date")
+    as_of.add_argument("--med", type=int)
+    hist = sub.add_parser("history")
+    hist.add_argument("med_id", type=int)
+    hist.add_argument("--from", dest="date_from", default="0000-01-01")
+    hist.add_argument("--to", dest="date_to", default="9999-12-31")
+    snap = sub.add_parser("snapshot")
+    snap.add_argument("--through", help="last day included (default: yesterday)")
+    pr = sub.add_parser("prune")
+    pr.add_argument("through", help="date of an existing snapshot")
+    sub.add_parser("audit")
+    args = parser.parse_args()
+
+    conn = db.open_connection()
+    migrations.migrate(conn)
+    writer = csv.writer(sys.stdout)
+    if args.command == "as-of":
+        if args.med is not None:
+            print(stock_as_of(conn, args.date, args.med))
+        else:
+            writer.writerow(["Med_ID", "Quantity"])
+            writer.writerows(stock_as_of(conn, args.date))
+    elif args.command == "history":
+        writer.writerow(HISTORY_COLUMNS)
+        writer.writerows(history(conn, args.med_id, args.date_from, args.date_to))
+    elif args.command == "snapshot":
+        count = snapshot(conn, args.through)
+        if count is None:
+            print("already have a snapshot that recent", file=sys.stderr)
+        else:
+            print(f"snapshot of {count} medicine(s)", file=sys.stderr)
+    elif args.command == "prune":
+        try:
+            print(f"removed {prune(conn, args.through)} movement(s)", file=sys.stderr)
+        except ValueError as e:
+            sys.exit(str(e))
+    else:
+        mismatches = audit(conn)
+        writer.writerow(["Med_ID", "Stock", "Ledger"])
+        writer.writerows(mismatches)
+        conn.close()
+        if mismatches:
+            sys.exit(1)
+        return
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
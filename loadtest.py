@@ -0,0 +1,159 @@
+"""Load test for api.py: requests per second and latency percentiles.
+
+    python workload.py load.db --sales 100000 --end $(date +%F)
+    python api.py --db load.db &
+    python loadtest.py --clients 32 --duration 20
+    python loadtest.py --writes 0.5 -o load.json
+
+Each client keeps one HTTP/1.1 connection open and sends requests back to
+back: sales (the --writes share) and a mix of searches, catalog lookups,
+stock checks and table pages. Customer and medicine IDs are read through
+the API first. Latency is measured per request, from sending it to
+reading the last byte of the response. Sales refused for short stock
+(409) count as answered, not as errors.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+import workload
+
+
+def _percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Connection:
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n"
+                          .encode("latin-1") + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+# --- REQUEST MIX ---
+async def discover(conn):
+    """(customer IDs, medicine IDs with stock) from the first pages of each table."""
+    _, customers = await conn.request("GET", "/tables/Customer?limit=1000")
+    _, stocked = await conn.request("GET", "/tables/Stock?limit=1000")
+    med_ids = [row[0] for row in stocked["rows"] if row[1] > 0]
+    return [row[0] for row in customers["rows"]], med_ids
+
+
+def next_request(rng, writes, cust_ids, med_ids):
+    """(kind, method, path, body) for one request of the mix."""
+    if rng.random() < writes:
+        return "sale", "POST", "/sales", {"cust_id": rng.choice(cust_ids), "med_id": rng.choice(med_ids), "qty": 1}
+    kind = rng.choice(("search", "medicine", "stock", "page"))
+    if kind == "search":
+        return kind, "GET", f"/medicines?q={rng.choice(workload.DRUGS)[:3]}", None
+    if kind == "medicine":
+        return kind, "GET", f"/medicines/{rng.choice(med_ids)}", None
+    if kind == "stock":
+        return kind, "GET", f"/stock/{rng.choice(med_ids)}", None
+    return kind, "GET", f"/tables/Customer?after={rng.choice(cust_ids)}&limit=50", None
+
+
+async def client(host, port, seed, deadline, writes, ids, samples, statuses):
+    rng = random.Random(seed)
+    conn = Connection(host, port)
+    await conn.open()
+    try:
+        while time.perf_counter() < deadline:
+            kind, method, path, body = next_request(rng, writes, *ids)
+            start = time.perf_counter()
+            status, _ = await conn.request(method, path, body)
+            samples.setdefault(kind, []).append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        conn.close()
+
+
+async def run(url, clients, duration, writes, seed=1):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    probe = Connection(host, port)
+    await probe.open()
+    ids = await discover(probe)
+    probe.close()
+    if not ids[0] or not ids[1]:
+        raise SystemExit("the database needs customers and stocked medicines (see workload.py)")
+
+    samples, statuses = {}, {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, seed + i, start + duration, writes, ids, samples, statuses)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    cases = {}
+    everything = []
+    for kind, values in sorted(samples.items()):
+        values.sort()
+        everything.extend(values)
+        cases[kind] = {"requests": len(values), "p50_ms": round(_percentile(values, 0.50), 3),
+                       "p95_ms": round(_percentile(values, 0.95), 3), "p99_ms": round(_percentile(values, 0.99), 3)}
+    everything.sort()
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "requests": len(everything),
+        "rps": round(len(everything) / elapsed, 1),
+        "p50_ms": round(_percentile(everything, 0.50), 3),
+        "p99_ms": round(_percentile(everything, 0.99), 3),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "cases": cases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--writes", type=float, default=0.2, help="share of requests that are sales")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="also write the results here as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.clients, args.duration, args.writes, args.seed))
+    for kind, case in result["cases"].items():
+        print(f"{kind:10} {case['requests']:8} req   p50 {case['p50_ms']:8.2f} ms   "
+              f"p95 {case['p95_ms']:8.2f} ms   p99 {case['p99_ms']:8.2f} ms")
+    print(f"{result['requests']} requests in {result['seconds']}s from {result['clients']} clients: "
+          f"{result['rps']} req/s, p99 {result['p99_ms']:.2f} ms, statuses {result['statuses']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if any(not status.startswith(("2", "409")) for status in result["statuses"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
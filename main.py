@@ -1,666 +1,701 @@
-import sqlite3
-import tkinter as tk
-from tkinter import messagebox, ttk
-from datetime import datetime
-
-
-# --- DATABASE SETUP ---
-def create_tables():
-    conn = sqlite3.connect('pharmacy.db')
-    cursor = conn.cursor()
-
-    # Customer Table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Customer (
-        Cust_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        Name TEXT NOT NULL CHECK(Name REGEXP '^[A-Za-z ]+$'),
-        Address TEXT,
-        PhoneNumber TEXT UNIQUE NOT NULL CHECK(PhoneNumber REGEXP '^[0-9]{10}$')
-    )
-    ''')
-
-    # Employee Table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Employee (
-        Emp_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        Name TEXT NOT NULL CHECK(Name REGEXP '^[A-Za-z ]+$'),
-        Role TEXT NOT NULL,
-        Email TEXT UNIQUE NOT NULL CHECK(Email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'),
-        PhoneNumber TEXT UNIQUE NOT NULL CHECK(PhoneNumber REGEXP '^[0-9]{10}$')
-    )
-    ''')
-
-    # Supplier Table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Supplier (
-        Supplier_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        Name TEXT NOT NULL CHECK(Name REGEXP '^[A-Za-z ]+$'),
-        Contact TEXT CHECK(Contact REGEXP '^[0-9]{10}$')
-    )
-    ''')
-
-    # Medicine Table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Medicine (
-        Med_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        SupplierID INTEGER NOT NULL,
-        Brand TEXT NOT NULL,
-        Price REAL NOT NULL CHECK(Price > 0),
-        ExpiryDate TEXT NOT NULL,
-        ManufactureDate TEXT NOT NULL,
-        CHECK(date(ExpiryDate) > date(ManufactureDate)),
-        FOREIGN KEY(SupplierID) REFERENCES Supplier(Supplier_ID)
-    )
-    ''')
-
-    # Sales Table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Sales (
-        Sale_ID INTEGER PRIMARY KEY AUTOINCREMENT,
-        Cust_ID INTEGER NOT NULL,
-        Med_ID INTEGER NOT NULL,
-        SaleDate TEXT NOT NULL,
-        Quantity INTEGER NOT NULL CHECK(Quantity > 0),
-        TotalAmount REAL NOT NULL CHECK(TotalAmount >= 0),
-        FOREIGN KEY(Cust_ID) REFERENCES Customer(Cust_ID),
-        FOREIGN KEY(Med_ID) REFERENCES Medicine(Med_ID)
-    )
-    ''')
-
-    # Stock Table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Stock (
-        Med_ID INTEGER PRIMARY KEY,
-        StockQuantity INTEGER NOT NULL CHECK(StockQuantity >= 0),
-        LastUpdated TEXT NOT NULL,
-        FOREIGN KEY(Med_ID) REFERENCES Medicine(Med_ID)
-    )
-    ''')
-
-    conn.commit()
-    conn.close()
-
-
-create_tables()
-
-
-# --- HELPER FUNCTION TO VIEW TABLES ---
-def view_table(title, table_name, columns):
-    win = tk.Toplevel(root)
-    win.title(title)
-    win.geometry("700x400")
-
-    tree = ttk.Treeview(win, columns=columns, show='headings')
-    for col in columns:
-        tree.heading(col, text=col)
-        tree.column(col, width=120)
-    tree.pack(fill=tk.BOTH, expand=True)
-
-    conn = sqlite3.connect('pharmacy.db')
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT * FROM {table_name}")
-    rows = cursor.fetchall()
-    conn.close()
-
-    for row in rows:
-        tree.insert("", tk.END, values=row)
-
-
-# --- CUSTOMER FUNCTIONS ---
-def add_customer():
-    name = customer_name.get().strip()
-    address = customer_address.get().strip()
-    phone = customer_phone.get().strip()
-    
-    if not name or not phone:
-        messagebox.showwarning("Input Error", "Name and Phone are required")
-        return
-        
-    # Validate name (letters and spaces only)
-    if not all(c.isalpha() or c.isspace() for c in name):
-        messagebox.showwarning("Input Error", "Name must contain only letters and spaces")
-        return
-    
-    # Validate phone (10 digits)
-    if not (phone.isdigit() and len(phone) == 10):
-        messagebox.showwarning("Input Error", "Phone number must be exactly 10 digits")
-        return
-        
-    try:
-        conn = sqlite3.connect('pharmacy.db')
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO Customer (Name, Address, PhoneNumber) VALUES (?, ?, ?)",
-                       (name, address, phone))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Customer added successfully!")
-    except sqlite3.IntegrityError:
-        messagebox.showerror("Error", "Phone number already exists")
-    customer_name.delete(0, tk.END)
-    customer_address.delete(0, tk.END)
-    customer_phone.delete(0, tk.END)
-
-
-# --- EMPLOYEE FUNCTIONS ---
-def validate_email(email):
-    import re
-    pattern = r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'
-    return re.match(pattern, email) is not None
-
-def add_employee():
-    name = emp_name.get().strip()
-    role = emp_role.get().strip()
-    email = emp_email.get().strip()
-    phone = emp_phone.get().strip()
-    
-    # Required fields
-    if not all([name, role, email, phone]):
-        messagebox.showwarning("Input Error", "All fields are required")
-        return
-        
-    # Validate name (letters and spaces only)
-    if not all(c.isalpha() or c.isspace() for c in name):
-        messagebox.showwarning("Input Error", "Name must contain only letters and spaces")
-        return
-        
-    # Validate email format
-    if not validate_email(email):
-        messagebox.showwarning("Input Error", "Invalid email format")
-        return
-        
-    # Validate phone (10 digits)
-    if not (phone.isdigit() and len(phone) == 10):
-        messagebox.showwarning("Input Error", "Phone number must be exactly 10 digits")
-        return
-        
-    try:
-        conn = sqlite3.connect('pharmacy.db')
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO Employee (Name, Role, Email, PhoneNumber) VALUES (?, ?, ?, ?)",
-                       (name, role, email, phone))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Employee added successfully!")
-    except sqlite3.IntegrityError as e:
-        if "Email" in str(e):
-            messagebox.showerror("Error", "Email address already exists")
-        else:
-            messagebox.showerror("Error", "Phone number already exists")
-    emp_name.delete(0, tk.END)
-    emp_role.delete(0, tk.END)
-    emp_email.delete(0, tk.END)
-    emp_phone.delete(0, tk.END)
-
-
-# --- MEDICINE FUNCTIONS ---
-def validate_date_format(date_str):
-    import re
-    return bool(re.match(r'^\d{4}-\d{2}-\d{2}$', date_str))
-    
-def is_valid_date_order(manu_date, exp_date):
-    from datetime import datetime
-    try:
-        manu = datetime.strptime(manu_date, '%Y-%m-%d')
-        exp = datetime.strptime(exp_date, '%Y-%m-%d')
-        return exp > manu
-    except ValueError:
-        return False
-
-def add_medicine():
-    supplier_text = med_supplier_combo.get()
-    if supplier_text == "Select Supplier" or not supplier_text:
-        messagebox.showwarning("Input Error", "Please select a supplier")
-        return
-    
-    # Extract supplier ID from the combo box selection (format: "ID: Name")
-    supplier_id = supplier_text.split(':')[0]
-    
-    brand = med_brand.get().strip()
-    price = med_price.get().strip()
-    exp = med_expiry.get().strip()
-    manu = med_manu.get().strip()
-    
-    # Validate required fields
-    if not all([brand, price, exp, manu]):
-        messagebox.showwarning("Input Error", "All fields are required")
-        return
-        
-    # Validate price is positive number
-    try:
-        price_float = float(price)
-        if price_float <= 0:
-            raise ValueError()
-    except ValueError:
-        messagebox.showwarning("Input Error", "Price must be a positive number")
-        return
-        
-    # Validate date formats
-    if not (validate_date_format(exp) and validate_date_format(manu)):
-        messagebox.showwarning("Input Error", "Dates must be in YYYY-MM-DD format")
-        return
-        
-    # Validate expiry is after manufacture
-    if not is_valid_date_order(manu, exp):
-        messagebox.showwarning("Input Error", "Expiry date must be after manufacture date")
-        return
-        
-    try:
-        conn = sqlite3.connect('pharmacy.db')
-        cursor = conn.cursor()
-        
-        # Check if supplier exists
-        cursor.execute("SELECT 1 FROM Supplier WHERE Supplier_ID = ?", (supplier,))
-        if not cursor.fetchone():
-            messagebox.showerror("Error", "Invalid Supplier ID")
-            conn.close()
-            return
-            
-        cursor.execute("""
-            INSERT INTO Medicine 
-            (SupplierID, Brand, Price, ExpiryDate, ManufactureDate) 
-            VALUES (?, ?, ?, ?, ?)""",
-            (supplier, brand, price_float, exp, manu))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Medicine added successfully!")
-    except sqlite3.IntegrityError:
-        messagebox.showerror("Error", "Database constraint violation")
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
-        
-    med_supplier_combo.set("Select Supplier")
-    med_brand.delete(0, tk.END)
-    med_price.delete(0, tk.END)
-    med_expiry.delete(0, tk.END)
-    med_manu.delete(0, tk.END)
-
-
-# --- SALES FUNCTIONS ---
-def add_sale():
-    cust_id_val = sale_cust.get()
-    med_id_val = sale_med.get()
-    qty_val = sale_qty.get()
-    if not cust_id_val or not med_id_val or not qty_val:
-        messagebox.showwarning("Input Error", "All fields are required")
-        return
-    try:
-        qty_int = int(qty_val)
-        if qty_int <= 0:
-            raise ValueError()
-    except Exception:
-        messagebox.showerror("Error", "Quantity must be a positive integer")
-        return
-
-    try:
-        conn = sqlite3.connect('pharmacy.db')
-        cursor = conn.cursor()
-        # get price
-        cursor.execute("SELECT Price FROM Medicine WHERE Med_ID=?", (med_id_val,))
-        price_row = cursor.fetchone()
-        if not price_row:
-            messagebox.showerror("Error", "Medicine not found")
-            conn.close()
-            return
-
-        # check stock
-        cursor.execute("SELECT StockQuantity FROM Stock WHERE Med_ID=?", (med_id_val,))
-        stock_row = cursor.fetchone()
-        if not stock_row:
-            messagebox.showerror("Error", "No stock record found for this medicine")
-            conn.close()
-            return
-        available = int(stock_row[0])
-        if available < qty_int:
-            messagebox.showerror("Insufficient Stock", f"Requested {qty_int} but only {available} in stock")
-            conn.close()
-            return
-
-        total = qty_int * float(price_row[0])
-        cursor.execute("INSERT INTO Sales (Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount) VALUES (?, ?, ?, ?, ?)",
-                       (cust_id_val, med_id_val, datetime.now().strftime("%Y-%m-%d"), qty_int, total))
-
-        # decrement stock
-        cursor.execute("UPDATE Stock SET StockQuantity = StockQuantity - ?, LastUpdated = ? WHERE Med_ID = ?",
-                       (qty_int, datetime.now().strftime("%Y-%m-%d"), med_id_val))
-
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", f"Sale added! Total Amount: {total}")
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
-    sale_cust.delete(0, tk.END)
-    sale_med.delete(0, tk.END)
-    sale_qty.delete(0, tk.END)
-
-
-# --- STOCK FUNCTIONS ---
-def add_stock():
-    medid = stock_med.get().strip()
-    qty = stock_qty.get().strip()
-    
-    # Validate required fields
-    if not medid or not qty:
-        messagebox.showwarning("Input Error", "All fields are required")
-        return
-        
-    # Validate quantity is non-negative integer
-    try:
-        qty_int = int(qty)
-        if qty_int < 0:
-            raise ValueError()
-    except ValueError:
-        messagebox.showerror("Error", "Quantity must be a non-negative integer")
-        return
-
-    try:
-        conn = sqlite3.connect('pharmacy.db')
-        cursor = conn.cursor()
-        
-        # Check if medicine exists
-        cursor.execute("SELECT 1 FROM Medicine WHERE Med_ID = ?", (medid,))
-        if not cursor.fetchone():
-            messagebox.showerror("Error", "Invalid Medicine ID")
-            conn.close()
-            return
-            
-        # Update or insert stock record
-        cursor.execute("SELECT StockQuantity FROM Stock WHERE Med_ID=?", (medid,))
-        row = cursor.fetchone()
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        
-        if row:
-            cursor.execute("""
-                UPDATE Stock 
-                SET StockQuantity = ?, LastUpdated = ? 
-                WHERE Med_ID = ?""", (qty_int, current_date, medid))
-            action = "updated"
-        else:
-            cursor.execute("""
-                INSERT INTO Stock (Med_ID, StockQuantity, LastUpdated) 
-                VALUES (?, ?, ?)""", (medid, qty_int, current_date))
-            action = "created"
-            
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", f"Stock record {action} successfully")
-    except sqlite3.IntegrityError:
-        messagebox.showerror("Error", "Database constraint violation")
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
-        
-    stock_med.delete(0, tk.END)
-    stock_qty.delete(0, tk.END)
-
-
-# --- LOW STOCK VIEWER ---
-def view_low_stock(threshold=5):
-    win = tk.Toplevel(root)
-    win.title(f"Low Stock (<{threshold})")
-    win.geometry("700x300")
-
-    tree = ttk.Treeview(win, columns=("Med_ID", "Brand", "StockQuantity", "LastUpdated"), show='headings')
-    for col in ("Med_ID", "Brand", "StockQuantity", "LastUpdated"):
-        tree.heading(col, text=col)
-        tree.column(col, width=150)
-    tree.pack(fill=tk.BOTH, expand=True)
-
-    conn = sqlite3.connect('pharmacy.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT s.Med_ID, m.Brand, s.StockQuantity, s.LastUpdated
-        FROM Stock s JOIN Medicine m ON s.Med_ID = m.Med_ID
-        WHERE s.StockQuantity < ?
-        ORDER BY s.StockQuantity ASC
-    ''', (threshold,))
-    rows = cursor.fetchall()
-    conn.close()
-
-    for row in rows:
-        tree.insert("", tk.END, values=row)
-
-
-# --- DELETE FUNCTIONS ---
-def delete_customer():
-    cid = del_cust_id.get()
-    if not cid:
-        messagebox.showwarning("Input Error", "Customer ID required")
-        return
-    conn = sqlite3.connect('pharmacy.db')
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Customer WHERE Cust_ID=?", (cid,))
-    conn.commit()
-    conn.close()
-    messagebox.showinfo("Deleted", f"Customer {cid} deleted (if existed)")
-    del_cust_id.delete(0, tk.END)
-
-
-def delete_employee():
-    eid = del_emp_id.get()
-    if not eid:
-        messagebox.showwarning("Input Error", "Employee ID required")
-        return
-    conn = sqlite3.connect('pharmacy.db')
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Employee WHERE Emp_ID=?", (eid,))
-    conn.commit()
-    conn.close()
-    messagebox.showinfo("Deleted", f"Employee {eid} deleted (if existed)")
-    del_emp_id.delete(0, tk.END)
-
-
-def delete_medicine():
-    mid = del_med_id.get()
-    if not mid:
-        messagebox.showwarning("Input Error", "Medicine ID required")
-        return
-    conn = sqlite3.connect('pharmacy.db')
-    cursor = conn.cursor()
-    # remove stock record if present
-    cursor.execute("DELETE FROM Stock WHERE Med_ID=?", (mid,))
-    cursor.execute("DELETE FROM Medicine WHERE Med_ID=?", (mid,))
-    conn.commit()
-    conn.close()
-    messagebox.showinfo("Deleted", f"Medicine {mid} and its stock removed (if existed)")
-    del_med_id.delete(0, tk.END)
-
-
-# --- SUPPLIER FUNCTIONS ---
-def add_supplier():
-    name = supplier_name.get().strip()
-    contact = supplier_contact.get().strip()
-    
-    if not name:
-        messagebox.showwarning("Input Error", "Supplier name is required")
-        return
-        
-    # Validate name (letters and spaces only)
-    if not all(c.isalpha() or c.isspace() for c in name):
-        messagebox.showwarning("Input Error", "Name must contain only letters and spaces")
-        return
-    
-    # Validate contact if provided
-    if contact and not (contact.isdigit() and len(contact) == 10):
-        messagebox.showwarning("Input Error", "Contact must be 10 digits")
-        return
-        
-    try:
-        conn = sqlite3.connect('pharmacy.db')
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO Supplier (Name, Contact) VALUES (?, ?)",
-                       (name, contact if contact else None))
-        conn.commit()
-        conn.close()
-        messagebox.showinfo("Success", "Supplier added successfully!")
-        # Refresh supplier list in medicine tab
-        update_supplier_list()
-    except sqlite3.IntegrityError:
-        messagebox.showerror("Error", "Supplier already exists")
-    supplier_name.delete(0, tk.END)
-    supplier_contact.delete(0, tk.END)
-
-def update_supplier_list():
-    # Update the supplier dropdown in medicine tab
-    conn = sqlite3.connect('pharmacy.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT Supplier_ID, Name FROM Supplier ORDER BY Name")
-    suppliers = cursor.fetchall()
-    conn.close()
-    
-    # Update the ComboBox values
-    supplier_choices = [f"{sid}: {name}" for sid, name in suppliers]
-    med_supplier_combo['values'] = supplier_choices
-    if supplier_choices:
-        med_supplier_combo.set("Select Supplier")
-
-# --- GUI SETUP ---
-root = tk.Tk()
-root.title("Pharmacy Management System")
-root.geometry("760x700")
-
-tabControl = ttk.Notebook(root)
-
-# --- CUSTOMER TAB ---
-customer_tab = ttk.Frame(tabControl)
-tabControl.add(customer_tab, text='Customer')
-tk.Label(customer_tab, text="Name").grid(row=0, column=0, padx=10, pady=5)
-customer_name = tk.Entry(customer_tab)
-customer_name.grid(row=0, column=1)
-tk.Label(customer_tab, text="Address").grid(row=1, column=0, padx=10, pady=5)
-customer_address = tk.Entry(customer_tab)
-customer_address.grid(row=1, column=1)
-tk.Label(customer_tab, text="Phone").grid(row=2, column=0, padx=10, pady=5)
-customer_phone = tk.Entry(customer_tab)
-customer_phone.grid(row=2, column=1)
-tk.Button(customer_tab, text="Add Customer", command=add_customer, bg="green", fg="white").grid(row=3, column=0, columnspan=2, pady=5)
-tk.Button(customer_tab, text="View Customers", command=lambda: view_table("All Customers", "Customer", ["Cust_ID", "Name", "Address", "PhoneNumber"]), bg="blue", fg="white").grid(row=4, column=0, columnspan=2, pady=5)
-
-# delete customer
-tk.Label(customer_tab, text="Delete Customer ID").grid(row=5, column=0, padx=10, pady=5)
-del_cust_id = tk.Entry(customer_tab)
-del_cust_id.grid(row=5, column=1)
-tk.Button(customer_tab, text="Delete Customer", command=delete_customer, bg="red", fg="white").grid(row=6, column=0, columnspan=2, pady=5)
-
-# --- EMPLOYEE TAB ---
-employee_tab = ttk.Frame(tabControl)
-tabControl.add(employee_tab, text='Employee')
-tk.Label(employee_tab, text="Name").grid(row=0, column=0, padx=10, pady=5)
-emp_name = tk.Entry(employee_tab)
-emp_name.grid(row=0, column=1)
-tk.Label(employee_tab, text="Role").grid(row=1, column=0, padx=10, pady=5)
-emp_role = tk.Entry(employee_tab)
-emp_role.grid(row=1, column=1)
-tk.Label(employee_tab, text="Email").grid(row=2, column=0, padx=10, pady=5)
-emp_email = tk.Entry(employee_tab)
-emp_email.grid(row=2, column=1)
-tk.Label(employee_tab, text="Phone").grid(row=3, column=0, padx=10, pady=5)
-emp_phone = tk.Entry(employee_tab)
-emp_phone.grid(row=3, column=1)
-tk.Button(employee_tab, text="Add Employee", command=add_employee, bg="green", fg="white").grid(row=4, column=0, columnspan=2, pady=5)
-tk.Button(employee_tab, text="View Employees",
-          command=lambda: view_table("All Employees", "Employee",
-                                     ["Emp_ID", "Name", "Role", "Email", "PhoneNumber"]),
-          bg="blue", fg="white").grid(row=5, column=0, columnspan=2, pady=5)
-
-# delete employee
-tk.Label(employee_tab, text="Delete Employee ID").grid(row=6, column=0, padx=10, pady=5)
-del_emp_id = tk.Entry(employee_tab)
-del_emp_id.grid(row=6, column=1)
-tk.Button(employee_tab, text="Delete Employee", command=delete_employee, bg="red", fg="white").grid(row=7, column=0, columnspan=2, pady=5)
-
-# --- SUPPLIER TAB ---
-supplier_tab = ttk.Frame(tabControl)
-tabControl.add(supplier_tab, text='Supplier')
-
-tk.Label(supplier_tab, text="Name").grid(row=0, column=0, padx=10, pady=5)
-supplier_name = tk.Entry(supplier_tab)
-supplier_name.grid(row=0, column=1)
-
-tk.Label(supplier_tab, text="Contact (10 digits)").grid(row=1, column=0, padx=10, pady=5)
-supplier_contact = tk.Entry(supplier_tab)
-supplier_contact.grid(row=1, column=1)
-
-tk.Button(supplier_tab, text="Add Supplier", command=add_supplier, bg="green", fg="white").grid(row=2, column=0, columnspan=2, pady=5)
-tk.Button(supplier_tab, text="View Suppliers",
-          command=lambda: view_table("All Suppliers", "Supplier", ["Supplier_ID", "Name", "Contact"]),
-          bg="blue", fg="white").grid(row=3, column=0, columnspan=2, pady=5)
-
-# --- MEDICINE TAB ---
-medicine_tab = ttk.Frame(tabControl)
-tabControl.add(medicine_tab, text='Medicine')
-
-tk.Label(medicine_tab, text="Supplier").grid(row=0, column=0, padx=10, pady=5)
-med_supplier_combo = ttk.Combobox(medicine_tab, state="readonly")
-med_supplier_combo.grid(row=0, column=1)
-update_supplier_list()  # Populate supplier dropdown
-
-tk.Label(medicine_tab, text="Brand").grid(row=1, column=0, padx=10, pady=5)
-med_brand = tk.Entry(medicine_tab)
-med_brand.grid(row=1, column=1)
-
-tk.Label(medicine_tab, text="Price").grid(row=2, column=0, padx=10, pady=5)
-med_price = tk.Entry(medicine_tab)
-med_price.grid(row=2, column=1)
-
-tk.Label(medicine_tab, text="Expiry Date (YYYY-MM-DD)").grid(row=3, column=0, padx=10, pady=5)
-med_expiry = tk.Entry(medicine_tab)
-med_expiry.grid(row=3, column=1)
-
-tk.Label(medicine_tab, text="Manufacture Date (YYYY-MM-DD)").grid(row=4, column=0, padx=10, pady=5)
-med_manu = tk.Entry(medicine_tab)
-med_manu.grid(row=4, column=1)
-
-tk.Button(medicine_tab, text="Add Medicine", command=add_medicine, bg="green", fg="white").grid(row=5, column=0, columnspan=2, pady=5)
-tk.Button(medicine_tab, text="View Medicines",
-          command=lambda: view_table("All Medicines", "Medicine", ["Med_ID", "SupplierID", "Brand", "Price", "ExpiryDate", "ManufactureDate"]),
-          bg="blue", fg="white").grid(row=6, column=0, columnspan=2, pady=5)
-
-# delete medicine
-tk.Label(medicine_tab, text="Delete Medicine ID").grid(row=7, column=0, padx=10, pady=5)
-del_med_id = tk.Entry(medicine_tab)
-del_med_id.grid(row=7, column=1)
-tk.Button(medicine_tab, text="Delete Medicine", command=delete_medicine, bg="red", fg="white").grid(row=8, column=0, columnspan=2, pady=5)
-
-
-# --- STOCK TAB ---
-stock_tab = ttk.Frame(tabControl)
-tabControl.add(stock_tab, text='Stock')
-
-tk.Label(stock_tab, text="Medicine ID").grid(row=0, column=0, padx=10, pady=5)
-stock_med = tk.Entry(stock_tab)
-stock_med.grid(row=0, column=1)
-
-tk.Label(stock_tab, text="Quantity").grid(row=1, column=0, padx=10, pady=5)
-stock_qty = tk.Entry(stock_tab)
-stock_qty.grid(row=1, column=1)
-
-tk.Button(stock_tab, text="Set/Update Stock", command=add_stock, bg="green", fg="white").grid(row=2, column=0, columnspan=2, pady=5)
-tk.Button(stock_tab, text="View Stock", command=lambda: view_table("Stock", "Stock", ["Med_ID", "StockQuantity", "LastUpdated"]), bg="blue", fg="white").grid(row=3, column=0, columnspan=2, pady=5)
-tk.Button(stock_tab, text="View Low Stock", command=lambda: view_low_stock(5), bg="orange", fg="black").grid(row=4, column=0, columnspan=2, pady=5)
-
-
-# --- SALES TAB ---
-sales_tab = ttk.Frame(tabControl)
-tabControl.add(sales_tab, text='Sales')
-
-tk.Label(sales_tab, text="Customer ID").grid(row=0, column=0, padx=10, pady=5)
-sale_cust = tk.Entry(sales_tab)
-sale_cust.grid(row=0, column=1)
-
-tk.Label(sales_tab, text="Medicine ID").grid(row=1, column=0, padx=10, pady=5)
-sale_med = tk.Entry(sales_tab)
-sale_med.grid(row=1, column=1)
-
-tk.Label(sales_tab, text="Quantity").grid(row=2, column=0, padx=10, pady=5)
-sale_qty = tk.Entry(sales_tab)
-sale_qty.grid(row=2, column=1)
-
-tk.Button(sales_tab, text="Add Sale", command=add_sale, bg="green", fg="white").grid(row=3, column=0, columnspan=2, pady=5)
-tk.Button(sales_tab, text="View Sales",
-          command=lambda: view_table("All Sales", "Sales", ["Sale_ID", "Cust_ID", "Med_ID", "SaleDate", "Quantity", "TotalAmount"]),
-          bg="blue", fg="white").grid(row=4, column=0, columnspan=2, pady=5)
-
-
-tabControl.pack(expand=1, fill="both")
-root.mainloop()
-
-
+import time
+
+# Taken before the other imports so the start-up report can include them.
+STARTED = time.perf_counter()
+
+import os
+import sys
+import tkinter as tk
+from contextlib import contextmanager
+from datetime import datetime
+from tkinter import messagebox, ttk
+
+import alerts
+import backup
+import codec
+import db
+import instrument
+import migrations
+from catalog import catalog
+import reports
+import sales
+import search
+import services
+import stock
+from autocomplete import AutocompleteEntry
+from table_view import PagedTable
+from worker import BackgroundExecutor, BusyIndicator
+
+
+# How often the Diagnostics tab redraws while it is showing.
+DIAGNOSTICS_MS = 1000
+
+# How often a running integrity check of a new backup is looked at.
+VERIFY_POLL_MS = 1000
+
+# PHARMACY_STARTUP_TIMES=1 prints each start-up phase to stderr as it ends.
+PRINT_STARTUP = os.environ.get("PHARMACY_STARTUP_TIMES", "0") != "0"
+
+OPERATION_COLUMNS = ["Operation", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Stmts/op", "Lock ms/op"]
+STATEMENT_COLUMNS = ["Operation", "SQL", "Count", "p50 ms", "p95 ms", "Max ms", "Rows/exec"]
+STARTUP_COLUMNS = ["Start-up phase", "ms"]
+
+# --- HELPERS ---
+def show_db_error(e):
+    if isinstance(e, services.ServiceError):
+        if e.title == "Input Error":
+            messagebox.showwarning(e.title, e.message)
+        else:
+            messagebox.showerror(e.title, e.message)
+    else:
+        messagebox.showerror("Error", str(e))
+
+
+def clear(*entries):
+    for entry in entries:
+        entry.delete(0, tk.END)
+
+
+def fill_tree(tree, rows):
+    tree.delete(*tree.get_children())
+    for row in rows:
+        tree.insert("", tk.END, values=row)
+
+
+def _sort_value(text):
+    try:
+        return 0, float(text)
+    except ValueError:
+        return 1, text
+
+
+def sort_locally(tree):
+    """Sort the rows already in a small tree when a header is clicked (again to reverse).
+
+    Big tables sort in SQL instead (table_view.PagedTable).
+    """
+    state = {"column": None, "descending": False}
+
+    def sort_by(col):
+        state["descending"] = col == state["column"] and not state["descending"]
+        state["column"] = col
+        items = sorted(tree.get_children(), key=lambda item: _sort_value(tree.set(item, col)),
+                       reverse=state["descending"])
+        for index, item in enumerate(items):
+            tree.move(item, "", index)
+
+    for col in tree["columns"]:
+        tree.heading(col, command=lambda c=col: sort_by(c))
+
+
+def report_tree(parent, columns, row, column):
+    tree = ttk.Treeview(parent, columns=columns, show='headings', height=8)
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=85)
+    sort_locally(tree)
+    tree.grid(row=row, column=column, padx=5, pady=5, sticky="nsew")
+    return tree
+
+
+def labelled_entry(parent, text, row):
+    tk.Label(parent, text=text).grid(row=row, column=0, padx=10, pady=5)
+    entry = tk.Entry(parent)
+    entry.grid(row=row, column=1)
+    return entry
+
+
+# --- START-UP TIMING ---
+class StartupTimes:
+    """Where the time before the app is usable goes: imports, DB init, widgets.
+
+    Phases are (name, ms); "first frame" counts from STARTED, the rest are
+    durations. Shown on the Diagnostics tab.
+    """
+
+    def __init__(self, started):
+        self.started = started
+        self.phases = []
+
+    def add(self, name, ms):
+        self.phases.append((name, ms))
+        if PRINT_STARTUP:
+            print(f"startup: {name:24} {ms:8.1f} ms", file=sys.stderr)
+
+    def since_start(self, name):
+        self.add(name, (time.perf_counter() - self.started) * 1000)
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def rows(self):
+        return [(name, f"{ms:.1f}") for name, ms in self.phases]
+
+
+def check_schema():
+    """Migrate the database; returns (ms, notices) where notices are the migrations' messages."""
+    notices = []
+
+    def notify(message):
+        migrations.print_notice(message)
+        notices.append(message)
+
+    start = time.perf_counter()
+    migrations.migrate(notify=notify)
+    return (time.perf_counter() - start) * 1000, notices
+
+
+# --- APPLICATION ---
+class PharmacyApp:
+    """The Tk client: reads the forms, calls the services and shows the outcome.
+
+    Every operation lives in services.py; here it runs on the executor's
+    worker thread and its result or ServiceError comes back to the Tk thread.
+    Tabs are built, and their data loaded, the first time they are shown.
+    """
+
+    def __init__(self, root, pharmacy, startup):
+        self.root = root
+        self.pharmacy = pharmacy
+        self.startup = startup
+        root.title("Pharmacy Management System")
+        root.geometry("760x700")
+
+        # Database work runs off the Tk thread; the status bar shows when it is busy.
+        self.executor = BackgroundExecutor(root, on_error=show_db_error)
+        self.busy_indicator = BusyIndicator(root, self.executor)
+        # Backups get a worker of their own, so a long copy never holds up the views.
+        self.backup_executor = BackgroundExecutor(root, max_workers=1, on_error=show_db_error)
+        self.alert_feed = alerts.AlertFeed()
+        self.cart = sales.Cart()
+        self.cart_prices = {}
+        self.med_supplier_combo = None
+        self.backup_status = "No backup taken this session"
+        self.backup_label = None
+
+        # The schema check runs before any other database work, while the window comes up.
+        self.executor.submit(instrument.timed, "schema_check", check_schema, on_done=self._schema_checked,
+                             on_error=self._schema_failed, background=True, first=True)
+
+        self.tabs = ttk.Notebook(root)
+        self._builders = {}
+        for text, build in (('Customer', self._customer_tab), ('Employee', self._employee_tab),
+                            ('Supplier', self._supplier_tab), ('Medicine', self._medicine_tab),
+                            ('Stock', self._stock_tab), ('Sales', self._sales_tab),
+                            ('Reports', self._reports_tab), ('Diagnostics', self._diagnostics_tab)):
+            self._builders[str(self._tab(text))] = build
+        self.tabs.bind("<<NotebookTabChanged>>", self._build_selected)
+        self.busy_indicator.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tabs.pack(expand=1, fill="both")
+        root.bind("<Map>", self._first_frame)
+
+        # compact the stock ledger into a snapshot once the newest one is a week old
+        self.run_db("ledger_snapshot", pharmacy.stock.snapshot_if_due)
+
+    def _first_frame(self, event):
+        if event.widget is self.root:
+            self.root.unbind("<Map>")
+            self.startup.since_start("first frame")
+            # the first tab is built once the empty window is up
+            self.root.after(0, self._build_selected)
+
+    def _build_selected(self, event=None):
+        tab = str(self.tabs.select())
+        build = self._builders.pop(tab, None)
+        if build is not None:
+            with self.startup.measure(f"tab {self.tabs.tab(tab, 'text')}"):
+                build(self.tabs.nametowidget(tab))
+
+    def _schema_checked(self, result):
+        ms, notices = result
+        self.startup.add("schema check", ms)
+        if notices:
+            messagebox.showwarning("Database Updated", "\n\n".join(notices))
+        if backup.INTERVAL_HOURS > 0:
+            self.root.after(int(backup.INTERVAL_HOURS * 3600 * 1000), self.scheduled_backup)
+
+    def _schema_failed(self, error):
+        messagebox.showerror("Database Error", f"The database could not be opened: {error}")
+        self.root.destroy()
+
+    def close(self):
+        self.executor.shutdown()
+        self.backup_executor.shutdown()
+        self.alert_feed.close()
+
+    def run_db(self, op, work, *args, on_done=None, on_error=None):
+        # Database work runs on a worker thread; callbacks come back on the Tk thread.
+        # Its statements are timed under op (see the Diagnostics tab).
+        return self.executor.submit(instrument.timed, op, work, *args, on_done=on_done, on_error=on_error)
+
+    def _tab(self, text):
+        tab = ttk.Frame(self.tabs)
+        self.tabs.add(tab, text=text)
+        return tab
+
+    def view_table(self, title, table_name, columns, archived=False):
+        win = tk.Toplevel(self.root)
+        win.title(title)
+        win.geometry("700x400")
+
+        # Only a window of rows is kept in the Treeview; pages load while scrolling.
+        table = PagedTable(win, table_name, columns, self.executor, archived=archived)
+        table.pack(fill=tk.BOTH, expand=True)
+
+    # --- CUSTOMER TAB ---
+    def _customer_tab(self, tab):
+        self.customer_name = labelled_entry(tab, "Name", 0)
+        self.customer_address = labelled_entry(tab, "Address", 1)
+        self.customer_phone = labelled_entry(tab, "Phone", 2)
+        tk.Button(tab, text="Add Customer", command=self.add_customer, bg="green", fg="white").grid(row=3, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="View Customers",
+                  command=lambda: self.view_table("All Customers", "Customer", ["Cust_ID", "Name", "Address", "PhoneNumber"]),
+                  bg="blue", fg="white").grid(row=4, column=0, columnspan=2, pady=5)
+
+        # delete customer
+        self.del_cust_id = labelled_entry(tab, "Delete Customer ID", 5)
+        tk.Button(tab, text="Delete Customer", command=self.delete_customer, bg="red", fg="white").grid(row=6, column=0, columnspan=2, pady=5)
+
+    def add_customer(self):
+        request = services.NewCustomer(self.customer_name.get(), self.customer_address.get(),
+                                       self.customer_phone.get())
+
+        def done(_):
+            messagebox.showinfo("Success", "Customer added successfully!")
+            clear(self.customer_name, self.customer_address, self.customer_phone)
+
+        self.run_db("add_customer", self.pharmacy.customers.add, request, on_done=done)
+
+    def delete_customer(self):
+        cid = self.del_cust_id.get()
+        self.run_db("delete_customer", self.pharmacy.customers.delete, cid,
+                    on_done=lambda _: messagebox.showinfo("Deleted", f"Customer {cid} deleted (if existed)"))
+        clear(self.del_cust_id)
+
+    # --- EMPLOYEE TAB ---
+    def _employee_tab(self, tab):
+        self.emp_name = labelled_entry(tab, "Name", 0)
+        self.emp_role = labelled_entry(tab, "Role", 1)
+        self.emp_email = labelled_entry(tab, "Email", 2)
+        self.emp_phone = labelled_entry(tab, "Phone", 3)
+        tk.Button(tab, text="Add Employee", command=self.add_employee, bg="green", fg="white").grid(row=4, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="View Employees",
+                  command=lambda: self.view_table("All Employees", "Employee",
+                                                  ["Emp_ID", "Name", "Role", "Email", "PhoneNumber"]),
+                  bg="blue", fg="white").grid(row=5, column=0, columnspan=2, pady=5)
+
+        # delete employee
+        self.del_emp_id = labelled_entry(tab, "Delete Employee ID", 6)
+        tk.Button(tab, text="Delete Employee", command=self.delete_employee, bg="red", fg="white").grid(row=7, column=0, columnspan=2, pady=5)
+
+    def add_employee(self):
+        request = services.NewEmployee(self.emp_name.get(), self.emp_role.get(),
+                                       self.emp_email.get(), self.emp_phone.get())
+
+        def done(_):
+            messagebox.showinfo("Success", "Employee added successfully!")
+            clear(self.emp_name, self.emp_role, self.emp_email, self.emp_phone)
+
+        self.run_db("add_employee", self.pharmacy.employees.add, request, on_done=done)
+
+    def delete_employee(self):
+        eid = self.del_emp_id.get()
+        self.run_db("delete_employee", self.pharmacy.employees.delete, eid,
+                    on_done=lambda _: messagebox.showinfo("Deleted", f"Employee {eid} deleted (if existed)"))
+        clear(self.del_emp_id)
+
+    # --- SUPPLIER TAB ---
+    def _supplier_tab(self, tab):
+        self.supplier_name = labelled_entry(tab, "Name", 0)
+        self.supplier_contact = labelled_entry(tab, "Contact (10 digits)", 1)
+        tk.Button(tab, text="Add Supplier", command=self.add_supplier, bg="green", fg="white").grid(row=2, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="View Suppliers",
+                  command=lambda: self.view_table("All Suppliers", "Supplier", ["Supplier_ID", "Name", "Contact"]),
+                  bg="blue", fg="white").grid(row=3, column=0, columnspan=2, pady=5)
+
+    def add_supplier(self):
+        request = services.NewSupplier(self.supplier_name.get(), self.supplier_contact.get())
+
+        def done(_):
+            messagebox.showinfo("Success", "Supplier added successfully!")
+            clear(self.supplier_name, self.supplier_contact)
+            # Refresh supplier list in medicine tab, if it has been built
+            if self.med_supplier_combo is not None:
+                self.update_supplier_list()
+
+        self.run_db("add_supplier", self.pharmacy.suppliers.add, request, on_done=done)
+
+    def update_supplier_list(self):
+        # Update the supplier dropdown in medicine tab
+        def show(supplier_choices):
+            self.med_supplier_combo['values'] = supplier_choices
+            if supplier_choices:
+                self.med_supplier_combo.set("Select Supplier")
+
+        self.run_db("supplier_list", self.pharmacy.suppliers.choices, on_done=show)
+
+    # --- MEDICINE TAB ---
+    def _medicine_tab(self, tab):
+        tk.Label(tab, text="Supplier").grid(row=0, column=0, padx=10, pady=5)
+        self.med_supplier_combo = ttk.Combobox(tab, state="readonly")
+        self.med_supplier_combo.grid(row=0, column=1)
+        self.update_supplier_list()  # Populate supplier dropdown
+
+        self.med_brand = labelled_entry(tab, "Brand", 1)
+        self.med_price = labelled_entry(tab, "Price", 2)
+        self.med_expiry = labelled_entry(tab, "Expiry Date (YYYY-MM-DD)", 3)
+        self.med_manu = labelled_entry(tab, "Manufacture Date (YYYY-MM-DD)", 4)
+        tk.Button(tab, text="Add Medicine", command=self.add_medicine, bg="green", fg="white").grid(row=5, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="View Medicines",
+                  command=lambda: self.view_table("All Medicines", "Medicine", ["Med_ID", "SupplierID", "Brand", "Price", "ExpiryDate", "ManufactureDate"]),
+                  bg="blue", fg="white").grid(row=6, column=0, columnspan=2, pady=5)
+
+        # delete medicine
+        self.del_med_id = labelled_entry(tab, "Delete Medicine ID", 7)
+        tk.Button(tab, text="Delete Medicine", command=self.delete_medicine, bg="red", fg="white").grid(row=8, column=0, columnspan=2, pady=5)
+
+    def add_medicine(self):
+        supplier_text = self.med_supplier_combo.get()
+        if supplier_text == "Select Supplier":
+            supplier_text = ""
+        request = services.NewMedicine(supplier_text, self.med_brand.get(), self.med_price.get(),
+                                       self.med_expiry.get(), self.med_manu.get())
+
+        def done(_):
+            messagebox.showinfo("Success", "Medicine added successfully!")
+            self.med_supplier_combo.set("Select Supplier")
+            clear(self.med_brand, self.med_price, self.med_expiry, self.med_manu)
+
+        self.run_db("add_medicine", self.pharmacy.medicines.add, request, on_done=done)
+
+    def delete_medicine(self):
+        mid = self.del_med_id.get()
+        self.run_db("delete_medicine", self.pharmacy.medicines.delete, mid,
+                    on_done=lambda _: messagebox.showinfo("Deleted", f"Medicine {mid} and its stock removed (if existed)"))
+        clear(self.del_med_id)
+
+    # --- STOCK TAB ---
+    def _stock_tab(self, tab):
+        self.stock_med = labelled_entry(tab, "Medicine ID", 0)
+        self.stock_qty = labelled_entry(tab, "Quantity", 1)
+        self.stock_expiry = labelled_entry(tab, "Expiry Date (YYYY-MM-DD, optional)", 2)
+        self.stock_lot = labelled_entry(tab, "Lot Number (optional)", 3)
+        self.stock_reorder = labelled_entry(tab, "Reorder Level", 9)
+        tk.Button(tab, text="Set Reorder Level", command=self.set_reorder_level, bg="orange", fg="black").grid(row=10, column=0, columnspan=2, pady=5)
+
+        tk.Button(tab, text="Receive Stock", command=self.add_stock, bg="green", fg="white").grid(row=4, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="View Stock", command=lambda: self.view_table("Stock", "Stock", ["Med_ID", "StockQuantity", "LastUpdated"]), bg="blue", fg="white").grid(row=5, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="View Lots",
+                  command=lambda: self.view_table("Stock Lots", "StockLot", ["Lot_ID", "Med_ID", "LotNumber", "ExpiryDate", "Quantity", "LastUpdated"]),
+                  bg="blue", fg="white").grid(row=6, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="Expiring in 30 Days", command=lambda: self.view_expiring(30), bg="orange", fg="black").grid(row=7, column=0, columnspan=2, pady=5)
+
+        # live low-stock panel, updated from alerts rather than by re-querying Stock
+        alert_frame = ttk.LabelFrame(tab, text="Low Stock Alerts")
+        alert_frame.grid(row=0, column=2, rowspan=11, padx=10, pady=5, sticky="nsew")
+        self.alert_tree = ttk.Treeview(alert_frame, columns=alerts.ALERT_COLUMNS, show='headings', height=12)
+        for col in alerts.ALERT_COLUMNS:
+            self.alert_tree.heading(col, text=col)
+            self.alert_tree.column(col, width=100)
+        sort_locally(self.alert_tree)
+        self.alert_tree.pack(fill=tk.BOTH, expand=True)
+        self.alert_count = tk.Label(alert_frame, text="")
+        self.alert_count.pack()
+        self.load_alerts()
+
+    def add_stock(self):
+        request = services.StockReceipt(self.stock_med.get(), self.stock_qty.get(),
+                                        self.stock_expiry.get(), self.stock_lot.get())
+
+        def done(lot_id):
+            messagebox.showinfo("Success", f"Received {request.qty.strip()} as lot {lot_id}")
+            clear(self.stock_med, self.stock_qty, self.stock_expiry, self.stock_lot)
+
+        self.run_db("add_stock", self.pharmacy.stock.receive, request, on_done=done)
+
+    def set_reorder_level(self):
+        medid = self.stock_med.get().strip()
+
+        def done(level):
+            messagebox.showinfo("Success", f"Reorder level for {medid} set to {level}")
+            clear(self.stock_reorder)
+
+        self.run_db("set_reorder_level", self.pharmacy.stock.set_reorder_level, medid, self.stock_reorder.get(), on_done=done)
+
+    def show_alert(self, med_id, brand, qty, level):
+        values = (med_id, brand, qty, level)
+        if self.alert_tree.exists(str(med_id)):
+            self.alert_tree.item(str(med_id), values=values)
+        else:
+            self.alert_tree.insert("", tk.END, iid=str(med_id), values=values)
+
+    def _count_alerts(self):
+        self.alert_count.config(text=f"{len(self.alert_tree.get_children())} medicine(s) below reorder level")
+
+    def load_alerts(self):
+        # One read of the partial index; after that only new alerts are applied.
+        def show(rows):
+            self.alert_tree.delete(*self.alert_tree.get_children())
+            for row in rows:
+                self.show_alert(*row)
+            self._count_alerts()
+            self.root.after(alerts.POLL_MS, self.poll_alerts)
+
+        self.run_db("view_low_stock", self.alert_feed.snapshot, on_done=show)
+
+    def poll_alerts(self):
+        def apply(new_alerts):
+            for _, med_id, brand, kind, qty, level, _ in new_alerts:
+                if kind == "low":
+                    self.show_alert(med_id, brand, qty, level)
+                elif self.alert_tree.exists(str(med_id)):
+                    self.alert_tree.delete(str(med_id))
+            if new_alerts:
+                self._count_alerts()
+            self.root.after(alerts.POLL_MS, self.poll_alerts)
+
+        self.executor.submit(instrument.timed, "poll_alerts", self.alert_feed.poll, on_done=apply, background=True)
+
+    def view_expiring(self, days=30):
+        win = tk.Toplevel(self.root)
+        win.title(f"Expiring within {days} days")
+        win.geometry("800x300")
+
+        tree = ttk.Treeview(win, columns=stock.EXPIRING_COLUMNS, show='headings')
+        for col in stock.EXPIRING_COLUMNS:
+            tree.heading(col, text=col)
+            tree.column(col, width=120)
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        def show(rows):
+            if tree.winfo_exists():
+                fill_tree(tree, rows)
+
+        task = self.run_db("view_expiring", self.pharmacy.stock.expiring, days, on_done=show)
+        win.bind("<Destroy>", lambda e: task.cancel() if e.widget is win else None)
+
+    # --- SALES TAB ---
+    def _sales_tab(self, tab):
+        # type a name, phone number or brand and pick a match, or enter the ID directly
+        tk.Label(tab, text="Customer").grid(row=0, column=0, padx=10, pady=5)
+        self.sale_cust = AutocompleteEntry(tab, self.executor, search.search_customers)
+        self.sale_cust.grid(row=0, column=1)
+        tk.Label(tab, text="Medicine").grid(row=1, column=0, padx=10, pady=5)
+        self.sale_med = AutocompleteEntry(tab, self.executor, search.search_medicines)
+        self.sale_med.grid(row=1, column=1)
+        self.sale_qty = labelled_entry(tab, "Quantity", 2)
+
+        tk.Button(tab, text="Add Sale", command=self.add_sale, bg="green", fg="white").grid(row=3, column=0, columnspan=2, pady=5)
+        tk.Button(tab, text="View Sales",
+                  command=lambda: self.view_table("All Sales", "Sales", ["Sale_ID", "Cust_ID", "Med_ID", "SaleDate", "Quantity", "TotalAmount"],
+                                                  archived=True),
+                  bg="blue", fg="white").grid(row=4, column=0, columnspan=2, pady=5)
+
+        # cart: several medicines for one customer, posted in a single transaction
+        tk.Button(tab, text="Add to Cart", command=self.add_to_cart, bg="green", fg="white").grid(row=5, column=0, columnspan=2, pady=5)
+        self.cart_tree = ttk.Treeview(tab, columns=("Med_ID", "Brand", "Qty", "Price", "LineTotal"), show='headings', height=6)
+        for col in ("Med_ID", "Brand", "Qty", "Price", "LineTotal"):
+            self.cart_tree.heading(col, text=col)
+            self.cart_tree.column(col, width=100)
+        self.cart_tree.grid(row=6, column=0, columnspan=2, padx=10, pady=5)
+        self.cart_total = tk.Label(tab, text="Cart Total: 0.00")
+        self.cart_total.grid(row=7, column=0, columnspan=2)
+        tk.Button(tab, text="Remove Selected", command=self.remove_from_cart, bg="red", fg="white").grid(row=8, column=0, pady=5)
+        tk.Button(tab, text="Checkout Cart", command=self.checkout_cart, bg="green", fg="white").grid(row=8, column=1, pady=5)
+
+    def add_sale(self):
+        request = services.SaleRequest(self.sale_cust.get_id(), self.sale_med.get_id(), self.sale_qty.get())
+
+        def done(result):
+            messagebox.showinfo("Success", f"Sale added! Total Amount: {result.total}")
+            clear(self.sale_cust, self.sale_med, self.sale_qty)
+
+        self.run_db("add_sale", self.pharmacy.sales.sell, request, on_done=done)
+
+    def refresh_cart(self):
+        self.cart_tree.delete(*self.cart_tree.get_children())
+        total = 0
+        for med_id, qty in self.cart.items():
+            # amounts in whole cents, as the quote and Sales keep them
+            brand, price, cents = self.cart_prices[med_id]
+            amount = qty * cents
+            self.cart_tree.insert("", tk.END, iid=str(med_id),
+                                  values=(med_id, brand, qty, price, codec.format_money(amount)))
+            total += amount
+        self.cart_total.config(text=f"Cart Total: {codec.format_money(total)}")
+
+    def add_to_cart(self):
+        med_id_val = self.sale_med.get_id()
+        qty_val = self.sale_qty.get().strip()
+        if not med_id_val or not qty_val:
+            messagebox.showwarning("Input Error", "Medicine ID and Quantity are required")
+            return
+
+        def done(lines):
+            line = lines[0]
+            self.cart.add(line.med_id, line.qty)
+            self.cart_prices[line.med_id] = (line.brand, line.price, codec.to_cents(line.price))
+            self.refresh_cart()
+            clear(self.sale_med, self.sale_qty)
+            self.sale_med.focus_set()
+
+        # a catalog miss or a stale catalog reloads from the database, so quote on a worker
+        # too; like every run_db job, it waits behind the first=True schema check
+        self.run_db("add_to_cart", self.pharmacy.sales.quote, [(med_id_val, qty_val)], on_done=done)
+
+    def remove_from_cart(self):
+        for iid in self.cart_tree.selection():
+            self.cart.remove(iid)
+        self.refresh_cart()
+
+    def checkout_cart(self):
+        request = services.CartRequest(self.sale_cust.get_id(), self.cart.items())
+
+        def done(result):
+            self.cart.clear()
+            self.refresh_cart()
+            clear(self.sale_cust)
+            messagebox.showinfo("Success", f"Sale of {len(result.lines)} item(s) added! Total Amount: {result.total}")
+
+        self.run_db("checkout_cart", self.pharmacy.sales.checkout, request, on_done=done)
+
+    # --- REPORTS TAB ---
+    def _reports_tab(self, tab):
+        filters = ttk.Frame(tab)
+        filters.grid(row=0, column=0, columnspan=2, pady=5)
+        tk.Label(filters, text="From (YYYY-MM-DD)").pack(side=tk.LEFT, padx=5)
+        self.report_from = tk.Entry(filters, width=12)
+        self.report_from.insert(0, datetime.now().strftime("%Y-%m-01"))
+        self.report_from.pack(side=tk.LEFT)
+        tk.Label(filters, text="To").pack(side=tk.LEFT, padx=5)
+        self.report_to = tk.Entry(filters, width=12)
+        self.report_to.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        self.report_to.pack(side=tk.LEFT)
+        tk.Button(filters, text="Refresh", command=self.refresh_reports, bg="blue", fg="white").pack(side=tk.LEFT, padx=10)
+
+        self.report_total = tk.Label(tab, text="")
+        self.report_total.grid(row=1, column=0, columnspan=2)
+        tk.Label(tab, text="Daily Revenue").grid(row=2, column=0)
+        tk.Label(tab, text="Top Medicines").grid(row=2, column=1)
+        self.report_daily = report_tree(tab, reports.DAILY_COLUMNS, 3, 0)
+        self.report_medicines = report_tree(tab, reports.MEDICINE_COLUMNS, 3, 1)
+        tk.Label(tab, text="Top Customers").grid(row=4, column=0)
+        self.report_customers = report_tree(tab, reports.CUSTOMER_COLUMNS, 5, 0)
+        self.refresh_reports()
+
+    def refresh_reports(self):
+        def show(result):
+            fill_tree(self.report_daily, result.daily)
+            fill_tree(self.report_medicines, result.medicines)
+            fill_tree(self.report_customers, result.customers)
+            self.report_total.config(text=f"Revenue: {result.revenue:.2f} over {result.sales} sales")
+
+        self.run_db("refresh_reports", self.pharmacy.reports.summary, self.report_from.get(), self.report_to.get(), on_done=show)
+
+    # --- DIAGNOSTICS TAB ---
+    def _diagnostics_tab(self, tab):
+        self.diagnostics_tab = tab
+        tk.Label(tab, text=f"Slow log: {instrument.SLOW_LOG} (over {instrument.SLOW_MS:g} ms)").pack(pady=5)
+        self.diag_operations = self._diagnostics_tree(tab, OPERATION_COLUMNS, 8)
+        self.diag_statements = self._diagnostics_tree(tab, STATEMENT_COLUMNS, 10)
+        self.diag_statements.column("SQL", width=260)
+        tk.Button(tab, text="Reset", command=self.reset_diagnostics, bg="red", fg="white").pack(pady=5)
+        self.diag_startup = self._diagnostics_tree(tab, STARTUP_COLUMNS, 5)
+        backups = ttk.Frame(tab)
+        backups.pack(fill=tk.X, padx=5, pady=5)
+        tk.Button(backups, text="Back Up Now", command=self.backup_now, bg="blue", fg="white").pack(side=tk.LEFT)
+        self.backup_label = tk.Label(backups, text=self.backup_status)
+        self.backup_label.pack(side=tk.LEFT, padx=10)
+        self.refresh_diagnostics()
+
+    def _diagnostics_tree(self, parent, columns, height):
+        tree = ttk.Treeview(parent, columns=columns, show='headings', height=height)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=80)
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        return tree
+
+    def refresh_diagnostics(self):
+        # in-memory counters only, so this runs on the Tk thread
+        if self.tabs.select() == str(self.diagnostics_tab):
+            fill_tree(self.diag_operations, [(name, count, *(f"{v:.2f}" for v in values))
+                                             for name, count, *values in instrument.operation_rows()])
+            fill_tree(self.diag_statements, [(op, sql, count, *(f"{v:.2f}" for v in values))
+                                             for op, sql, count, *values in instrument.statement_rows()])
+            fill_tree(self.diag_startup, self.startup.rows())
+        self.root.after(DIAGNOSTICS_MS, self.refresh_diagnostics)
+
+    def reset_diagnostics(self):
+        instrument.reset()
+        fill_tree(self.diag_operations, [])
+        fill_tree(self.diag_statements, [])
+
+    # --- BACKUPS ---
+    def backup_now(self):
+        self._show_backup_status("Backing up...")
+        self.backup_executor.submit(instrument.timed, "backup", backup.take_backup, on_done=self._backup_taken)
+
+    def scheduled_backup(self):
+        # the next one is timed from when this one is over, whatever the outcome
+        def again(_=None):
+            self.root.after(int(backup.INTERVAL_HOURS * 3600 * 1000), self.scheduled_backup)
+
+        def failed(e):
+            self._show_backup_status(f"Backup failed: {e}")
+            again()
+
+        def taken(result):
+            self._backup_taken(result)
+            again()
+
+        self.backup_executor.submit(instrument.timed, "backup", backup.take_backup, on_done=taken, on_error=failed,
+                                    background=True)
+
+    def _backup_taken(self, result):
+        # integrity_check runs in its own process; its outcome is picked up here
+        verifier = backup.start_verify(result.path)
+        name = os.path.basename(result.path)
+        self._show_backup_status(f"{name}: {result.pages} pages in {result.seconds:.1f}s, checking...")
+
+        def check():
+            if verifier.poll() is None:
+                self.root.after(VERIFY_POLL_MS, check)
+            elif verifier.returncode == 0:
+                self._show_backup_status(f"{name}: {result.pages} pages in {result.seconds:.1f}s, verified")
+                # only a verified backup may push out older ones
+                self.backup_executor.submit(backup.rotate, result.path, background=True)
+            else:
+                self._show_backup_status(f"{name} FAILED integrity_check")
+                messagebox.showerror("Backup Failed", f"{result.path} failed its integrity check and was kept as .bad")
+
+        self.root.after(VERIFY_POLL_MS, check)
+
+    def _show_backup_status(self, text):
+        self.backup_status = text
+        if self.backup_label is not None:
+            self.backup_label.config(text=text)
+
+
+def main():
+    # only the app's own connections are timed (see instrument.py)
+    instrument.enable()
+    startup = StartupTimes(STARTED)
+    startup.since_start("imports")
+    with startup.measure("window"):
+        root = tk.Tk()
+    with startup.measure("widgets"):
+        app = PharmacyApp(root, services.Pharmacy(catalog=catalog), startup)
+    root.mainloop()
+    app.close()
+    catalog.close()
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
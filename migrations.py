@@ -0,0 +1,681 @@
+import os
+import sys
+
+import db
+
+
+# Rows copied per transaction when a migration rebuilds a large table.
+COPY_BATCH = 50000
+
+
+# --- MIGRATION STEPS ---
+# Each step brings the schema from the previous version to its own. Steps run
+# in order, once, and the version is recorded in PRAGMA user_version. A step
+# may return a message for the operator (see migrate's notify).
+def _baseline(conn):
+    # Customer Table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Customer (
+        Cust_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Name TEXT NOT NULL CHECK(Name REGEXP '^[A-Za-z ]+$'),
+        Address TEXT,
+        PhoneNumber TEXT UNIQUE NOT NULL CHECK(PhoneNumber REGEXP '^[0-9]{10}$')
+    )
+    ''')
+
+    # Employee Table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Employee (
+        Emp_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Name TEXT NOT NULL CHECK(Name REGEXP '^[A-Za-z ]+$'),
+        Role TEXT NOT NULL,
+        Email TEXT UNIQUE NOT NULL CHECK(Email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'),
+        PhoneNumber TEXT UNIQUE NOT NULL CHECK(PhoneNumber REGEXP '^[0-9]{10}$')
+    )
+    ''')
+
+    # Supplier Table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Supplier (
+        Supplier_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Name TEXT NOT NULL CHECK(Name REGEXP '^[A-Za-z ]+$'),
+        Contact TEXT CHECK(Contact REGEXP '^[0-9]{10}$')
+    )
+    ''')
+
+    # Medicine Table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Medicine (
+        Med_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        SupplierID INTEGER NOT NULL,
+        Brand TEXT NOT NULL,
+        Price REAL NOT NULL CHECK(Price > 0),
+        ExpiryDate TEXT NOT NULL,
+        ManufactureDate TEXT NOT NULL,
+        CHECK(date(ExpiryDate) > date(ManufactureDate)),
+        FOREIGN KEY(SupplierID) REFERENCES Supplier(Supplier_ID)
+    )
+    ''')
+
+    # Sales Table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Sales (
+        Sale_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Cust_ID INTEGER NOT NULL,
+        Med_ID INTEGER NOT NULL,
+        SaleDate TEXT NOT NULL,
+        Quantity INTEGER NOT NULL CHECK(Quantity > 0),
+        TotalAmount REAL NOT NULL CHECK(TotalAmount >= 0),
+        FOREIGN KEY(Cust_ID) REFERENCES Customer(Cust_ID),
+        FOREIGN KEY(Med_ID) REFERENCES Medicine(Med_ID)
+    )
+    ''')
+
+    # Stock Table
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Stock (
+        Med_ID INTEGER PRIMARY KEY,
+        StockQuantity INTEGER NOT NULL CHECK(StockQuantity >= 0),
+        LastUpdated TEXT NOT NULL,
+        FOREIGN KEY(Med_ID) REFERENCES Medicine(Med_ID)
+    )
+    ''')
+
+
+def _customer_checks(conn):
+    # Databases made by mainbackup.py have a Customer table without the CHECKs.
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'Customer'").fetchone()[0]
+    if "CHECK" in sql:
+        return
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS Customer_Rejected (
+        Cust_ID INTEGER PRIMARY KEY,
+        Name TEXT,
+        Address TEXT,
+        PhoneNumber TEXT
+    )
+    ''')
+    valid = "IFNULL(Name REGEXP '^[A-Za-z ]+$' AND PhoneNumber REGEXP '^[0-9]{10}$', 0)"
+    copy_and_swap(conn, "Customer", '''
+    CREATE TABLE Customer_new (
+        Cust_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Name TEXT NOT NULL CHECK(Name REGEXP '^[A-Za-z ]+$'),
+        Address TEXT,
+        PhoneNumber TEXT UNIQUE NOT NULL CHECK(PhoneNumber REGEXP '^[0-9]{10}$')
+    )
+    ''', "Cust_ID", ["Cust_ID", "Name", "Address", "PhoneNumber"],
+        keep=valid, reject_table="Customer_Rejected")
+    rejected = conn.execute("SELECT COUNT(*) FROM Customer_Rejected").fetchone()[0]
+    if rejected:
+        return (f"{rejected} customer(s) with a name other than letters and spaces or a phone number "
+                "other than 10 digits were moved to Customer_Rejected; correct them there and add them again.")
+
+
+def _indexes(conn):
+    # low-stock report: range on quantity, covering so Stock rows are not read
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_quantity ON Stock(StockQuantity, Med_ID, LastUpdated)")
+    # sales by customer / medicine, in date order within each
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_cust_date ON Sales(Cust_ID, SaleDate)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_med_date ON Sales(Med_ID, SaleDate)")
+    # date-range reports and exports
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON Sales(SaleDate)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_medicine_supplier ON Medicine(SupplierID)")
+    # supplier dropdown: ORDER BY Name straight off a covering index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_supplier_name ON Supplier(Name, Supplier_ID)")
+
+
+def _sales_aggregates(conn):
+    # Per-day totals by medicine and by customer, kept current by a trigger on
+    # Sales (which the app only ever appends to). reports.rebuild() recomputes them.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS SalesDailyMedicine (
+        SaleDate TEXT NOT NULL,
+        Med_ID INTEGER NOT NULL,
+        Units INTEGER NOT NULL,
+        Revenue REAL NOT NULL,
+        SaleCount INTEGER NOT NULL,
+        PRIMARY KEY (SaleDate, Med_ID)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS SalesDailyCustomer (
+        SaleDate TEXT NOT NULL,
+        Cust_ID INTEGER NOT NULL,
+        Units INTEGER NOT NULL,
+        Revenue REAL NOT NULL,
+        SaleCount INTEGER NOT NULL,
+        PRIMARY KEY (SaleDate, Cust_ID)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_sales_daily_totals AFTER INSERT ON Sales
+    BEGIN
+        INSERT INTO SalesDailyMedicine (SaleDate, Med_ID, Units, Revenue, SaleCount)
+        VALUES (NEW.SaleDate, NEW.Med_ID, NEW.Quantity, NEW.TotalAmount, 1)
+        ON CONFLICT (SaleDate, Med_ID) DO UPDATE SET
+            Units = Units + excluded.Units,
+            Revenue = Revenue + excluded.Revenue,
+            SaleCount = SaleCount + 1;
+        INSERT INTO SalesDailyCustomer (SaleDate, Cust_ID, Units, Revenue, SaleCount)
+        VALUES (NEW.SaleDate, NEW.Cust_ID, NEW.Quantity, NEW.TotalAmount, 1)
+        ON CONFLICT (SaleDate, Cust_ID) DO UPDATE SET
+            Units = Units + excluded.Units,
+            Revenue = Revenue + excluded.Revenue,
+            SaleCount = SaleCount + 1;
+    END
+    ''')
+    conn.execute('''
+    INSERT INTO SalesDailyMedicine (SaleDate, Med_ID, Units, Revenue, SaleCount)
+    SELECT SaleDate, Med_ID, SUM(Quantity), SUM(TotalAmount), COUNT(*)
+    FROM Sales GROUP BY SaleDate, Med_ID
+    ''')
+    conn.execute('''
+    INSERT INTO SalesDailyCustomer (SaleDate, Cust_ID, Units, Revenue, SaleCount)
+    SELECT SaleDate, Cust_ID, SUM(Quantity), SUM(TotalAmount), COUNT(*)
+    FROM Sales GROUP BY SaleDate, Cust_ID
+    ''')
+
+
+def _catalog_changes(conn):
+    # Change log for Medicine and Supplier so catalog caches in any process can
+    # reload exactly the rows that changed. Only the newest 10000 are kept.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS CatalogChanges (
+        Change_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        TableName TEXT NOT NULL,
+        RowKey INTEGER NOT NULL
+    )
+    ''')
+    for table, key in (("Medicine", "Med_ID"), ("Supplier", "Supplier_ID")):
+        for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_{table.lower()}_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO CatalogChanges (TableName, RowKey) VALUES ('{table}', {ref}.{key});
+            END
+            ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_prune AFTER INSERT ON CatalogChanges
+    BEGIN
+        DELETE FROM CatalogChanges WHERE Change_ID <= NEW.Change_ID - 10000;
+    END
+    ''')
+
+
+def _search_index(conn):
+    # External-content FTS5 indexes for the Sales tab type-ahead. Prefix
+    # indexes of 2 and 3 characters keep short "jo*" queries off the full
+    # term list; triggers keep both in step with their base tables. Phone
+    # numbers are searched through Customer's own UNIQUE index instead.
+    for search, table, key, columns in (("CustomerSearch", "Customer", "Cust_ID", ("Name",)),
+                                        ("MedicineSearch", "Medicine", "Med_ID", ("Brand",))):
+        cols = ", ".join(columns)
+        new_cols = ", ".join(f"NEW.{c}" for c in columns)
+        old_cols = ", ".join(f"OLD.{c}" for c in columns)
+        conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {search} USING fts5(
+            {cols}, content='{table}', content_rowid='{key}',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""")
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{search.lower()}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {search} (rowid, {cols}) VALUES (NEW.{key}, {new_cols});
+        END""")
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{search.lower()}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {search} ({search}, rowid, {cols}) VALUES ('delete', OLD.{key}, {old_cols});
+        END""")
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{search.lower()}_update AFTER UPDATE OF {cols} ON {table}
+        BEGIN
+            INSERT INTO {search} ({search}, rowid, {cols}) VALUES ('delete', OLD.{key}, {old_cols});
+            INSERT INTO {search} (rowid, {cols}) VALUES (NEW.{key}, {new_cols});
+        END""")
+        conn.execute(f"INSERT INTO {search} ({search}) VALUES ('rebuild')")
+
+
+def _stock_lots(conn):
+    # Stock per lot, each with its own expiry. Stock.StockQuantity stays as
+    # the per-medicine total and is kept equal to the sum of its lots by
+    # triggers. Lots are deleted once used up, so the table (and a FEFO
+    # walk over it) only ever holds stock on hand.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS StockLot (
+        Lot_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Med_ID INTEGER NOT NULL,
+        LotNumber TEXT,
+        ExpiryDate TEXT NOT NULL,
+        Quantity INTEGER NOT NULL CHECK(Quantity >= 0),
+        LastUpdated TEXT NOT NULL,
+        FOREIGN KEY(Med_ID) REFERENCES Medicine(Med_ID)
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stocklot_med_expiry ON StockLot(Med_ID, ExpiryDate)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stocklot_expiry ON StockLot(ExpiryDate)")
+
+    # existing stock becomes one lot per medicine, expiring with the medicine
+    conn.execute('''
+    INSERT INTO StockLot (Med_ID, ExpiryDate, Quantity, LastUpdated)
+    SELECT s.Med_ID, COALESCE(m.ExpiryDate, '9999-12-31'), s.StockQuantity, s.LastUpdated
+    FROM Stock s LEFT JOIN Medicine m ON m.Med_ID = s.Med_ID
+    WHERE s.StockQuantity > 0
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stocklot_insert AFTER INSERT ON StockLot
+    BEGIN
+        INSERT INTO Stock (Med_ID, StockQuantity, LastUpdated)
+        VALUES (NEW.Med_ID, NEW.Quantity, NEW.LastUpdated)
+        ON CONFLICT(Med_ID) DO UPDATE SET StockQuantity = StockQuantity + excluded.StockQuantity,
+                                          LastUpdated = excluded.LastUpdated;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stocklot_update AFTER UPDATE OF Quantity ON StockLot
+    BEGIN
+        UPDATE Stock SET StockQuantity = StockQuantity + NEW.Quantity - OLD.Quantity,
+                         LastUpdated = NEW.LastUpdated
+        WHERE Med_ID = NEW.Med_ID;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stocklot_delete AFTER DELETE ON StockLot
+    BEGIN
+        UPDATE Stock SET StockQuantity = StockQuantity - OLD.Quantity WHERE Med_ID = OLD.Med_ID;
+    END
+    ''')
+
+
+def _reorder_alerts(conn):
+    # Per-medicine reorder levels. The partial index holds only medicines
+    # below their level, so listing them never walks the whole Stock table.
+    # The trigger writes an event only when a medicine crosses its level in
+    # either direction; AlertFeed reads events by Alert_ID.
+    conn.execute("ALTER TABLE Stock ADD COLUMN ReorderLevel INTEGER NOT NULL DEFAULT 5 CHECK(ReorderLevel >= 0)")
+    conn.execute("DROP INDEX IF EXISTS idx_stock_quantity")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_low ON Stock(StockQuantity) WHERE StockQuantity < ReorderLevel")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS StockAlert (
+        Alert_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Med_ID INTEGER NOT NULL,
+        Kind TEXT NOT NULL CHECK(Kind IN ('low', 'restocked', 'removed')),
+        StockQuantity INTEGER NOT NULL,
+        ReorderLevel INTEGER NOT NULL,
+        CreatedAt TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stock_alert_insert AFTER INSERT ON Stock
+    WHEN NEW.StockQuantity < NEW.ReorderLevel
+    BEGIN
+        INSERT INTO StockAlert (Med_ID, Kind, StockQuantity, ReorderLevel)
+        VALUES (NEW.Med_ID, 'low', NEW.StockQuantity, NEW.ReorderLevel);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stock_alert_update AFTER UPDATE OF StockQuantity, ReorderLevel ON Stock
+    WHEN (OLD.StockQuantity < OLD.ReorderLevel) != (NEW.StockQuantity < NEW.ReorderLevel)
+    BEGIN
+        INSERT INTO StockAlert (Med_ID, Kind, StockQuantity, ReorderLevel)
+        VALUES (NEW.Med_ID, CASE WHEN NEW.StockQuantity < NEW.ReorderLevel THEN 'low' ELSE 'restocked' END,
+                NEW.StockQuantity, NEW.ReorderLevel);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stock_alert_delete AFTER DELETE ON Stock
+    WHEN OLD.StockQuantity < OLD.ReorderLevel
+    BEGIN
+        INSERT INTO StockAlert (Med_ID, Kind, StockQuantity, ReorderLevel)
+        VALUES (OLD.Med_ID, 'removed', OLD.StockQuantity, OLD.ReorderLevel);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_stock_alert_prune AFTER INSERT ON StockAlert
+    BEGIN
+        DELETE FROM StockAlert WHERE Alert_ID <= NEW.Alert_ID - 10000;
+    END
+    ''')
+
+
+def _stock_ledger(conn):
+    # Append-only ledger of every change to a lot, written by triggers.
+    # LastMovement on StockLot says why its Quantity changed; writers set it
+    # together with the new Quantity and LastUpdated (the movement date).
+    # StockSnapshot holds compacted per-medicine balances (see ledger.py).
+    conn.execute("ALTER TABLE StockLot ADD COLUMN LastMovement TEXT NOT NULL DEFAULT 'receipt'")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS StockMovement (
+        Movement_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Med_ID INTEGER NOT NULL,
+        Lot_ID INTEGER NOT NULL,
+        Kind TEXT NOT NULL CHECK(Kind IN ('opening', 'receipt', 'sale', 'adjustment', 'delete')),
+        Quantity INTEGER NOT NULL,
+        MovedOn TEXT NOT NULL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_movement_med_date ON StockMovement(Med_ID, MovedOn)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_movement_date ON StockMovement(MovedOn)")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS StockSnapshot (
+        SnapshotDate TEXT NOT NULL,
+        Med_ID INTEGER NOT NULL,
+        Quantity INTEGER NOT NULL,
+        PRIMARY KEY (SnapshotDate, Med_ID)
+    ) WITHOUT ROWID
+    ''')
+
+    # lots already on hand open the ledger
+    conn.execute('''
+    INSERT INTO StockMovement (Med_ID, Lot_ID, Kind, Quantity, MovedOn)
+    SELECT Med_ID, Lot_ID, 'opening', Quantity, LastUpdated FROM StockLot WHERE Quantity != 0
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_movement_insert AFTER INSERT ON StockLot
+    WHEN NEW.Quantity != 0
+    BEGIN
+        INSERT INTO StockMovement (Med_ID, Lot_ID, Kind, Quantity, MovedOn)
+        VALUES (NEW.Med_ID, NEW.Lot_ID, NEW.LastMovement, NEW.Quantity, NEW.LastUpdated);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_movement_update AFTER UPDATE OF Quantity ON StockLot
+    WHEN NEW.Quantity != OLD.Quantity
+    BEGIN
+        INSERT INTO StockMovement (Med_ID, Lot_ID, Kind, Quantity, MovedOn)
+        VALUES (NEW.Med_ID, NEW.Lot_ID, NEW.LastMovement, NEW.Quantity - OLD.Quantity, NEW.LastUpdated);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_movement_delete AFTER DELETE ON StockLot
+    WHEN OLD.Quantity != 0
+    BEGIN
+        INSERT INTO StockMovement (Med_ID, Lot_ID, Kind, Quantity, MovedOn)
+        VALUES (OLD.Med_ID, OLD.Lot_ID, 'delete', -OLD.Quantity, date('now', 'localtime'));
+    END
+    ''')
+
+
+def _sort_indexes(conn):
+    # Table views sort by a column with a keyset on (column, key); a
+    # single-column index already ends in the rowid, so it serves that
+    # order directly. Only the columns worth sorting on get one.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_amount ON Sales(TotalAmount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customer_name ON Customer(Name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_medicine_brand ON Medicine(Brand)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_medicine_expiry ON Medicine(ExpiryDate)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_quantity ON Stock(StockQuantity)")
+
+
+def _sales_archive(conn):
+    # Months of Sales moved out to archive files by archive.py: one file per
+    # month, named relative to the archive directory. Rows and Revenue count
+    # what has been removed from the live table so far.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS SalesArchive (
+        Month TEXT PRIMARY KEY CHECK(Month GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]'),
+        FileName TEXT NOT NULL,
+        Rows INTEGER NOT NULL DEFAULT 0,
+        Revenue REAL NOT NULL DEFAULT 0,
+        ArchivedOn TEXT NOT NULL
+    )
+    ''')
+
+
+# Encodings of codec.py, written so a step that already ran leaves values alone.
+_DAY = "CASE WHEN typeof({0}) = 'text' THEN CAST(julianday({0}) - 2440587.5 AS INTEGER) ELSE {0} END"
+_CENTS = "CASE WHEN typeof({0}) = 'real' THEN CAST(round({0} * 100) AS INTEGER) ELSE {0} END"
+
+
+def _rebuild(conn, table, create_sql, columns, expressions):
+    # Rebuild a small table in the current transaction. legacy_alter_table
+    # lets the rename through while a trigger refers to the dropped table.
+    conn.execute(create_sql)
+    conn.execute(f"INSERT INTO {table}_new ({', '.join(columns)}) SELECT {', '.join(expressions)} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+
+
+def _compact_sales(conn):
+    # SaleDate becomes a day number and money integer cents (codec.py) in
+    # Sales, the daily aggregates and the archives. Sales is copied in
+    # batches; its indexes and the aggregates trigger come across with it.
+    import archive
+
+    for table, key in (("SalesDailyMedicine", "Med_ID"), ("SalesDailyCustomer", "Cust_ID")):
+        _rebuild(conn, table, f'''
+        CREATE TABLE {table}_new (
+            SaleDate INTEGER NOT NULL,
+            {key} INTEGER NOT NULL,
+            Units INTEGER NOT NULL,
+            Revenue INTEGER NOT NULL,
+            SaleCount INTEGER NOT NULL,
+            PRIMARY KEY (SaleDate, {key})
+        ) WITHOUT ROWID
+        ''', ["SaleDate", key, "Units", "Revenue", "SaleCount"],
+            [_DAY.format("SaleDate"), key, "Units", _CENTS.format("Revenue"), "SaleCount"])
+
+    _rebuild(conn, "SalesArchive", '''
+    CREATE TABLE SalesArchive_new (
+        Month TEXT PRIMARY KEY CHECK(Month GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]'),
+        FileName TEXT NOT NULL,
+        Rows INTEGER NOT NULL DEFAULT 0,
+        Revenue INTEGER NOT NULL DEFAULT 0,
+        ArchivedOn TEXT NOT NULL
+    )
+    ''', ["Month", "FileName", "Rows", "Revenue", "ArchivedOn"],
+        ["Month", "FileName", "Rows", _CENTS.format("Revenue"), "ArchivedOn"])
+
+    columns = ["Sale_ID", "Cust_ID", "Med_ID", "SaleDate", "Quantity", "TotalAmount"]
+    expressions = ["Sale_ID", "Cust_ID", "Med_ID", _DAY.format("SaleDate"), "Quantity", _CENTS.format("TotalAmount")]
+    copy_and_swap(conn, "Sales", '''
+    CREATE TABLE Sales_new (
+        Sale_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Cust_ID INTEGER NOT NULL,
+        Med_ID INTEGER NOT NULL,
+        SaleDate INTEGER NOT NULL,
+        Quantity INTEGER NOT NULL CHECK(Quantity > 0),
+        TotalAmount INTEGER NOT NULL CHECK(TotalAmount >= 0),
+        FOREIGN KEY(Cust_ID) REFERENCES Customer(Cust_ID),
+        FOREIGN KEY(Med_ID) REFERENCES Medicine(Med_ID)
+    )
+    ''', "Sale_ID", columns, expressions=expressions)
+
+    # copy_and_swap has committed, so archives can be attached one at a time
+    folder = archive.archive_dir(conn)
+    for (file_name,) in conn.execute("SELECT FileName FROM SalesArchive").fetchall():
+        conn.execute("ATTACH DATABASE ? AS arc", (os.path.join(folder, file_name),))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("ALTER TABLE arc.Sales RENAME TO Sales_old")
+                create_table, *create_indexes = archive.ARCHIVE_SCHEMA
+                conn.execute(create_table)
+                conn.execute(f"INSERT INTO arc.Sales ({', '.join(columns)}) "
+                             f"SELECT {', '.join(expressions)} FROM arc.Sales_old")
+                # the old indexes go with Sales_old; their names are free after that
+                conn.execute("DROP TABLE arc.Sales_old")
+                for sql in create_indexes:
+                    conn.execute(sql)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.execute("DETACH DATABASE arc")
+
+
+# (version, description, step). Append new steps; never edit or reorder old ones.
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "CHECK constraints on legacy Customer table", _customer_checks),
+    (3, "secondary indexes", _indexes),
+    (4, "daily sales aggregates", _sales_aggregates),
+    (5, "catalog change log", _catalog_changes),
+    (6, "type-ahead search index", _search_index),
+    (7, "stock lots", _stock_lots),
+    (8, "reorder levels and stock alerts", _reorder_alerts),
+    (9, "stock movement ledger and snapshots", _stock_ledger),
+    (10, "indexes for sorted table views", _sort_indexes),
+    (11, "sales archive catalog", _sales_archive),
+    (12, "day numbers and integer cents in Sales", _compact_sales),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# --- TABLE REWRITES ---
+def copy_and_swap(conn, table, create_sql, key, columns, keep=None, reject_table=None, expressions=None):
+    """Rebuild table from create_sql (which must create <table>_new).
+
+    Rows are copied in key order, COPY_BATCH per transaction, so other
+    connections can write between batches; a run that is interrupted picks
+    up where it stopped. Triggers log the key of every row inserted, updated
+    or deleted meanwhile in <table>_changed; the final transaction re-copies
+    those rows, copies whatever arrived past the last batch, and swaps the
+    tables, keeping the table's indexes, triggers and AUTOINCREMENT counter. Rows failing
+    the keep condition go to reject_table instead. expressions, one per
+    column, convert values on the way (default: the columns as they are).
+
+    Needs the connection in autocommit mode (as migrate() sets it) and
+    commits any transaction already open before it starts.
+    """
+    if conn.in_transaction:
+        conn.execute("COMMIT")
+    new = f"{table}_new"
+    cols = ", ".join(columns)
+    values = ", ".join(expressions or columns)
+    keep = keep or "1"
+    changed = f"{table}_changed"
+    conn.execute("BEGIN IMMEDIATE")
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (new,)).fetchone()
+    if not exists:
+        conn.execute(create_sql)
+    # in the main schema, not TEMP: the writes to track come from other connections
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {changed} ({key} PRIMARY KEY) WITHOUT ROWID")
+    for event, logged in (("INSERT", ["NEW"]), ("UPDATE", ["OLD", "NEW"]), ("DELETE", ["OLD"])):
+        body = " ".join(f"INSERT OR IGNORE INTO {changed} VALUES ({row}.{key});" for row in logged)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {changed}_{event.lower()} AFTER {event} ON {table} "
+                     f"BEGIN {body} END")
+    conn.execute("COMMIT")
+
+    def copy_batch(after, limit):
+        rows = conn.execute(f"SELECT {key} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT 1 OFFSET ?",
+                            (after, limit - 1)).fetchone() if limit else None
+        upper = rows[0] if rows else None
+        bound = f"{key} > ?" + (f" AND {key} <= ?" if upper is not None else "")
+        params = (after, upper) if upper is not None else (after,)
+        conn.execute(f"INSERT INTO {new} ({cols}) SELECT {values} FROM {table} WHERE {bound} AND {keep}", params)
+        if reject_table:
+            conn.execute(f"INSERT OR REPLACE INTO {reject_table} ({cols}) "
+                         f"SELECT {cols} FROM {table} WHERE {bound} AND NOT {keep}", params)
+        return upper
+
+    def last_copied():
+        done = [conn.execute(f"SELECT MAX({key}) FROM {new}").fetchone()[0]]
+        if reject_table:
+            done.append(conn.execute(f"SELECT MAX({key}) FROM {reject_table}").fetchone()[0])
+        return max([d for d in done if d is not None], default=-1)
+
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        upper = copy_batch(last_copied(), COPY_BATCH)
+        conn.execute("COMMIT")
+        if upper is None:
+            break
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for event in ("insert", "update", "delete"):
+            conn.execute(f"DROP TRIGGER {changed}_{event}")
+        done = last_copied()
+        # rows changed in ranges already copied are copied again, or dropped if deleted
+        conn.execute(f"DELETE FROM {new} WHERE {key} IN (SELECT {key} FROM {changed})")
+        recopy = f"{key} IN (SELECT {key} FROM {changed} WHERE {key} <= ?)"
+        conn.execute(f"INSERT INTO {new} ({cols}) SELECT {values} FROM {table} WHERE {recopy} AND {keep}",
+                     (done,))
+        if reject_table:
+            conn.execute(f"DELETE FROM {reject_table} WHERE {key} IN (SELECT {key} FROM {changed})")
+            conn.execute(f"INSERT INTO {reject_table} ({cols}) "
+                         f"SELECT {cols} FROM {table} WHERE {recopy} AND NOT {keep}", (done,))
+        conn.execute(f"DROP TABLE {changed}")
+        copy_batch(done, None)
+        schema = [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+            (table,))]
+        sequence = _sequence(conn, table)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {new} RENAME TO {table}")
+        for sql in schema:
+            conn.execute(sql)
+        if sequence is not None:
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, sequence))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _sequence(conn, table):
+    # highest AUTOINCREMENT key ever handed out, None without AUTOINCREMENT
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        return None
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    return row[0] if row else None
+
+
+# --- RUNNER ---
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def print_notice(message):
+    print(f"migration: {message}", file=sys.stderr)
+
+
+def migrate(conn=None, notify=print_notice):
+    """Bring the database up to SCHEMA_VERSION; returns the version reached.
+
+    When the database is already current this is a single PRAGMA read.
+    Messages from the steps go to notify once their step has committed;
+    by default they are printed to stderr.
+    """
+    conn = conn or db.get_connection()
+    version = current_version(conn)
+    if version == SCHEMA_VERSION:
+        return version
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than this app ({SCHEMA_VERSION})")
+
+    conn.commit()
+    isolation = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for step_version, description, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                message = step(conn)
+                # steps that rewrite tables in batches commit as they go
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                conn.execute(f"PRAGMA user_version = {step_version}")
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            version = step_version
+            if message:
+                notify(message)
+    finally:
+        conn.isolation_level = isolation
+    return version
@@ -0,0 +1,17 @@
+# SQL used by the Tk handlers in main.py. Statements that read or filter rows
+# live here so query_audit.py can check their plans without starting the GUI.
+
+LOW_STOCK = '''
+    SELECT s.Med_ID, m.Brand, s.StockQuantity, s.ReorderLevel
+    FROM Stock s JOIN Medicine m ON s.Med_ID = m.Med_ID
+    WHERE s.StockQuantity < s.ReorderLevel
+    ORDER BY s.StockQuantity ASC
+'''
+
+DELETE_CUSTOMER = "DELETE FROM Customer WHERE Cust_ID=?"
+
+DELETE_EMPLOYEE = "DELETE FROM Employee WHERE Emp_ID=?"
+
+DELETE_STOCK = "DELETE FROM Stock WHERE Med_ID=?"
+
+DELETE_MEDICINE = "DELETE FROM Medicine WHERE Med_ID=?"
@@ -0,0 +1,182 @@
+"""EXPLAIN QUERY PLAN audit of the app's hot queries.
+
+    python query_audit.py              # against a fresh in-memory schema
+    python query_audit.py --db pharmacy.db
+
+Fails (exit status 1) when a hot query does a full table scan of a large
+table, or when a table view page sorts its rows instead of reading them in
+index order. Scans that stop early (keyset pages with LIMIT) are listed
+per query in allow_scan. The pages the All Sales view reads from each
+archive file (archive.HistoryPages) are audited against an empty archive.
+"""
+import argparse
+import re
+import sqlite3
+import sys
+
+import alerts
+import archive
+import catalog
+import codec
+import db
+import migrations
+import export
+import ledger
+import queries
+import reports
+import sales
+import search
+import stock
+from table_view import describe_table, filter_condition, page_query
+
+
+# Sales dates are day numbers (codec.py).
+JAN_1 = codec.to_day("2024-01-01")
+
+# Tables expected to grow past a few thousand rows.
+LARGE_TABLES = {"Customer", "Medicine", "Sales", "Stock", "StockLot", "StockMovement", "StockSnapshot", "SalesDailyMedicine", "SalesDailyCustomer"}
+
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+"?(\w+)"?(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_KEYWORDS = {"where", "on", "join", "left", "inner", "order", "group", "set", "select", "values",
+             "limit", "using", "natural", "cross"}
+
+
+def hot_queries(conn):
+    """Yield (name, sql, params, allow_scan) for every query worth auditing."""
+    yield "alerts:low_stock", queries.LOW_STOCK, (), set()
+    yield "alerts:new", alerts.NEW_ALERTS, (0,), set()
+    yield "alerts:set_level", alerts.SET_REORDER_LEVEL, (10, 1), set()
+    yield "catalog:changes", catalog.CHANGES_SINCE, (0,), set()
+    yield "catalog:oldest", catalog.OLDEST_CHANGE, (), set()
+    yield "add_stock:receive_lot", stock.RECEIVE_LOT, (1, 10, None, None, "2024-01-01"), set()
+    yield "stock:fefo_lots", stock.FEFO_LOTS, (1, "2024-01-01"), set()
+    yield "stock:take_from_lot", stock.TAKE_FROM_LOT, (1, "2024-01-01", 1), set()
+    yield "stock:drop_empty_lot", stock.DROP_EMPTY_LOT, (1,), set()
+    yield "stock:expiring", stock.EXPIRING_LOTS, ("2024-01-31",), set()
+    yield "delete_medicine:lots", stock.DELETE_LOTS, (1,), set()
+    yield "stock:adjust_lot", stock.ADJUST_LOT, (1, "2024-01-01", 1), set()
+    yield "ledger:latest_snapshot", ledger.LATEST_SNAPSHOT, ("2024-01-01",), set()
+    yield "ledger:balance", ledger.BALANCE, ("2024-01-01", "2024-02-01", 1), set()
+    yield "ledger:history", ledger.HISTORY, (1, "2024-01-01", "2024-02-01"), set()
+    yield "ledger:balances", ledger.BALANCES, ("2024-01-01", "2024-02-01"), set()
+    yield "delete_customer", queries.DELETE_CUSTOMER, (1,), set()
+    yield "delete_employee", queries.DELETE_EMPLOYEE, (1,), set()
+    yield "delete_medicine:stock", queries.DELETE_STOCK, (1,), set()
+    yield "delete_medicine", queries.DELETE_MEDICINE, (1,), set()
+    yield "add_sale:stock_quantity", sales.STOCK_QUANTITY, (1,), set()
+    yield "add_sale:insert", sales.INSERT_PRICED_SALE, (1, JAN_1, 1, 1, 1), set()
+    yield "cart:lookup", sales.LOOKUP_LINES.format(marks="?, ?, ?"), (1, 2, 3), set()
+    yield "reports:daily", reports.DAILY_REVENUE, (JAN_1, JAN_1 + 30), set()
+    yield "reports:medicines", reports.TOP_MEDICINES, (JAN_1, JAN_1 + 30, 20), set()
+    yield "reports:customers", reports.TOP_CUSTOMERS, (JAN_1, JAN_1 + 30, 20), set()
+    yield "search:customers", search.SEARCH_CUSTOMERS, ('"jo"*', 10), set()
+    yield "search:phones", search.SEARCH_PHONES, ("98", "99", 10), set()
+    yield "search:medicines", search.SEARCH_MEDICINES, ('"pa"*', 10), set()
+    yield "archive:first_sale", archive.FIRST_SALE_FROM, (JAN_1,), set()
+    yield "archive:batch", archive.BATCH_IDS, (JAN_1, JAN_1 + 31, 5000), set()
+    sql, params = export.build_query(conn, "sales-report", "2024-01-01", "2024-01-31")
+    yield "export:sales-report", sql, params, set()
+
+    for table in ("Customer", "Employee", "Supplier", "Medicine", "Stock", "Sales"):
+        yield from _page_queries(conn, table, f"view_table:{table}")
+
+
+def _page_queries(conn, table, prefix):
+    columns = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+    # the first page walks the primary key and stops at LIMIT
+    yield f"{prefix}:first", page_query(table, columns, bounded=False), (100,), {table}
+    yield f"{prefix}:next", page_query(table, columns), (0, 100), set()
+    yield f"{prefix}:previous", page_query(table, columns, forward=False), (0, 100), set()
+    # sorted pages walk the column's index from the boundary
+    for column in sorted(describe_table(conn, table)[1] - {columns[0]}):
+        yield f"{prefix}:by_{column}", page_query(table, columns, sort=column), (0, 0, 100), set()
+        yield (f"{prefix}:by_{column}:desc", page_query(table, columns, sort=column, descending=True),
+               (0, 0, 100), set())
+    if table == "Sales":
+        # a month filter on the date-sorted Sales view reads just that month's range
+        condition, params = filter_condition("SaleDate", "2024-01", True, codec.DAY)
+        yield (f"{prefix}:by_SaleDate:month", page_query(table, columns, sort="SaleDate", filters=[condition]),
+               (0, 0, *params, 100), set())
+
+
+def archive_queries(conn):
+    """Yield the Sales view's pages again: HistoryPages also runs them on every archive file.
+
+    Audit these against archive_connection().
+    """
+    yield from _page_queries(conn, "Sales", "view_table:Sales:archive")
+
+
+def archive_connection():
+    """An in-memory database holding an empty archive file's schema."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("ATTACH DATABASE ':memory:' AS arc")
+    for sql in archive.ARCHIVE_SCHEMA:
+        conn.execute(sql)
+    return conn
+
+
+def _aliases(sql):
+    names = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        names[table] = table
+        if alias and alias.lower() not in _KEYWORDS:
+            names[alias] = table
+    return names
+
+
+def audit_query(conn, sql, params, allow_scan, keyset=False):
+    """Return (plan lines, problems) for one statement.
+
+    A keyset page must read its rows in index order and stop at LIMIT.
+    """
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    aliases = _aliases(sql)
+    problems = []
+    if keyset and "USE TEMP B-TREE FOR ORDER BY" in plan:
+        problems.append("sorts every matching row instead of reading an index in page order")
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)", detail)
+        if not match or "INDEX" in detail:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        if table in LARGE_TABLES and table not in allow_scan:
+            problems.append(f"full scan of {table}: {detail}")
+    return plan, problems
+
+
+def run_audit(conn, verbose=False):
+    failures = 0
+    arc = archive_connection()
+    audits = [(conn, query) for query in hot_queries(conn)] + [(arc, query) for query in archive_queries(conn)]
+    for target, (name, sql, params, allow_scan) in audits:
+        plan, problems = audit_query(target, sql, params, allow_scan, keyset=name.startswith("view_table:"))
+        status = "FAIL" if problems else "ok"
+        print(f"{status:4}  {name}")
+        if verbose or problems:
+            for line in plan:
+                print(f"        {line}")
+        for problem in problems:
+            print(f"      ! {problem}")
+        failures += bool(problems)
+    arc.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=":memory:", help="database to audit (default: fresh schema in memory)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    conn = db.open_connection(args.db)
+    migrations.migrate(conn)
+    failures = run_audit(conn, args.verbose)
+    conn.close()
+    if failures:
+        print(f"{failures} hot quer{'y' if failures == 1 else 'ies'} scan or sort a large table")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Sales reports read from the daily aggregate tables.
+
+    python reports.py daily --from 2024-04-01 --to 2024-04-30
+    python reports.py medicines --from 2024-04-01 --to 2024-04-30
+    python reports.py customers --from 2024-04-01 --to 2024-04-30
+    python reports.py rebuild
+
+SalesDailyMedicine and SalesDailyCustomer are kept up to date by a trigger
+on Sales, so these reports never scan Sales itself. Dates and revenue are
+stored as day numbers and cents (codec.py) and come out as ISO dates and
+decimal amounts. 'rebuild' recomputes
+them from Sales and its archives (see archive.py), e.g. after editing
+Sales by hand.
+"""
+import argparse
+import csv
+import sys
+
+import archive
+import codec
+import db
+import migrations
+
+
+DAILY_REVENUE = """
+    SELECT SaleDate, SUM(SaleCount), SUM(Units), SUM(Revenue)
+    FROM SalesDailyMedicine
+    WHERE SaleDate BETWEEN ? AND ?
+    GROUP BY SaleDate
+    ORDER BY SaleDate
+"""
+
+TOP_MEDICINES = """
+    SELECT a.Med_ID, m.Brand, a.Units, a.Revenue
+    FROM (SELECT Med_ID, SUM(Units) AS Units, SUM(Revenue) AS Revenue
+          FROM SalesDailyMedicine
+          WHERE SaleDate BETWEEN ? AND ?
+          GROUP BY Med_ID) a
+    LEFT JOIN Medicine m ON m.Med_ID = a.Med_ID
+    ORDER BY a.Revenue DESC
+    LIMIT ?
+"""
+
+TOP_CUSTOMERS = """
+    SELECT a.Cust_ID, c.Name, a.Visits, a.Revenue
+    FROM (SELECT Cust_ID, SUM(SaleCount) AS Visits, SUM(Revenue) AS Revenue
+          FROM SalesDailyCustomer
+          WHERE SaleDate BETWEEN ? AND ?
+          GROUP BY Cust_ID) a
+    LEFT JOIN Customer c ON c.Cust_ID = a.Cust_ID
+    ORDER BY a.Revenue DESC
+    LIMIT ?
+"""
+
+# Per-day totals of a date range of {sales} (a table or a view), added to {target}.
+SUM_MEDICINE_DAYS = """
+    INSERT INTO {target} (SaleDate, Med_ID, Units, Revenue, SaleCount)
+    SELECT SaleDate, Med_ID, SUM(Quantity), SUM(TotalAmount), COUNT(*)
+    FROM {sales} WHERE SaleDate BETWEEN ? AND ? GROUP BY SaleDate, Med_ID"""
+
+SUM_CUSTOMER_DAYS = """
+    INSERT INTO {target} (SaleDate, Cust_ID, Units, Revenue, SaleCount)
+    SELECT SaleDate, Cust_ID, SUM(Quantity), SUM(TotalAmount), COUNT(*)
+    FROM {sales} WHERE SaleDate BETWEEN ? AND ? GROUP BY SaleDate, Cust_ID"""
+
+DAILY_COLUMNS = ["SaleDate", "Sales", "Units", "Revenue"]
+MEDICINE_COLUMNS = ["Med_ID", "Brand", "Units", "Revenue"]
+CUSTOMER_COLUMNS = ["Cust_ID", "Name", "Sales", "Revenue"]
+
+
+# --- QUERIES ---
+def daily_revenue(conn, date_from, date_to):
+    rows = conn.execute(DAILY_REVENUE, (codec.to_day(date_from), codec.to_day(date_to)))
+    return [(codec.to_iso(day), count, units, codec.to_money(revenue)) for day, count, units, revenue in rows]
+
+
+def top_medicines(conn, date_from, date_to, limit=20):
+    rows = conn.execute(TOP_MEDICINES, (codec.to_day(date_from), codec.to_day(date_to), limit))
+    return [(med_id, brand, units, codec.to_money(revenue)) for med_id, brand, units, revenue in rows]
+
+
+def top_customers(conn, date_from, date_to, limit=20):
+    rows = conn.execute(TOP_CUSTOMERS, (codec.to_day(date_from), codec.to_day(date_to), limit))
+    return [(cust_id, name, visits, codec.to_money(revenue)) for cust_id, name, visits, revenue in rows]
+
+
+def rebuild_aggregates(conn):
+    """Recompute both aggregate tables from Sales and its archives.
+
+    Archived months are summed into temp tables first, a few archives at a
+    time; the live months are summed and the tables replaced in one
+    transaction.
+    """
+    # the temp tables have the columns of the tables they stand in for
+    conn.execute("CREATE TEMP TABLE ArchivedMedicine AS SELECT * FROM SalesDailyMedicine LIMIT 0")
+    conn.execute("CREATE TEMP TABLE ArchivedCustomer AS SELECT * FROM SalesDailyCustomer LIMIT 0")
+    try:
+        live_from = codec.MIN_DAY
+        archived = archive.archives(conn)
+        if archived:
+            live_from = codec.day_range(archived[-1][0])[1]
+            for first, last in archive.spans(conn, None, codec.to_iso(live_from - 1)):
+                with archive.history(conn, first, last) as sales, conn:
+                    days = (codec.to_day(first) if first else codec.MIN_DAY, codec.to_day(last))
+                    conn.execute(SUM_MEDICINE_DAYS.format(target="ArchivedMedicine", sales=sales), days)
+                    conn.execute(SUM_CUSTOMER_DAYS.format(target="ArchivedCustomer", sales=sales), days)
+        with conn:
+            conn.execute("DELETE FROM SalesDailyMedicine")
+            conn.execute("DELETE FROM SalesDailyCustomer")
+            conn.execute("INSERT INTO SalesDailyMedicine SELECT * FROM ArchivedMedicine")
+            conn.execute("INSERT INTO SalesDailyCustomer SELECT * FROM ArchivedCustomer")
+            days = (live_from, codec.MAX_DAY)
+            conn.execute(SUM_MEDICINE_DAYS.format(target="SalesDailyMedicine", sales="Sales"), days)
+            conn.execute(SUM_CUSTOMER_DAYS.format(target="SalesDailyCustomer", sales="Sales"), days)
+    finally:
+        conn.execute("DROP TABLE temp.ArchivedMedicine")
+        conn.execute("DROP TABLE temp.ArchivedCustomer")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("report", choices=["daily", "medicines", "customers", "rebuild"])
+    parser.add_argument("--from", dest="date_from", default="0001-01-01")
+    parser.add_argument("--to", dest="date_to", default="9999-12-31")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = db.open_connection()
+    migrations.migrate(conn)
+    if args.report == "rebuild":
+        rebuild_aggregates(conn)
+        print("aggregates rebuilt", file=sys.stderr)
+        return
+
+    if args.report == "daily":
+        columns, rows = DAILY_COLUMNS, daily_revenue(conn, args.date_from, args.date_to)
+    elif args.report == "medicines":
+        columns, rows = MEDICINE_COLUMNS, top_medicines(conn, args.date_from, args.date_to, args.limit)
+    else:
+        columns, rows = CUSTOMER_COLUMNS, top_customers(conn, args.date_from, args.date_to, args.limit)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(columns)
+    writer.writerows(rows)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
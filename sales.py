@@ -0,0 +1,229 @@
+import random
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import codec
+import stock
+
+
+# Retries for BEGIN IMMEDIATE when another terminal holds the write lock.
+# busy_timeout already waits inside SQLite; this covers what is left over.
+MAX_RETRIES = 8
+BASE_BACKOFF = 0.005
+
+
+class SaleError(Exception):
+    """A sale that was rejected; nothing was written.
+
+    services.py raises this same class as ServiceError for every request.
+    """
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+
+
+def _is_busy(error):
+    msg = str(error)
+    return "database is locked" in msg or "database is busy" in msg
+
+
+# --- TRANSACTIONS ---
+def run_immediate(conn, fn, *args):
+    """Run fn(conn, *args) inside BEGIN IMMEDIATE, retrying with backoff on SQLITE_BUSY.
+
+    The write lock is taken up front, so reads inside fn cannot go stale
+    before the writes that depend on them.
+    """
+    delay = BASE_BACKOFF
+    for attempt in range(MAX_RETRIES):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
+            continue
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return result
+
+
+# --- SALE POSTING ---
+# SaleDate is a day number and TotalAmount cents (codec.py); Medicine.Price is a decimal.
+INSERT_PRICED_SALE = """
+    INSERT INTO Sales (Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount)
+    SELECT ?, Med_ID, ?, ?, ? * CAST(round(Price * 100) AS INTEGER) FROM Medicine WHERE Med_ID = ?
+    RETURNING Sale_ID, TotalAmount"""
+
+STOCK_QUANTITY = "SELECT StockQuantity FROM Stock WHERE Med_ID=?"
+
+LOOKUP_LINES = """
+    SELECT m.Med_ID, m.Brand, m.Price, s.StockQuantity
+    FROM Medicine m LEFT JOIN Stock s ON s.Med_ID = m.Med_ID
+    WHERE m.Med_ID IN ({marks})"""
+
+INSERT_SALE = """
+    INSERT INTO Sales (Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount)
+    VALUES (?, ?, ?, ?, ?)"""
+
+
+def _short_stock_error(conn, short, name=None):
+    row = conn.execute(STOCK_QUANTITY, (short.med_id,)).fetchone()
+    if row is None:
+        if conn.execute("SELECT 1 FROM Medicine WHERE Med_ID = ?", (short.med_id,)).fetchone() is None:
+            return SaleError("Error", "Medicine not found")
+        return SaleError("Error", f"No stock record found for {name or 'this medicine'}")
+    expired = row[0] - short.available
+    message = f"Requested {short.requested} but only {short.available} in stock"
+    if expired > 0:
+        message += f" ({expired} more expired)"
+    return SaleError("Insufficient Stock", f"{name}: {message}" if name else message)
+
+
+def record_sale(conn, cust_id, med_id, qty, sale_date=None, price=None):
+    """post_sale without its transaction: runs in the caller's, e.g. a group commit."""
+    if sale_date is None:
+        sale_date = datetime.now().strftime("%Y-%m-%d")
+    # lots are drawn first-expired-first-out; triggers keep Stock in step
+    try:
+        stock.allocate_fefo(conn, med_id, qty, sale_date)
+    except stock.ShortStock as short:
+        raise _short_stock_error(conn, short) from None
+
+    if price is not None:
+        total = qty * codec.to_cents(price)
+        cur = conn.execute(INSERT_SALE, (cust_id, med_id, codec.to_day(sale_date), qty, total))
+        return cur.lastrowid, codec.to_money(total)
+    rows = conn.execute(INSERT_PRICED_SALE, (cust_id, codec.to_day(sale_date), qty, qty, med_id)).fetchall()
+    if not rows:
+        raise SaleError("Error", "Medicine not found")
+    sale_id, total = rows[0]
+    return sale_id, codec.to_money(total)
+
+
+def post_sale(conn, cust_id, med_id, qty, sale_date=None, price=None):
+    """Record one sale and take it out of stock atomically.
+
+    Returns (Sale_ID, TotalAmount). Raises SaleError if the medicine or its
+    stock record is missing or there is not enough stock. Pass price only
+    when it is known to be current; otherwise it is read from Medicine in
+    the same transaction.
+    """
+    return run_immediate(conn, record_sale, cust_id, med_id, qty, sale_date, price)
+
+
+# --- CART / BATCH SALES ---
+CartLine = namedtuple('CartLine', 'med_id brand qty price total')
+
+
+def _merge_lines(lines):
+    merged = {}
+    for med_id, qty in lines:
+        med_id, qty = int(med_id), int(qty)
+        if qty <= 0:
+            raise SaleError("Error", "Quantity must be a positive integer")
+        merged[med_id] = merged.get(med_id, 0) + qty
+    if not merged:
+        raise SaleError("Error", "Cart is empty")
+    return merged
+
+
+def _lookup(conn, med_ids):
+    marks = ", ".join("?" * len(med_ids))
+    rows = conn.execute(LOOKUP_LINES.format(marks=marks), list(med_ids)).fetchall()
+    found = {row[0]: row[1:] for row in rows}
+    missing = [m for m in med_ids if m not in found]
+    if missing:
+        raise SaleError("Error", f"Medicine not found: {', '.join(map(str, missing))}")
+    return found
+
+
+def quote_lines(conn, lines):
+    """Price a basket without touching stock; returns a list of CartLine."""
+    merged = _merge_lines(lines)
+    found = _lookup(conn, merged)
+    return [_line(med_id, found[med_id][0], qty, found[med_id][1]) for med_id, qty in merged.items()]
+
+
+def _line(med_id, brand, qty, price):
+    # totals are whole cents, as Sales stores them
+    return CartLine(med_id, brand, qty, price, codec.to_money(qty * codec.to_cents(price)))
+
+
+def record_cart(conn, cust_id, lines, sale_date=None):
+    """post_cart without its transaction: runs in the caller's, e.g. a group commit."""
+    # a dict (e.g. from post_cart or a JSON body) is checked like a list of pairs
+    merged = _merge_lines(lines.items() if isinstance(lines, dict) else lines)
+    if sale_date is None:
+        sale_date = datetime.now().strftime("%Y-%m-%d")
+    found = _lookup(conn, merged)
+    for med_id, qty in merged.items():
+        brand, price, available = found[med_id]
+        if available is None:
+            raise SaleError("Error", f"No stock record found for {brand} (ID {med_id})")
+        if available < qty:
+            raise SaleError("Insufficient Stock",
+                            f"{brand} (ID {med_id}): requested {qty} but only {available} in stock")
+
+    for med_id, qty in merged.items():
+        try:
+            stock.allocate_fefo(conn, med_id, qty, sale_date)
+        except stock.ShortStock as short:
+            raise _short_stock_error(conn, short, f"{found[med_id][0]} (ID {med_id})") from None
+
+    lines = [_line(med_id, found[med_id][0], qty, found[med_id][1]) for med_id, qty in merged.items()]
+    day = codec.to_day(sale_date)
+    conn.executemany(INSERT_SALE,
+                     [(cust_id, line.med_id, day, line.qty, codec.to_cents(line.total)) for line in lines])
+    return lines
+
+
+def post_cart(conn, cust_id, lines, sale_date=None):
+    """Post a basket of (Med_ID, qty) lines as one transaction.
+
+    Repeated Med_IDs are combined. Either every line is sold or, on
+    SaleError, none is. Returns the posted CartLines.
+    """
+    # merged up front so a bad line is rejected before taking the write lock
+    return run_immediate(conn, record_cart, cust_id, _merge_lines(lines), sale_date)
+
+
+class Cart:
+    """Basket of medicines being rung up for one customer."""
+
+    def __init__(self):
+        self.lines = {}
+
+    def add(self, med_id, qty):
+        merged = _merge_lines([(med_id, qty)])
+        for med_id, qty in merged.items():
+            self.lines[med_id] = self.lines.get(med_id, 0) + qty
+
+    def remove(self, med_id):
+        self.lines.pop(int(med_id), None)
+
+    def clear(self):
+        self.lines.clear()
+
+    def items(self):
+        return list(self.lines.items())
+
+    def __len__(self):
+        return len(self.lines)
+
+    def quote(self, conn):
+        return quote_lines(conn, self.items())
+
+    def checkout(self, conn, cust_id, sale_date=None):
+        posted = post_cart(conn, cust_id, self.items(), sale_date)
+        self.clear()
+        return posted
@@ -0,0 +1,102 @@
+"""Type-ahead search over Customer and Medicine.
+
+    python search.py customers "jo sm"
+    python search.py medicines para
+
+Names and brands go through the CustomerSearch and MedicineSearch FTS5
+indexes (migration 6). The last word is matched as a prefix and earlier
+words as whole words, so "john sm" finds "John Smith". Input made only of
+digits is looked up as a phone number prefix on Customer's UNIQUE index.
+"""
+import argparse
+import re
+import sys
+import time
+
+import db
+import migrations
+
+
+# Results shown under the entry, and the shortest input worth searching for.
+LIMIT = 10
+MIN_CHARS = 2
+
+SEARCH_CUSTOMERS = """
+    SELECT c.Cust_ID, c.Name, c.PhoneNumber
+    FROM CustomerSearch s JOIN Customer c ON c.Cust_ID = s.rowid
+    WHERE CustomerSearch MATCH ?
+    LIMIT ?"""
+
+SEARCH_PHONES = """
+    SELECT Cust_ID, Name, PhoneNumber FROM Customer
+    WHERE PhoneNumber >= ? AND PhoneNumber < ?
+    ORDER BY PhoneNumber
+    LIMIT ?"""
+
+SEARCH_MEDICINES = """
+    SELECT rowid, Brand FROM MedicineSearch
+    WHERE MedicineSearch MATCH ?
+    LIMIT ?"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(text):
+    """FTS5 query for what was typed, or None if there is nothing to search for.
+
+    Words are quoted so FTS5 operators in the input are taken literally.
+    Only the word still being typed is a prefix: whole-word terms have one
+    doclist each, which keeps multi-word queries fast on large tables.
+    """
+    words = _WORD.findall(text)
+    if not words or len("".join(words)) < MIN_CHARS:
+        return None
+    return " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+
+# --- QUERIES ---
+def search_customers(conn, text, limit=LIMIT):
+    """(Cust_ID, label) pairs matching text on name or phone number."""
+    text = text.strip()
+    if text.isdigit():
+        if len(text) < MIN_CHARS:
+            return []
+        upper = text[:-1] + chr(ord(text[-1]) + 1)
+        rows = conn.execute(SEARCH_PHONES, (text, upper, limit)).fetchall()
+    else:
+        expr = match_expression(text)
+        if expr is None:
+            return []
+        rows = conn.execute(SEARCH_CUSTOMERS, (expr, limit)).fetchall()
+    return [(cust_id, f"{name} ({phone})") for cust_id, name, phone in rows]
+
+
+def search_medicines(conn, text, limit=LIMIT):
+    """(Med_ID, label) pairs matching text on brand."""
+    expr = match_expression(text)
+    if expr is None:
+        return []
+    return conn.execute(SEARCH_MEDICINES, (expr, limit)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("what", choices=["customers", "medicines"])
+    parser.add_argument("text")
+    parser.add_argument("--limit", type=int, default=LIMIT)
+    args = parser.parse_args()
+
+    conn = db.open_connection()
+    migrations.migrate(conn)
+    search = search_customers if args.what == "customers" else search_medicines
+    start = time.perf_counter()
+    results = search(conn, args.text, args.limit)
+    elapsed = time.perf_counter() - start
+    for key, label in results:
+        print(f"{key}: {label}")
+    print(f"{len(results)} result(s) in {elapsed * 1000:.2f} ms", file=sys.stderr)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Pharmacy operations without a user interface.
+
+    import db, services
+    pharmacy = services.Pharmacy(db.open_connection("pharmacy.db"))
+    cust_id = pharmacy.customers.add(services.NewCustomer("Asha Rao", "", "9876543210"))
+    sale = pharmacy.sales.sell(services.SaleRequest(cust_id, 12, 2))
+
+Each service takes a request namedtuple, validates it with validation.py,
+writes in its own transaction and returns an ID or a result namedtuple.
+Anything the user should be told about is raised as ServiceError with a
+title and message. main.py is a Tk client of these classes; scripts, load
+tests and other frontends use them the same way. Sales and receipts also
+have record_* forms that run in the caller's transaction, which
+commit_group() uses to write many requests with one commit.
+
+Without a connection, every call uses db.get_connection(), so one
+Pharmacy can be shared by worker threads. Pass a catalog.Catalog to quote
+carts and check suppliers from memory; it is refreshed after the
+medicines and suppliers it caches change. Sales themselves are always
+priced from Medicine inside their own write transaction.
+"""
+import sqlite3
+from collections import namedtuple
+
+import alerts
+import db
+import ledger
+import queries
+import reports
+import sales
+import stock
+import validation
+
+
+# --- REQUESTS ---
+# Fields may be strings straight from a form or already-typed values.
+NewCustomer = namedtuple('NewCustomer', 'name address phone')
+NewEmployee = namedtuple('NewEmployee', 'name role email phone')
+NewSupplier = namedtuple('NewSupplier', 'name contact')
+NewMedicine = namedtuple('NewMedicine', 'supplier_id brand price expiry manufactured')
+StockReceipt = namedtuple('StockReceipt', 'med_id qty expiry lot_number', defaults=(None, None))
+SaleRequest = namedtuple('SaleRequest', 'cust_id med_id qty sale_date', defaults=(None,))
+CartRequest = namedtuple('CartRequest', 'cust_id lines sale_date', defaults=(None,))
+
+# --- RESULTS ---
+SaleResult = namedtuple('SaleResult', 'sale_id total')
+CartResult = namedtuple('CartResult', 'lines total')
+ReportResult = namedtuple('ReportResult', 'daily medicines customers sales revenue')
+
+
+# A request that was rejected; nothing was written. One class with sales.py,
+# so what the sale path raises needs no translating.
+ServiceError = sales.SaleError
+
+
+def _input_error(message):
+    return ServiceError("Input Error", message)
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return value.strip() if type(value) is str else str(value).strip()
+
+
+def _sale_date(value):
+    # None means today; anything else must be an ISO date
+    if value is None:
+        return None
+    value = _text(value)
+    if not validation.validate_date_format(value):
+        raise _input_error("Sale date must be in YYYY-MM-DD format")
+    return value
+
+
+def _positive_int(value, message):
+    try:
+        number = int(_text(value))
+    except ValueError:
+        raise ServiceError("Error", message) from None
+    if number <= 0:
+        raise ServiceError("Error", message)
+    return number
+
+
+def _key(value):
+    # IDs typed as "12" or picked as "12: Name" from a list
+    return _text(value).split(':')[0].strip()
+
+
+class _Service:
+
+    def __init__(self, conn=None, catalog=None):
+        self._conn = conn
+        self._catalog = catalog
+
+    def _connection(self):
+        return self._conn if self._conn is not None else db.get_connection()
+
+    def _delete(self, sql, key):
+        conn = self._connection()
+        with conn:
+            return conn.execute(sql, (key,)).rowcount > 0
+
+
+# --- PEOPLE ---
+class CustomerService(_Service):
+
+    def add(self, request):
+        """Insert a customer; returns its Cust_ID."""
+        name, address, phone = _text(request.name), _text(request.address), _text(request.phone)
+        if not name or not phone:
+            raise _input_error("Name and Phone are required")
+        try:
+            _, name, address, phone = validation.validate_customer_row(
+                {"Name": name, "Address": address, "PhoneNumber": phone})
+        except ValueError as e:
+            raise _input_error(str(e)) from None
+        conn = self._connection()
+        try:
+            with conn:
+                return conn.execute("INSERT INTO Customer (Name, Address, PhoneNumber) VALUES (?, ?, ?)",
+                                    (name, address or "", phone)).lastrowid
+        except sqlite3.IntegrityError:
+            raise ServiceError("Error", "Phone number already exists") from None
+
+    def delete(self, cust_id):
+        """False if there was no such customer."""
+        return self._delete(queries.DELETE_CUSTOMER, _key(cust_id))
+
+
+class EmployeeService(_Service):
+
+    def add(self, request):
+        """Insert an employee; returns its Emp_ID."""
+        name, role, email, phone = map(_text, request)
+        if not all([name, role, email, phone]):
+            raise _input_error("All fields are required")
+        if not validation.is_valid_name(name):
+            raise _input_error("Name must contain only letters and spaces")
+        if not validation.validate_email(email):
+            raise _input_error("Invalid email format")
+        if not validation.is_valid_phone(phone):
+            raise _input_error("Phone number must be exactly 10 digits")
+        conn = self._connection()
+        try:
+            with conn:
+                return conn.execute("INSERT INTO Employee (Name, Role, Email, PhoneNumber) VALUES (?, ?, ?, ?)",
+                                    (name, role, email, phone)).lastrowid
+        except sqlite3.IntegrityError as e:
+            field = "Email address" if "Email" in str(e) else "Phone number"
+            raise ServiceError("Error", f"{field} already exists") from None
+
+    def delete(self, emp_id):
+        """False if there was no such employee."""
+        return self._delete(queries.DELETE_EMPLOYEE, _key(emp_id))
+
+
+# --- CATALOG ---
+class SupplierService(_Service):
+
+    def add(self, request):
+        """Insert a supplier; returns its Supplier_ID."""
+        name, contact = _text(request.name), _text(request.contact)
+        if not name:
+            raise _input_error("Supplier name is required")
+        try:
+            _, name, contact = validation.validate_supplier_row({"Name": name, "Contact": contact})
+        except ValueError as e:
+            raise _input_error(str(e)) from None
+        conn = self._connection()
+        try:
+            with conn:
+                supplier_id = conn.execute("INSERT INTO Supplier (Name, Contact) VALUES (?, ?)",
+                                           (name, contact)).lastrowid
+        except sqlite3.IntegrityError:
+            raise ServiceError("Error", "Supplier already exists") from None
+        if self._catalog is not None:
+            self._catalog.refresh()
+        return supplier_id
+
+    def exists(self, supplier_id):
+        if self._catalog is not None:
+            return self._catalog.supplier(supplier_id) is not None
+        return self._connection().execute(
+            "SELECT 1 FROM Supplier WHERE Supplier_ID = ?", (supplier_id,)).fetchone() is not None
+
+    def choices(self):
+        """"ID: Name" strings ordered by name, for pick lists."""
+        if self._catalog is not None:
+            self._catalog.refresh()
+            return self._catalog.supplier_choices()
+        rows = self._connection().execute("SELECT Supplier_ID, Name FROM Supplier ORDER BY Name, Supplier_ID")
+        return [f"{supplier_id}: {name}" for supplier_id, name in rows]
+
+
+class MedicineService(_Service):
+
+    def __init__(self, conn=None, catalog=None, suppliers=None):
+        super().__init__(conn, catalog)
+        self._suppliers = suppliers or SupplierService(conn, catalog)
+
+    def add(self, request):
+        """Insert a medicine; returns its Med_ID."""
+        supplier_id = _key(request.supplier_id)
+        if not supplier_id:
+            raise _input_error("Please select a supplier")
+        brand, price, exp, manu = (_text(request.brand), _text(request.price),
+                                   _text(request.expiry), _text(request.manufactured))
+        if not all([brand, price, exp, manu]):
+            raise _input_error("All fields are required")
+        try:
+            price = validation.parse_positive_price(price)
+        except ValueError:
+            raise _input_error("Price must be a positive number") from None
+        if not (validation.validate_date_format(exp) and validation.validate_date_format(manu)):
+            raise _input_error("Dates must be in YYYY-MM-DD format")
+        if not validation.is_valid_date_order(manu, exp):
+            raise _input_error("Expiry date must be after manufacture date")
+        if not self._suppliers.exists(supplier_id):
+            raise ServiceError("Error", "Invalid Supplier ID")
+
+        conn = self._connection()
+        try:
+            with conn:
+                med_id = conn.execute("""
+                    INSERT INTO Medicine
+                    (SupplierID, Brand, Price, ExpiryDate, ManufactureDate)
+                    VALUES (?, ?, ?, ?, ?)""", (supplier_id, brand, price, exp, manu)).lastrowid
+        except sqlite3.IntegrityError:
+            raise ServiceError("Error", "Database constraint violation") from None
+        if self._catalog is not None:
+            self._catalog.refresh()
+        return med_id
+
+    def delete(self, med_id):
+        """Remove a medicine with its lots and stock record; False if it did not exist."""
+        med_id = _key(med_id)
+        conn = self._connection()
+        with conn:
+            conn.execute(stock.DELETE_LOTS, (med_id,))
+            conn.execute(queries.DELETE_STOCK, (med_id,))
+            deleted = conn.execute(queries.DELETE_MEDICINE, (med_id,)).rowcount > 0
+        if self._catalog is not None:
+            self._catalog.refresh()
+        return deleted
+
+
+# --- STOCK ---
+class StockService(_Service):
+
+    def receive(self, request):
+        """Add a delivery as a new lot; returns its Lot_ID.
+
+        Without an expiry the lot expires with the medicine.
+        """
+        return sales.run_immediate(self._connection(), self.record_receipt, request)
+
+    def record_receipt(self, conn, request):
+        """receive() in the caller's transaction."""
+        med_id, qty = _key(request.med_id), _text(request.qty)
+        expiry, lot_number = _text(request.expiry), _text(request.lot_number)
+        if not med_id or not qty:
+            raise _input_error("Medicine ID and Quantity are required")
+        qty = _positive_int(qty, "Quantity must be a positive integer")
+        if expiry and not validation.validate_date_format(expiry):
+            raise _input_error("Dates must be in YYYY-MM-DD format")
+        try:
+            lot_id = stock.receive_lot(conn, med_id, qty, expiry or None, lot_number or None)
+        except sqlite3.IntegrityError:
+            raise ServiceError("Error", "Database constraint violation") from None
+        if lot_id is None:
+            raise ServiceError("Error", "Invalid Medicine ID")
+        return lot_id
+
+    def set_reorder_level(self, med_id, level):
+        med_id, level = _key(med_id), _text(level)
+        if not med_id or not level:
+            raise _input_error("Medicine ID and Reorder Level are required")
+        try:
+            level = validation.parse_quantity(level)
+        except ValueError:
+            raise ServiceError("Error", "Reorder Level must be a non-negative integer") from None
+        if not alerts.set_reorder_level(self._connection(), med_id, level):
+            raise ServiceError("Error", "No stock record found for this medicine")
+        return level
+
+    def expiring(self, days=30):
+        """Rows of stock.EXPIRING_COLUMNS for lots expiring within days."""
+        return stock.expiring_lots(self._connection(), days)
+
+    def snapshot_if_due(self):
+        return ledger.snapshot_if_due(self._connection())
+
+
+# --- SALES ---
+class SalesService(_Service):
+
+    def quote(self, lines):
+        """Price (Med_ID, qty) lines without touching stock; returns CartLines."""
+        lines = [(_positive_int(med_id, "Medicine ID and Quantity must be positive integers"),
+                  _positive_int(qty, "Medicine ID and Quantity must be positive integers"))
+                 for med_id, qty in lines]
+        if self._catalog is not None:
+            return self._catalog.quote_lines(lines)
+        return sales.quote_lines(self._connection(), lines)
+
+    def sell(self, request):
+        """Post one sale, drawing stock first-expired-first-out; returns a SaleResult."""
+        return sales.run_immediate(self._connection(), self.record_sale, request)
+
+    def record_sale(self, conn, request):
+        """sell() in the caller's transaction."""
+        cust_id, med_id, qty = _key(request.cust_id), _key(request.med_id), _text(request.qty)
+        if not cust_id or not med_id or not qty:
+            raise _input_error("All fields are required")
+        qty = _positive_int(qty, "Quantity must be a positive integer")
+        # priced in the INSERT itself: the catalog may be up to CHECK_INTERVAL behind another terminal
+        return SaleResult(*sales.record_sale(conn, cust_id, med_id, qty, _sale_date(request.sale_date)))
+
+    def checkout(self, request):
+        """Post every line of a basket in one transaction; returns a CartResult."""
+        return sales.run_immediate(self._connection(), self.record_checkout, request)
+
+    def record_checkout(self, conn, request):
+        """checkout() in the caller's transaction."""
+        cust_id = _key(request.cust_id)
+        if not cust_id:
+            raise _input_error("Customer ID is required")
+        if not request.lines:
+            raise _input_error("Cart is empty")
+        sale_date = _sale_date(request.sale_date)
+        try:
+            posted = sales.record_cart(conn, cust_id, request.lines, sale_date)
+        except (TypeError, ValueError):
+            raise ServiceError("Error", "Medicine ID and Quantity must be positive integers") from None
+        return CartResult(posted, round(sum(line.total for line in posted), 2))
+
+
+# --- REPORTS ---
+class ReportService(_Service):
+
+    def summary(self, date_from, date_to):
+        """Daily revenue, top medicines and top customers between two dates."""
+        date_from, date_to = _text(date_from), _text(date_to)
+        if not (validation.validate_date_format(date_from) and validation.validate_date_format(date_to)):
+            raise _input_error("Dates must be in YYYY-MM-DD format")
+        # Reads only the daily aggregate tables, never Sales itself.
+        conn = self._connection()
+        daily = reports.daily_revenue(conn, date_from, date_to)
+        return ReportResult(daily,
+                            reports.top_medicines(conn, date_from, date_to),
+                            reports.top_customers(conn, date_from, date_to),
+                            sum(row[1] for row in daily),
+                            round(sum(row[3] for row in daily), 2))
+
+
+class Pharmacy:
+    """Every service over one connection (or the calling thread's) and catalog."""
+
+    def __init__(self, conn=None, catalog=None):
+        self.customers = CustomerService(conn, catalog)
+        self.employees = EmployeeService(conn, catalog)
+        self.suppliers = SupplierService(conn, catalog)
+        self.medicines = MedicineService(conn, catalog, self.suppliers)
+        self.stock = StockService(conn, catalog)
+        self.sales = SalesService(conn, catalog)
+        self.reports = ReportService(conn, catalog)
+
+
+# --- GROUP COMMIT ---
+def _run_group(conn, calls):
+    results = []
+    for record, request in calls:
+        conn.execute("SAVEPOINT request")
+        try:
+            results.append(record(conn, request))
+        except ServiceError as e:
+            conn.execute("ROLLBACK TO request")
+            results.append(e)
+        conn.execute("RELEASE request")
+    return results
+
+
+def commit_group(conn, calls):
+    """Run [(record, request)] writes in one transaction with a single commit.
+
+    record is a record_* method such as SalesService.record_sale. Each
+    request gets its own savepoint, so one that is rejected is rolled back
+    alone. Returns, in order, each result or the ServiceError it raised.
+    Any other error rolls back the whole group.
+    """
+    return sales.run_immediate(conn, _run_group, calls)
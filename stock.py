@@ -0,0 +1,155 @@
+"""Lot-level stock: receiving, FEFO allocation and expiry lookups.
+
+    python stock.py expiring --days 30
+    python stock.py adjust 42 0       # write off lot 42
+
+Each delivery is a StockLot row with its own expiry date. Stock keeps the
+per-medicine total, maintained by triggers on StockLot (migration 7), so
+receiving and selling only ever write lots. Lots are deleted when used up.
+"""
+import argparse
+import csv
+import sys
+from datetime import date, datetime, timedelta
+
+import db
+import migrations
+
+
+# Lot for a medicine; the expiry defaults to the one on its Medicine row.
+# Parameters: Med_ID, Quantity, ExpiryDate or None, LotNumber or None, date.
+RECEIVE_LOT = """
+    INSERT INTO StockLot (Med_ID, Quantity, ExpiryDate, LotNumber, LastUpdated)
+    SELECT ?1, ?2, COALESCE(?3, ExpiryDate), ?4, ?5 FROM Medicine WHERE Med_ID = ?1"""
+
+# Unexpired lots, first expiring first. Read lazily, so an allocation only
+# touches the lots it actually draws from.
+FEFO_LOTS = """
+    SELECT Lot_ID, Quantity FROM StockLot
+    WHERE Med_ID = ? AND Quantity > 0 AND ExpiryDate >= ?
+    ORDER BY ExpiryDate, Lot_ID"""
+
+# Writers set LastMovement with Quantity; the ledger trigger records it as the Kind.
+TAKE_FROM_LOT = """
+    UPDATE StockLot SET Quantity = Quantity - ?, LastUpdated = ?, LastMovement = 'sale'
+    WHERE Lot_ID = ?"""
+
+ADJUST_LOT = """
+    UPDATE StockLot SET Quantity = ?, LastUpdated = ?, LastMovement = 'adjustment'
+    WHERE Lot_ID = ?"""
+
+# Used-up lots are removed so they never slow down later allocations.
+DROP_EMPTY_LOT = "DELETE FROM StockLot WHERE Lot_ID = ? AND Quantity = 0"
+
+EXPIRING_LOTS = """
+    SELECT l.Lot_ID, l.Med_ID, m.Brand, l.LotNumber, l.ExpiryDate, l.Quantity
+    FROM StockLot l LEFT JOIN Medicine m ON m.Med_ID = l.Med_ID
+    WHERE l.Quantity > 0 AND l.ExpiryDate <= ?
+    ORDER BY l.ExpiryDate, l.Lot_ID"""
+
+EXPIRING_COLUMNS = ["Lot_ID", "Med_ID", "Brand", "LotNumber", "ExpiryDate", "Quantity"]
+
+DELETE_LOTS = "DELETE FROM StockLot WHERE Med_ID = ?"
+
+
+class ShortStock(Exception):
+    """Not enough unexpired stock; nothing was taken."""
+
+    def __init__(self, med_id, requested, available):
+        super().__init__(f"Requested {requested} but only {available} available")
+        self.med_id = med_id
+        self.requested = requested
+        self.available = available
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+# --- RECEIVING ---
+def receive_lot(conn, med_id, qty, expiry=None, lot_number=None, on_date=None):
+    """Add a lot of qty; returns its Lot_ID, or None if the medicine does not exist.
+
+    Runs in the caller's transaction.
+    """
+    cur = conn.execute(RECEIVE_LOT, (med_id, qty, expiry, lot_number, on_date or _today()))
+    return cur.lastrowid if cur.rowcount else None
+
+
+def adjust_lot(conn, lot_id, qty, on_date=None):
+    """Set a lot's quantity after a count or write-off; False if there is no such lot.
+
+    Runs in the caller's transaction.
+    """
+    return conn.execute(ADJUST_LOT, (qty, on_date or _today(), lot_id)).rowcount > 0
+
+
+# --- ALLOCATION ---
+def allocate_fefo(conn, med_id, qty, on_date=None):
+    """Take qty from unexpired lots, earliest expiry first.
+
+    Returns [(Lot_ID, taken)]. Raises ShortStock, without writing, if the
+    unexpired lots cannot cover qty. Call inside the sale's write
+    transaction so the lots cannot change between read and update.
+    on_date (the sale date) decides which lots are expired; the lots and
+    their ledger movements are dated today, when the stock actually left,
+    so a backdated sale is never hidden behind a ledger snapshot.
+    """
+    today = _today()
+    on_date = on_date or today
+    taken = []
+    remaining = qty
+    cur = conn.execute(FEFO_LOTS, (med_id, on_date))
+    try:
+        while remaining > 0:
+            row = cur.fetchone()
+            if row is None:
+                break
+            lot_id, available = row
+            take = min(available, remaining)
+            taken.append((lot_id, take, take == available))
+            remaining -= take
+    finally:
+        cur.close()
+    if remaining:
+        raise ShortStock(med_id, qty, qty - remaining)
+    conn.executemany(TAKE_FROM_LOT, [(take, today, lot_id) for lot_id, take, _ in taken])
+    conn.executemany(DROP_EMPTY_LOT, [(lot_id,) for lot_id, _, emptied in taken if emptied])
+    return [(lot_id, take) for lot_id, take, _ in taken]
+
+
+# --- EXPIRY ---
+def expiring_lots(conn, days, today=None):
+    """Lots with stock left that expire within days (or already have)."""
+    start = date.fromisoformat(today) if today else date.today()
+    cutoff = (start + timedelta(days=days)).isoformat()
+    return conn.execute(EXPIRING_LOTS, (cutoff,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    expiring = sub.add_parser("expiring")
+    expiring.add_argument("--days", type=int, default=30)
+    adjust = sub.add_parser("adjust")
+    adjust.add_argument("lot_id", type=int)
+    adjust.add_argument("quantity", type=int)
+    args = parser.parse_args()
+
+    conn = db.open_connection()
+    migrations.migrate(conn)
+    if args.command == "adjust":
+        with conn:
+            if not adjust_lot(conn, args.lot_id, args.quantity):
+                sys.exit(f"no lot {args.lot_id}")
+        conn.close()
+        return
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(EXPIRING_COLUMNS)
+    writer.writerows(expiring_lots(conn, args.days))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import operator
+import re
+import tkinter as tk
+from tkinter import ttk
+
+import archive
+import codec
+import db
+import instrument
+
+
+# Rows fetched per query and how many pages stay loaded in the Treeview.
+PAGE_SIZE = 100
+WINDOW_PAGES = 3
+
+# Fraction of the loaded window at which the next/previous page is fetched.
+PREFETCH_MARGIN = 0.15
+
+# Declared types with numeric affinity (SQLite's rules, by substring).
+NUMERIC_TYPES = ("INT", "REAL", "FLOA", "DOUB", "NUM", "DEC")
+
+# A filter box holds a value, optionally after a comparison operator.
+FILTER_RE = re.compile(r"\s*(<=|>=|<>|!=|=|<|>)?\s*(.*?)\s*$")
+
+# Sorts after any other text, so "value <= x < value + TEXT_END" is a prefix match.
+TEXT_END = "\U0010ffff"
+
+_described = {}
+
+
+# --- QUERIES ---
+def page_query(table_name, columns, forward=True, bounded=True, sort=None, descending=False, filters=()):
+    """SQL for one page in (sort, key) order, keyed on the first column.
+
+    Bounded pages take the boundary first: the key, or the sort value and
+    the key when sorting by another column. The parameters of filters (SQL
+    conditions from filter_condition) come next, then the LIMIT.
+    """
+    key = columns[0]
+    by_key = not sort or sort == key
+    order_columns = [key] if by_key else [sort, key]
+    ascending = forward != descending
+    conditions = []
+    if bounded:
+        op = ">" if ascending else "<"
+        if by_key:
+            conditions.append(f'"{key}" {op} ?')
+        else:
+            conditions.append(f'("{sort}", "{key}") {op} (?, ?)')
+    conditions.extend(filters)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    direction = "ASC" if ascending else "DESC"
+    order = ", ".join(f'"{c}" {direction}' for c in order_columns)
+    return f'SELECT {cols} FROM "{table_name}" {where}ORDER BY {order} LIMIT ?'
+
+
+def _day_condition(column, op, value):
+    # "2025-07" is every day of the month: = and <> take the range, the rest its ends
+    try:
+        first, end = codec.day_range(value)
+    except ValueError:
+        raise ValueError(f"{column}: {value!r} is not a date (YYYY, YYYY-MM or YYYY-MM-DD)") from None
+    if op in (None, "="):
+        return f'"{column}" >= ? AND "{column}" < ?', [first, end]
+    if op in ("<>", "!="):
+        return f'("{column}" < ? OR "{column}" >= ?)', [first, end]
+    if op in ("<", ">="):
+        return f'"{column}" {op} ?', [first]
+    return f'"{column}" {"<" if op == "<=" else ">="} ?', [end]
+
+
+def filter_condition(column, text, numeric, column_codec=None):
+    """(SQL, params) for one filter box; raises ValueError if it makes no sense.
+
+    "12" matches equal numbers, or text starting with "12"; ">= 12",
+    "< 2025-07" and "!= 0" compare. Values are always bound parameters,
+    encoded with column_codec when the column has one (codec.py).
+    """
+    op, value = FILTER_RE.match(text).groups()
+    if not value:
+        raise ValueError(f"{column}: missing value")
+    if column_codec is codec.DAY:
+        return _day_condition(column, op, value)
+    if column_codec is codec.CENTS:
+        try:
+            value = codec.to_cents(value)
+        except ArithmeticError:
+            raise ValueError(f"{column}: {value!r} is not an amount") from None
+    elif numeric:
+        try:
+            value = int(value)
+        except ValueError:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"{column}: {value!r} is not a number") from None
+    if op == "!=":
+        op = "<>"
+    if op:
+        return f'"{column}" {op} ?', [value]
+    if numeric or column_codec is not None:
+        return f'"{column}" = ?', [value]
+    return f'"{column}" >= ? AND "{column}" < ?', [value, value + TEXT_END]
+
+
+def describe_table(conn, table_name):
+    """(numeric columns, sortable columns) of a table; read once per process.
+
+    A column is sortable when it is NOT NULL and rows can be read in
+    (column, key) order off an index: the integer primary key, a full index
+    on just that column, or on that column then the key. Sorting by
+    anything else would sort the whole table for every page.
+    """
+    described = _described.get(table_name)
+    if described is not None:
+        return described
+    info = conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
+    numeric = {name for _, name, decl, _, _, _ in info if any(t in (decl or "").upper() for t in NUMERIC_TYPES)}
+    not_null = {name for _, name, _, notnull, _, pk in info if notnull or pk}
+    key = next((name for _, name, _, _, _, pk in info if pk == 1), None)
+    sortable = {key} if key else set()
+    for _, index_name, _, _, partial in conn.execute(f'PRAGMA index_list("{table_name}")').fetchall():
+        if partial:
+            continue
+        indexed = [row[2] for row in conn.execute(f'PRAGMA index_info("{index_name}")')]
+        if len(indexed) == 1 or (len(indexed) == 2 and indexed[1] == key):
+            sortable.add(indexed[0])
+    described = _described[table_name] = (numeric, sortable & not_null)
+    return described
+
+
+# --- PAGED TABLE VIEW ---
+class PagedTable:
+    """Treeview that keeps only a sliding window of rows from one table.
+
+    Rows are fetched with keyset cursors on (sort column, first column), so
+    opening, sorting or filtering a view costs one LIMIT query no matter
+    how many rows the table holds. Headers of indexed columns sort on click
+    (click again to reverse); the boxes above the grid filter in SQL when
+    Return is pressed. Pages are read on the executor's worker threads and
+    applied to the Treeview when they arrive. With archived=True (Sales
+    only) pages also cover the months moved out by archive.py.
+    """
+
+    def __init__(self, parent, table_name, columns, executor,
+                 page_size=PAGE_SIZE, window_pages=WINDOW_PAGES, archived=False):
+        self.executor = executor
+        self.table_name = table_name
+        # archived months are paged alongside the live table (archive.HistoryPages)
+        self.history = archive.HistoryPages() if archived else None
+        self.columns = list(columns)
+        self.key = self.columns[0]
+        self.page_size = page_size
+        self.max_rows = page_size * window_pages
+
+        self.at_start = True
+        self.at_end = False
+        self._task = None
+        self._rows = {}
+        self.codecs = codec.codecs(table_name, self.columns)
+        self.numeric = set()
+        self.sort = self.key
+        self.descending = False
+        self._filters = []
+        self._filter_params = []
+
+        self.frame = ttk.Frame(parent)
+        self.filter_bar = ttk.Frame(self.frame)
+        self.filter_bar.pack(side=tk.TOP, fill=tk.X)
+        self.filter_entries = {}
+        for i, col in enumerate(self.columns):
+            entry = tk.Entry(self.filter_bar, width=14)
+            entry.grid(row=0, column=i, padx=1)
+            entry.bind("<Return>", lambda e: self.apply_filters())
+            self.filter_entries[col] = entry
+
+        self.tree = ttk.Treeview(self.frame, columns=self.columns, show='headings')
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=120)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Home>", lambda e: self.jump_to_start())
+        self.tree.bind("<End>", lambda e: self.jump_to_end())
+        self.frame.bind("<Destroy>", self._on_destroy)
+
+        self.executor.submit(self._describe, on_done=self._described)
+        self.jump_to_start()
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    # --- sorting and filtering ---
+    def _describe(self):
+        return describe_table(db.get_connection(), self.table_name)
+
+    def _described(self, described):
+        if not self.tree.winfo_exists():
+            return
+        self.numeric, sortable = described
+        for col in self.columns:
+            if col in sortable:
+                self.tree.heading(col, command=lambda c=col: self.sort_by(c))
+        self._show_sort()
+
+    def _show_sort(self):
+        for col in self.columns:
+            arrow = (" ▼" if self.descending else " ▲") if col == self.sort else ""
+            self.tree.heading(col, text=col + arrow)
+
+    def sort_by(self, column):
+        if column == self.sort:
+            self.descending = not self.descending
+        else:
+            self.sort, self.descending = column, False
+        self._show_sort()
+        self.jump_to_start()
+
+    def apply_filters(self):
+        filters, params = [], []
+        try:
+            for col, column_codec in zip(self.columns, self.codecs):
+                text = self.filter_entries[col].get().strip()
+                if text:
+                    sql, values = filter_condition(col, text, col in self.numeric, column_codec)
+                    filters.append(sql)
+                    params.extend(values)
+        except ValueError as e:
+            if self.executor.default_on_error is not None:
+                self.executor.default_on_error(e)
+            return
+        self._filters, self._filter_params = filters, params
+        self.jump_to_start()
+
+    # --- queries ---
+    def _page(self, forward, boundary):
+        # Built on the Tk thread, so a page in flight keeps the sort and filters it was asked for.
+        sql = page_query(self.table_name, self.columns, forward, boundary is not None,
+                         self.sort, self.descending, self._filters)
+        params = []
+        if boundary is not None:
+            if self.sort != self.key:
+                params.append(boundary[self.columns.index(self.sort)])
+            params.append(boundary[0])
+        return sql, params + self._filter_params + [self.page_size]
+
+    def _merge_order(self, forward):
+        # (history, key, descending) the live and archived pages are merged on
+        indexes = [0] if self.sort == self.key else [self.columns.index(self.sort), 0]
+        return self.history, operator.itemgetter(*indexes), forward == self.descending
+
+    @staticmethod
+    def _fetch(sql, params, reverse, merge=None):
+        conn = db.get_connection()
+        if merge is None:
+            rows = conn.execute(sql, params).fetchall()
+        else:
+            history, order_key, descending = merge
+            rows = history.page(conn, sql, params, order_key, descending)
+        if reverse:
+            rows.reverse()
+        return rows
+
+    # --- window management ---
+    def _first_row(self):
+        items = self.tree.get_children()
+        return self._rows[items[0]] if items else None
+
+    def _last_row(self):
+        items = self.tree.get_children()
+        return self._rows[items[-1]] if items else None
+
+    def _insert(self, index, row):
+        # The Treeview shows decoded strings; the stored values are the keyset boundary.
+        self._rows[self.tree.insert("", index, values=codec.decode_row(self.codecs, row))] = row
+
+    def _delete(self, items):
+        self.tree.delete(*items)
+        for item in items:
+            del self._rows[item]
+
+    def _load(self, forward, boundary, apply):
+        # A new request supersedes whatever page is still in flight.
+        if self._task is not None:
+            self._task.cancel()
+        sql, params = self._page(forward, boundary)
+        merge = self._merge_order(forward) if self.history is not None else None
+
+        def done(rows):
+            self._task = None
+            if self.tree.winfo_exists():
+                apply(rows)
+
+        def failed(e):
+            self._task = None
+            if self.executor.default_on_error is not None:
+                self.executor.default_on_error(e)
+        self._task = self.executor.submit(instrument.timed, f"view_table:{self.table_name}",
+                                          self._fetch, sql, params, not forward, merge,
+                                          on_done=done, on_error=failed)
+
+    def _reset(self, rows):
+        self._delete(self.tree.get_children())
+        for row in rows:
+            self._insert(tk.END, row)
+
+    def jump_to_start(self):
+        def apply(rows):
+            self._reset(rows)
+            self.at_start = True
+            self.at_end = len(rows) < self.page_size
+            self.tree.yview_moveto(0)
+        self._load(True, None, apply)
+
+    def jump_to_end(self):
+        def apply(rows):
+            self._reset(rows)
+            self.at_start = len(rows) < self.page_size
+            self.at_end = True
+            self.tree.yview_moveto(1)
+        self._load(False, None, apply)
+
+    def load_next(self):
+        self._load(True, self._last_row(), self._append)
+
+    def load_previous(self):
+        self._load(False, self._first_row(), self._prepend)
+
+    def _append(self, rows):
+        if len(rows) < self.page_size:
+            self.at_end = True
+        for row in rows:
+            self._insert(tk.END, row)
+        items = self.tree.get_children()
+        excess = len(items) - self.max_rows
+        if excess > 0:
+            self._delete(items[:excess])
+            self.tree.yview_scroll(-excess, "units")
+            self.at_start = False
+
+    def _prepend(self, rows):
+        if len(rows) < self.page_size:
+            self.at_start = True
+        for row in reversed(rows):
+            self._insert(0, row)
+        self.tree.yview_scroll(len(rows), "units")
+        items = self.tree.get_children()
+        excess = len(items) - self.max_rows
+        if excess > 0:
+            self._delete(items[-excess:])
+            self.at_end = False
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._task is not None:
+            return
+        if float(last) > 1 - PREFETCH_MARGIN and not self.at_end:
+            self.load_next()
+        elif float(first) < PREFETCH_MARGIN and not self.at_start:
+            self.load_previous()
+
+    def _on_destroy(self, event):
+        if event.widget is not self.frame:
+            return
+        if self._task is not None:
+            self._task.cancel()
+        if self.history is not None:
+            # after any page still running on a worker
+            self.executor.submit(self.history.close, background=True)
@@ -0,0 +1,152 @@
+import re
+from datetime import date
+from functools import lru_cache
+
+
+# Patterns used by the schema CHECK constraints (see migrations._baseline).
+# The Python validators use the same strings so forms, imports and the
+# database all agree on what is valid.
+NAME_PATTERN = '^[A-Za-z ]+$'
+PHONE_PATTERN = '^[0-9]{10}$'
+EMAIL_PATTERN = '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'
+DATE_PATTERN = '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+
+
+# --- REGEXP ---
+@lru_cache(maxsize=128)
+def compile_pattern(pattern):
+    return re.compile(pattern)
+
+
+def regexp(pattern, value):
+    """SQLite REGEXP(pattern, value); registered on every connection by db.py.
+
+    NULL values give NULL, so CHECKs on optional columns pass.
+    """
+    if value is None:
+        return None
+    return compile_pattern(pattern).search(value) is not None
+
+
+NAME_RE = compile_pattern(NAME_PATTERN)
+PHONE_RE = compile_pattern(PHONE_PATTERN)
+EMAIL_RE = compile_pattern(EMAIL_PATTERN)
+DATE_RE = compile_pattern(DATE_PATTERN)
+
+
+# --- FIELD VALIDATORS ---
+def is_valid_name(name):
+    # letters and spaces only
+    return NAME_RE.search(name) is not None
+
+
+def is_valid_phone(phone):
+    # exactly 10 digits
+    return PHONE_RE.search(phone) is not None
+
+
+def validate_email(email):
+    return EMAIL_RE.search(email) is not None
+
+
+def validate_date_format(date_str):
+    if DATE_RE.search(date_str) is None:
+        return False
+    try:
+        date.fromisoformat(date_str)
+    except ValueError:
+        return False
+    return True
+
+
+def is_valid_date_order(manu_date, exp_date):
+    # ISO dates order the same as strings once both are valid
+    return validate_date_format(manu_date) and validate_date_format(exp_date) and exp_date > manu_date
+
+
+def parse_positive_price(price):
+    value = float(price)
+    if value <= 0:
+        raise ValueError("Price must be a positive number")
+    return value
+
+
+def parse_quantity(qty):
+    value = int(qty)
+    if value < 0:
+        raise ValueError("Quantity must be a non-negative integer")
+    return value
+
+
+# --- ROW VALIDATORS ---
+# Each takes a dict of column values (as read from a form or file) and returns
+# the tuple to insert, or raises ValueError with the reason.
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return ""
+    return value.strip() if type(value) is str else str(value).strip()
+
+
+def _optional_id(row, key):
+    value = _text(row, key)
+    return int(value) if value else None
+
+
+def validate_customer_row(row):
+    name, address, phone = _text(row, "Name"), _text(row, "Address"), _text(row, "PhoneNumber")
+    if not is_valid_name(name):
+        raise ValueError("Name must contain only letters and spaces")
+    if not is_valid_phone(phone):
+        raise ValueError("Phone number must be exactly 10 digits")
+    return (_optional_id(row, "Cust_ID"), name, address or None, phone)
+
+
+def validate_supplier_row(row):
+    name, contact = _text(row, "Name"), _text(row, "Contact")
+    if not is_valid_name(name):
+        raise ValueError("Name must contain only letters and spaces")
+    if contact and not is_valid_phone(contact):
+        raise ValueError("Contact must be 10 digits")
+    return (_optional_id(row, "Supplier_ID"), name, contact or None)
+
+
+def validate_medicine_row(row):
+    brand, exp, manu = _text(row, "Brand"), _text(row, "ExpiryDate"), _text(row, "ManufactureDate")
+    if not brand:
+        raise ValueError("Brand is required")
+    supplier_id = int(_text(row, "SupplierID"))
+    price = parse_positive_price(_text(row, "Price"))
+    if not (validate_date_format(exp) and validate_date_format(manu)):
+        raise ValueError("Dates must be in YYYY-MM-DD format")
+    if not is_valid_date_order(manu, exp):
+        raise ValueError("Expiry date must be after manufacture date")
+    return (_optional_id(row, "Med_ID"), supplier_id, brand, price, exp, manu)
+
+
+def validate_stock_row(row):
+    med_id = int(_text(row, "Med_ID"))
+    qty = parse_quantity(_text(row, "StockQuantity"))
+    expiry, lot_number = _text(row, "ExpiryDate"), _text(row, "LotNumber")
+    if expiry and not validate_date_format(expiry):
+        raise ValueError("Dates must be in YYYY-MM-DD format")
+    return (med_id, qty, expiry or None, lot_number or None)
+
+
+def validate_batch(rows, validator):
+    """Validate a chunk of (line_no, row) pairs.
+
+    Returns (good, rejects): good is a list of (line_no, values) and rejects
+    a list of (line_no, row, reason).
+    """
+    good, rejects = [], []
+    for line_no, row in rows:
+        # a JSON line may hold a list, a string or a number instead of an object
+        if not isinstance(row, dict):
+            rejects.append((line_no, row, "Row must be an object with column names"))
+            continue
+        try:
+            good.append((line_no, validator(row)))
+        except (ValueError, TypeError) as e:
+            rejects.append((line_no, row, str(e) or "Invalid value"))
+    return good, rejects
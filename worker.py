@@ -0,0 +1,175 @@
+import queue
+import sys
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+import db
+
+
+# How often the Tk thread drains finished work, in milliseconds.
+POLL_MS = 25
+
+
+# --- BACKGROUND EXECUTION ---
+class Task:
+    """Handle for one piece of database work submitted to the executor."""
+
+    def __init__(self, on_done, on_error, background=False, waits_for=None, finished=None):
+        self.on_done = on_done
+        self.on_error = on_error
+        self.background = background
+        # see BackgroundExecutor.submit(first=True)
+        self.waits_for = waits_for
+        self.finished = finished
+        self.cancelled = False
+        self.future = None
+        # the worker's connection while the task runs; conn_lock keeps cancel()
+        # from interrupting it after _run has handed it on to the next task
+        self.conn = None
+        self.conn_lock = threading.Lock()
+
+    def cancel(self):
+        # Not started yet: drop it. Running: abort the statement in progress.
+        self.cancelled = True
+        if self.future is not None and self.future.cancel():
+            if self.finished is not None:
+                self.finished.set()
+            return
+        with self.conn_lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+
+class BackgroundExecutor:
+    """Runs database work on worker threads and hands results back to Tk.
+
+    Workers push results onto a queue which the Tk thread drains with
+    root.after, so callbacks always run on the event thread. A task
+    submitted with first=True (the schema check at start-up) holds back
+    every task submitted after it until it has finished or failed.
+    """
+
+    def __init__(self, root, max_workers=2, on_error=None):
+        self.root = root
+        self.default_on_error = on_error
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-worker')
+        self._results = queue.Queue()
+        self._pending = set()
+        self._busy_listeners = []
+        # set when the latest first=True task is over; later tasks wait on it
+        self._first_finished = None
+        self.root.after(POLL_MS, self._poll)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, background=False, first=False):
+        # Background tasks (periodic polls) don't show as busy and survive the Cancel button.
+        waits_for = self._first_finished
+        if first:
+            self._first_finished = threading.Event()
+        task = Task(on_done, on_error or self.default_on_error, background, waits_for,
+                    self._first_finished if first else None)
+        self._pending.add(task)
+        task.future = self._pool.submit(self._run, task, fn, args)
+        self._notify_busy()
+        return task
+
+    def cancel_all(self):
+        for task in list(self._pending):
+            if not task.background:
+                task.cancel()
+
+    def shutdown(self):
+        for task in list(self._pending):
+            task.cancel()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def busy(self):
+        return any(not task.background for task in self._pending)
+
+    def add_busy_listener(self, callback):
+        self._busy_listeners.append(callback)
+
+    def _run(self, task, fn, args):
+        if task.waits_for is not None:
+            task.waits_for.wait()
+        if task.cancelled:
+            if task.finished is not None:
+                task.finished.set()
+            self._results.put((task, None, None))
+            return
+        with task.conn_lock:
+            task.conn = db.get_connection()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self._results.put((task, None, e))
+        else:
+            self._results.put((task, result, None))
+        finally:
+            with task.conn_lock:
+                task.conn = None
+            if task.finished is not None:
+                task.finished.set()
+
+    def _poll(self):
+        finished = False
+        while True:
+            try:
+                task, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            finished = True
+            self._pending.discard(task)
+            if task.cancelled:
+                continue
+            try:
+                if error is not None:
+                    if task.on_error is not None:
+                        task.on_error(error)
+                elif task.on_done is not None:
+                    task.on_done(result)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        # Tasks cancelled before they started never report back.
+        for task in [t for t in self._pending if t.future.cancelled()]:
+            self._pending.discard(task)
+            finished = True
+        if finished:
+            self._notify_busy()
+        self.root.after(POLL_MS, self._poll)
+
+    def _notify_busy(self):
+        for callback in self._busy_listeners:
+            callback(self.busy)
+
+
+# --- BUSY INDICATOR ---
+class BusyIndicator:
+    """Status bar showing a progress bar and a Cancel button while work runs."""
+
+    def __init__(self, parent, executor):
+        self.executor = executor
+        self.frame = ttk.Frame(parent)
+        self.label = ttk.Label(self.frame, text="Ready")
+        self.label.pack(side=tk.LEFT, padx=10)
+        self.cancel_button = ttk.Button(self.frame, text="Cancel", command=executor.cancel_all,
+                                        state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.progress = ttk.Progressbar(self.frame, mode='indeterminate', length=120)
+        self.progress.pack(side=tk.RIGHT, padx=5)
+        executor.add_busy_listener(self._on_busy)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def _on_busy(self, busy):
+        if busy:
+            self.label.config(text="Working...")
+            self.cancel_button.config(state=tk.NORMAL)
+            self.progress.start(10)
+        else:
+            self.label.config(text="Ready")
+            self.cancel_button.config(state=tk.DISABLED)
+            self.progress.stop()
@@ -0,0 +1,176 @@
+"""Synthetic pharmacy data at a chosen scale.
+
+    python workload.py bench.db --sales 100000
+    python workload.py big.db --sales 10000000 --seed 7
+    python workload.py load.db --end $(date +%F)   # stock still in date today
+
+Customers, employees, suppliers, medicines and stock lots are sized from
+the number of sales. Every row passes the schema's CHECK constraints, and
+the same seed always produces the same database. Stock is received as lots
+so Stock, the ledger and alerts are built by their triggers. A share of
+lots expire within 30 days and some medicines sit below their reorder
+level, so the expiry and low-stock paths have work to do.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import codec
+import db
+import migrations
+
+
+FIRST_NAMES = ["Aarav", "Anita", "Arjun", "Bella", "Carlos", "Deepa", "Elena", "Farhan", "Grace", "Hiro",
+               "Isha", "James", "Kavya", "Liam", "Maria", "Mohan", "Nadia", "Omar", "Priya", "Quinn",
+               "Ravi", "Sara", "Tariq", "Uma", "Victor", "Wei", "Xena", "Yusuf", "Zara", "John"]
+LAST_NAMES = ["Sharma", "Patel", "Smith", "Garcia", "Khan", "Singh", "Brown", "Lee", "Kumar", "Jones",
+              "Nguyen", "Rao", "Mehta", "Wilson", "Das", "Ali", "Reddy", "Taylor", "Iyer", "Chen"]
+ROLES = ["Pharmacist", "Cashier", "Manager", "Assistant"]
+DRUGS = ["Paracetamol", "Ibuprofen", "Amoxicillin", "Cetirizine", "Metformin", "Omeprazole", "Azithromycin",
+         "Atorvastatin", "Amlodipine", "Losartan", "Pantoprazole", "Montelukast", "Doxycycline", "Insulin",
+         "Salbutamol", "Ranitidine", "Diclofenac", "Aspirin", "Vitamin D", "Zinc"]
+FORMS = ["Tablet", "Syrup", "Capsule", "Drops", "Gel", "Injection"]
+
+BATCH = 50000
+
+
+def scale(sales):
+    """Row counts for each table, derived from the number of sales."""
+    return {
+        "customers": max(100, sales // 10),
+        "employees": max(10, min(500, sales // 10000)),
+        "suppliers": max(10, min(2000, sales // 5000)),
+        "medicines": max(50, min(50000, sales // 200)),
+        "sales": sales,
+    }
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _phones(rng, count, prefix):
+    # distinct 10-digit numbers: a shuffled offset keeps them unique
+    start = rng.randrange(10 ** 8)
+    for i in range(count):
+        yield f"{prefix}{(start + i * 7919) % 10 ** 9:09d}"
+
+
+def _batched(conn, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        conn.executemany(sql, batch)
+
+
+# --- GENERATION ---
+def generate(path, sales, seed=1, end=date(2025, 12, 31), days=365, progress=None):
+    """Fill a new database at path; returns the row counts used."""
+    rng = random.Random(seed)
+    counts = scale(sales)
+    first_day = end - timedelta(days=days - 1)
+    log = progress or (lambda message: None)
+
+    conn = db.open_connection(path)
+    migrations.migrate(conn)
+    with conn:
+        log(f"customers: {counts['customers']}")
+        phones = _phones(rng, counts["customers"], "9")
+        _batched(conn, "INSERT INTO Customer (Name, Address, PhoneNumber) VALUES (?, ?, ?)",
+                 ((_name(rng), f"{rng.randint(1, 999)} Main Road", next(phones))
+                  for _ in range(counts["customers"])))
+
+        log(f"employees: {counts['employees']}")
+        phones = _phones(rng, counts["employees"], "8")
+        conn.executemany("INSERT INTO Employee (Name, Role, Email, PhoneNumber) VALUES (?, ?, ?, ?)",
+                         [(_name(rng), rng.choice(ROLES), f"employee{i}@pharmacy.example", next(phones))
+                          for i in range(counts["employees"])])
+
+        log(f"suppliers: {counts['suppliers']}")
+        phones = _phones(rng, counts["suppliers"], "7")
+        conn.executemany("INSERT INTO Supplier (Name, Contact) VALUES (?, ?)",
+                         [(f"{rng.choice(LAST_NAMES)} Pharma", next(phones)) for _ in range(counts["suppliers"])])
+
+        log(f"medicines: {counts['medicines']}")
+        medicines = []
+        for i in range(counts["medicines"]):
+            made = first_day - timedelta(days=rng.randint(0, 365))
+            expires = made + timedelta(days=rng.randint(365, 1095))
+            price = round(rng.uniform(0.5, 250.0), 2)
+            medicines.append((rng.randint(1, counts["suppliers"]),
+                              f"{rng.choice(DRUGS)} {rng.choice(FORMS)} {i + 1}",
+                              price, expires.isoformat(), made.isoformat()))
+        conn.executemany("""INSERT INTO Medicine (SupplierID, Brand, Price, ExpiryDate, ManufactureDate)
+                            VALUES (?, ?, ?, ?, ?)""", medicines)
+
+        log("stock lots")
+        lots = []
+        for med_id in range(1, counts["medicines"] + 1):
+            low = rng.random() < 0.05
+            for _ in range(rng.randint(1, 3)):
+                soon = rng.random() < 0.1
+                expiry = end + timedelta(days=rng.randint(1, 30) if soon else rng.randint(31, 900))
+                qty = rng.randint(1, 3) if low else rng.randint(20, 500)
+                lots.append((med_id, qty, expiry.isoformat(), f"L{rng.randrange(10 ** 6):06d}",
+                             end.isoformat()))
+        conn.executemany("""INSERT INTO StockLot (Med_ID, Quantity, ExpiryDate, LotNumber, LastUpdated)
+                            VALUES (?, ?, ?, ?, ?)""", lots)
+
+    # Sales go in one transaction per batch so a 10M-row run can be interrupted.
+    log(f"sales: {sales}")
+    cents = [codec.to_cents(m[2]) for m in medicines]
+    # a few medicines sell far more than the rest, as in a real shop
+    weights = [1.0 / (i + 1) ** 0.8 for i in range(counts["medicines"])]
+    written = 0
+    while written < sales:
+        n = min(BATCH, sales - written)
+        med_ids = rng.choices(range(1, counts["medicines"] + 1), weights=weights, k=n)
+        rows = []
+        for med_id in med_ids:
+            qty = rng.randint(1, 5)
+            day = first_day + timedelta(days=rng.randrange(days))
+            rows.append((rng.randint(1, counts["customers"]), med_id, codec.to_day(day), qty,
+                         qty * cents[med_id - 1]))
+        with conn:
+            conn.executemany("""INSERT INTO Sales (Cust_ID, Med_ID, SaleDate, Quantity, TotalAmount)
+                                VALUES (?, ?, ?, ?, ?)""", rows)
+        written += n
+        log(f"  {written}/{sales}")
+    conn.execute("ANALYZE")
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--sales", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=365, help="days of sales history")
+    parser.add_argument("--end", type=date.fromisoformat, default=date(2025, 12, 31),
+                        help="last day of sales; stock expires after it (default 2025-12-31)")
+    parser.add_argument("--force", action="store_true", help="replace an existing file")
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        if not args.force:
+            sys.exit(f"{args.path} exists; use --force to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+    start = time.perf_counter()
+    counts = generate(args.path, args.sales, args.seed, end=args.end, days=args.days,
+                      progress=lambda message: print(message, file=sys.stderr))
+    elapsed = time.perf_counter() - start
+    print(", ".join(f"{k} {v}" for k, v in counts.items()) + f" in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()